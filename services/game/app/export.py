@@ -0,0 +1,132 @@
+"""exports archived hands to columnar files for offline analysis
+
+    python -m app.export <directory> [--since 2026-10-01] [--until 2026-10-18] [--session <uuid>] [--batch-size 50000]
+
+Reads hand_histories in id order, <batch-size> rows per query, and writes the
+fixed-width columns of app.utils.columnar to <directory>: hand columns (ids,
+blinds, pot, board cards), player columns (seats, ids, hole cards, balances,
+winnings), action columns (type, seat, amount) and index.json. Read them with
+app.utils.columnar.HandColumns, which maps the files without parsing them.
+--since and --until filter by the time a hand ended. Prints JSON with the
+exported counts and the export time.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+from tortoise import Tortoise, connections
+
+from app.db import TORTOISE_ORM
+from app.models import HandHistory
+from app.utils import columnar, events
+
+
+def padded(values: List[bytes], width: int) -> np.ndarray:
+    """card index rows of <width> columns, filled with NO_CARD
+    """
+    filler = bytes([columnar.NO_CARD])
+    return np.frombuffer(b"".join(value.ljust(width, filler) for value in values), dtype="u1").reshape(-1, width)
+
+
+def batch_columns(rows: List[dict]) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]:
+    """columns of a batch of hand_histories rows
+
+    Args:
+        rows (List[dict]): hand_histories rows, oldest first
+
+    Returns:
+        Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]: columns, players and actions of every hand
+    """
+    players = [json.loads(row["players"]) for row in rows]
+    dealt = [player for hand in players for player in hand]
+    actions = np.frombuffer(b"".join(row["actions"] for row in rows), dtype=columnar.ACTION_RECORD)
+    columns = {
+        "hand_id": np.array([row["id"] for row in rows]),
+        "session_id": np.frombuffer(b"".join(row["session_id"].bytes for row in rows), dtype="u1").reshape(-1, 16),
+        "variant": np.array([row["variant"] for row in rows]),
+        "small_blind": np.array([row["small_blind"] for row in rows]),
+        "big_blind": np.array([row["big_blind"] for row in rows]),
+        "pot": np.array([row["pot"] for row in rows]),
+        "ended_at": np.array([round(row["ended_at"].timestamp() * 1e6) for row in rows]),
+        "board": padded([bytes(row["board"]) for row in rows], columnar.BOARD_CARDS),
+        "player_seat": np.array([player["seat"] for player in dealt]),
+        "player_id": np.frombuffer(b"".join(bytes.fromhex(player["id"].replace("-", "")) for player in dealt), dtype="u1").reshape(-1, 16),
+        "player_hand": padded([bytes(player["hand"]) for player in dealt], columnar.HOLE_CARDS),
+        "player_balance": np.array([player["balance"] for player in dealt]),
+        "player_won": np.array([player["won"] for player in dealt]),
+        "action_type": actions["type"],
+        "action_seat": actions["seat"],
+        "action_amount": actions["amount"]
+    }
+    players_per_hand = np.array([len(hand) for hand in players], dtype="<i8")
+    actions_per_hand = np.array([len(row["actions"]) // events.ACTION.size for row in rows], dtype="<i8")
+    return columns, players_per_hand, actions_per_hand
+
+
+async def export(directory: str, since: Optional[datetime], until: Optional[datetime], session_id: Optional[UUID], batch_size: int) -> dict:
+    """writes the matching hands to <directory>
+
+    Args:
+        directory (str): export directory, its column files are replaced
+        since (Optional[datetime]): earliest end of a hand
+        until (Optional[datetime]): end of a hand before this
+        session_id (Optional[UUID]): only hands of this table
+        batch_size (int): rows per query
+
+    Returns:
+        dict: index of the export
+    """
+    conditions, arguments = ["id > $1"], []
+    for condition, value in (("ended_at >= ${}", since), ("ended_at < ${}", until), ("session_id = ${}", session_id)):
+        if value is not None:
+            arguments.append(value)
+            conditions.append(condition.format(len(arguments) + 1))
+    query = (
+        f'SELECT id, session_id, variant, small_blind, big_blind, board, players, actions, pot, ended_at '
+        f'FROM "{HandHistory._meta.db_table}" WHERE {" AND ".join(conditions)} ORDER BY id LIMIT {int(batch_size)}'
+    )
+    writer = columnar.ColumnWriter(directory)
+    try:
+        last_id = 0
+        async with connections.get("default").acquire_connection() as connection:
+            while True:
+                rows = await connection.fetch(query, last_id, *arguments)
+                if not rows:
+                    break
+                writer.append(*batch_columns(rows))
+                last_id = rows[-1]["id"]
+    finally:
+        index = writer.close()
+    return index
+
+
+async def main(arguments: argparse.Namespace) -> dict:
+    await Tortoise.init(config=TORTOISE_ORM)
+    started = time.perf_counter()
+    try:
+        index = await export(arguments.directory, arguments.since, arguments.until, arguments.session, arguments.batch_size)
+    finally:
+        await Tortoise.close_connections()
+    return {
+        "hands": index["hands"],
+        "players": index["players"],
+        "actions": index["actions"],
+        "bytes": sum(entry.stat().st_size for entry in os.scandir(arguments.directory) if entry.is_file()),
+        "seconds": time.perf_counter() - started
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--since", type=datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.fromisoformat)
+    parser.add_argument("--session", type=UUID)
+    parser.add_argument("--batch-size", type=int, default=50000)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -43,4 +43,26 @@ class User(Model):
         return d
 
     class Meta:
-        table = "users"
\ No newline at end of file
+        table = "users"
+
+class HandHistory(Model):
+    id = fields.BigIntField(pk=True)
+    session_id = fields.UUIDField(index=True)
+    hand_seed = fields.CharField(max_length=64, null=True)
+    variant = fields.SmallIntField()
+    small_blind = fields.FloatField()
+    big_blind = fields.FloatField()
+    # card indexes of the whole dealt board, shown or not, see app.utils.evaluator.card_index
+    board = fields.BinaryField()
+    # seat, id, hole card indexes, balance after the hand and chips won of every dealt player
+    players = fields.JSONField()
+    # app.utils.events.ACTION records of the hand, in order
+    actions = fields.BinaryField()
+    pot = fields.FloatField()
+    # event log revisions of the table: the hand is the commits after the first up to the last
+    first_revision = fields.BigIntField()
+    last_revision = fields.BigIntField()
+    ended_at = fields.DatetimeField(index=True)
+
+    class Meta:
+        table = "hand_histories"
@@ -3,15 +3,21 @@ from typing import Optional
 from datetime import datetime, timedelta
 from uuid import uuid4
 
-from fastapi import APIRouter, WebSocket, Depends, WebSocketDisconnect
+from fastapi import APIRouter, WebSocket, Depends, WebSocketDisconnect, Query
 from fastapi.responses import RedirectResponse
 from fastapi.exceptions import WebSocketException, HTTPException
 from pydantic import UUID4
 
 from app.models import User
-from app.schemas import SessionCreateOut
-from app.utils.sessions import sessions_container, Session, Player
+from app.schemas import SessionCreateOut, EquityIn, EquityOut, LobbyPageOut
+from app.utils.sessions import sessions_container, Session, SessionStatus, Player, GameVariant
+from app.utils.lobby import list_tables
+from app.utils.equity import calculate_equity
+from app.utils.evaluator import card_index
 from app.utils.contrib import decode_jwt
+from app.utils.persistence import StaleSessionError, commit_stats
+from app.utils.actor import actor_stats
+from app.utils.history import hand_archiver
 
 from app import settings
 
@@ -30,17 +36,54 @@ async def validate_access_token(
     return user_data
 
 
+@router.get("/metrics/commits", status_code=200)
+async def get_commit_metrics():
+    return commit_stats.dict()
+
+
+@router.get("/metrics/tables", status_code=200)
+async def get_table_metrics():
+    return actor_stats.dict()
+
+
+@router.get("/metrics/history", status_code=200)
+async def get_history_metrics():
+    return {"queued": len(hand_archiver.queue), **hand_archiver.stats.dict()}
+
+
 @router.post("/create", response_model=SessionCreateOut, status_code=200)
 async def create_session(
+    variant: GameVariant = GameVariant.HOLDEM,
     user: User = Depends(decode_jwt)
 ):
     session: Optional[Session] = await sessions_container.find_user_session(uuid=user.uuid)
     if session is not None:
         return SessionCreateOut(uuid=session.id, players_id_list=[player.id for player in session.players])
-    session = await sessions_container.create_session(max_players=settings.DEFAULT_MAX_PLAYERS, owner=user.uuid)
+    session = await sessions_container.create_session(max_players=settings.DEFAULT_MAX_PLAYERS, owner=user.uuid, variant=variant)
     return SessionCreateOut(uuid=session.id, players_id_list=[player.id for player in session.players])
 
 
+@router.get("/lobby", response_model=LobbyPageOut, status_code=200)
+async def get_lobby(
+    status: SessionStatus = SessionStatus.LOBBY,
+    min_free_seats: int = Query(default=1, ge=0),
+    min_big_blind: Optional[float] = Query(default=None, ge=0),
+    max_big_blind: Optional[float] = Query(default=None, ge=0),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=settings.LOBBY_PAGE_SIZE, ge=1, le=settings.LOBBY_MAX_PAGE_SIZE),
+    user: User = Depends(decode_jwt)
+):
+    page = await list_tables(
+        status=status.value,
+        min_free_seats=min_free_seats,
+        min_big_blind=min_big_blind,
+        max_big_blind=max_big_blind,
+        offset=offset,
+        limit=limit
+    )
+    return LobbyPageOut(**page)
+
+
 @router.post("/join/{session_id}", status_code=200)
 async def player_join_game(
     session_id: UUID4,
@@ -49,31 +92,42 @@ async def player_join_game(
     session: Optional[Session] = await sessions_container.find_user_session(uuid=user.uuid)
     if session is not None:
         return session.id
-    session: Optional[Session] = sessions_container.get_session(session_id=session_id)
+    session: Optional[Session] = await sessions_container.get_session_by_uuid(uuid=session_id)
     if session is None:
         raise HTTPException(
             status_code=404,
             detail="The session with this id does not exist"
         )
     player = Player(uuid=user.uuid, name=user.username, websocket=None)
-    await session.add_player(player=player)
+    await session.actor.submit(session.add_player, player=player)
     
 
-@router.websocket("/{token}")
-async def webscoket_endpoint(
-    token: str,
-    websocket: WebSocket
+@router.post("/equity", response_model=EquityOut, status_code=200)
+async def get_equity(
+    equity_in: EquityIn,
+    user: User = Depends(decode_jwt)
 ):
-    await websocket.accept()
-    user: User = await decode_jwt(token=token)
-    user_id = user.uuid
-    username = user.username
-    session = await sessions_container.get_session_by_user_id(uuid=user_id)
-    if session is None:
-        raise WebSocketException(
-            code=1007,
-            reason="The session with this uuid does not exist"
+    try:
+        hole = [card_index(card.rank, card.suit) for card in equity_in.hole_cards]
+        board = [card_index(card.rank, card.suit) for card in equity_in.board]
+        result = await calculate_equity(
+            hole=hole,
+            board=board,
+            opponents=equity_in.opponents,
+            samples=equity_in.samples,
+            time_budget=equity_in.time_budget,
+            confidence_half_width=equity_in.confidence_half_width
+        )
+    except (KeyError, ValueError) as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Incorrect equity request: {e}"
         )
+    return EquityOut(**result)
+
+
+# the table actor runs these, see app.utils.actor
+async def connect_player(session: Session, user_id: UUID4, username: str, websocket: WebSocket) -> Player:
     player = session.get_player(player_id=user_id)
     if player is not None:
         player.websocket = websocket
@@ -89,16 +143,54 @@ async def webscoket_endpoint(
         await session.add_player(player=player)
         chat_history = await session.get_all_messages()
         await session.send_personal_message(player_id=player.id, data=chat_history)
+    return player
+
+
+async def exit_player(session: Session, player: Player) -> None:
+    await session.remove_player(player.id)
+    await session.send_all_data(session.data)
+
+
+async def disconnect_player(session: Session, player: Player) -> None:
+    player.websocket = None
+    await session.send_all_data(session.data)
+
+
+async def handle_player_message(session: Session, player: Player, data: dict) -> None:
+    try:
+        await session.handle_message(data=data, player=player)
+    except StaleSessionError:
+        await session.send_personal_message(
+            player_id=player.id,
+            data={"type": "error", "message": "the table changed, try again"}
+        )
+
+
+@router.websocket("/{token}")
+async def webscoket_endpoint(
+    token: str,
+    websocket: WebSocket
+):
+    await websocket.accept()
+    user: User = await decode_jwt(token=token)
+    user_id = user.uuid
+    username = user.username
+    session = await sessions_container.get_session_by_user_id(uuid=user_id)
+    if session is None:
+        raise WebSocketException(
+            code=1007,
+            reason="The session with this uuid does not exist"
+        )
+    player = await session.actor.submit(connect_player, session=session, user_id=user_id, username=username, websocket=websocket)
     try:
         while True:
             data = await websocket.receive_json()
             if data["type"] == "exit":
-                ans = await session.remove_player(player.id)
-                await session.send_all_data(session.data)
+                await session.actor.submit(exit_player, session=session, player=player)
                 await websocket.close(code=1000)
                 break
             else:
-                await session.handle_message(data=data, player=player)
+                # messages of all players at the table are applied one at a time
+                await session.actor.submit(handle_player_message, session=session, player=player, data=data)
     except WebSocketDisconnect:
-        player.websocket = None
-        await session.send_all_data(session.data)
+        await session.actor.submit(disconnect_player, session=session, player=player)
@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime, timedelta
 from typing import Optional, List
 
-from pydantic import BaseModel, UUID4, validator
+from pydantic import BaseModel, UUID4, Field, validator
 
 
 class BaseProperties(BaseModel):
@@ -18,4 +18,43 @@ class SessionCreateOut(BaseModel):
 
 class JWTTokenPayload(BaseModel):
     user_uuid: UUID4 = None
-    token_kind: str = None
\ No newline at end of file
+    token_kind: str = None
+
+
+class CardIn(BaseModel):
+    rank: str
+    suit: str
+
+
+class EquityIn(BaseModel):
+    hole_cards: List[CardIn]
+    board: List[CardIn] = []
+    opponents: int = Field(default=1, ge=1, le=9)
+    samples: Optional[int] = Field(default=None, gt=0)
+    time_budget: Optional[float] = Field(default=None, gt=0)
+    confidence_half_width: Optional[float] = Field(default=None, gt=0)
+
+
+class EquityOut(BaseModel):
+    win: float
+    tie: float
+    equity: float
+    samples: int
+    confidence_half_width: float
+    elapsed: float
+
+
+class LobbyTableOut(BaseModel):
+    id: UUID4
+    status: int
+    free_seats: int
+    max_players: int
+    players: int
+    small_blind: float
+    big_blind: float
+    variant: int
+
+
+class LobbyPageOut(BaseModel):
+    tables: List[LobbyTableOut] = []
+    next_offset: Optional[int] = None
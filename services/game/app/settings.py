@@ -44,4 +44,61 @@ S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
 DEFAULT_MAX_PLAYERS = 4
 DEFAULT_START_BALANCE = 15000.0
 DEFAULT_SMALL_BLIND = 10.0
-DEFAULT_BIG_BLIND = 20.0
\ No newline at end of file
+DEFAULT_BIG_BLIND = 20.0
+
+# "lookup" - table evaluator, "legacy" - combinations of Hand.evaluate
+HAND_EVALUATOR = os.getenv("HAND_EVALUATOR", default="lookup")
+
+EQUITY_WORKERS = int(os.getenv("EQUITY_WORKERS", default=2))
+EQUITY_DEFAULT_SAMPLES = 50000
+EQUITY_MAX_SAMPLES = 500000
+EQUITY_CHUNK = 5000
+EQUITY_TIME_BUDGET = 0.2
+EQUITY_MAX_TIME_BUDGET = 2.0
+EQUITY_CONFIDENCE_HALF_WIDTH = 0.005
+EQUITY_CONFIDENCE_Z = 1.96
+
+EXACT_EQUITY_INLINE_RUNOUTS = 2000
+EXACT_EQUITY_CACHE_SIZE = 4096
+
+DECK_POOL_SIZE = 512
+DECK_POOL_REFILL_BATCH = 32
+HAND_SEEDS_HISTORY = 1000
+
+SHOWDOWN_BATCH_MIN_ROWS = 32
+
+# "redis" - every action re-reads and writes the session blob,
+# "memory" - the in-process Session is authoritative, snapshots are written behind
+SESSION_STATE_MODE = os.getenv("SESSION_STATE_MODE", default="redis")
+# seconds a snapshot may lag behind the in-process state, 0 writes on every change
+SESSION_WRITE_DELAY = float(os.getenv("SESSION_WRITE_DELAY", default=0.5))
+# times an action is run again when another worker committed the session first,
+# after that the action is rejected with StaleSessionError
+SESSION_COMMIT_RETRIES = int(os.getenv("SESSION_COMMIT_RETRIES", default=3))
+# "commit" - every commit writes the snapshot fields it changed,
+# "hand" - snapshot fields are written at hand boundaries, commits in between
+# only append their entry to the event log of the table
+SESSION_SNAPSHOTS = os.getenv("SESSION_SNAPSHOTS", default="commit")
+# entries the event log of a table keeps, about
+SESSION_EVENTS_MAXLEN = int(os.getenv("SESSION_EVENTS_MAXLEN", default=10000))
+
+# actions a table queues before senders wait, see app.utils.actor.TableActor
+TABLE_MAILBOX_SIZE = int(os.getenv("TABLE_MAILBOX_SIZE", default=64))
+# seconds without actions after which the task of a table ends
+TABLE_ACTOR_IDLE = float(os.getenv("TABLE_ACTOR_IDLE", default=60.0))
+# actions whose latency the metrics percentiles are computed from
+TABLE_ACTOR_LATENCY_WINDOW = 4096
+
+# tables per /game/lobby page
+LOBBY_PAGE_SIZE = 20
+LOBBY_MAX_PAGE_SIZE = 100
+
+# finished hands copied to hand_histories at once, see app.utils.history.HandArchiver
+HAND_HISTORY_BATCH_SIZE = int(os.getenv("HAND_HISTORY_BATCH_SIZE", default=500))
+# seconds a finished hand may wait for its batch
+HAND_HISTORY_FLUSH_INTERVAL = float(os.getenv("HAND_HISTORY_FLUSH_INTERVAL", default=1.0))
+# hands kept while Postgres is slow or down, the oldest are dropped after that
+HAND_HISTORY_MAX_QUEUED = int(os.getenv("HAND_HISTORY_MAX_QUEUED", default=100000))
+# seconds before a failed batch is retried, doubled after every failure in a row up to the maximum
+HAND_HISTORY_RETRY_DELAY = float(os.getenv("HAND_HISTORY_RETRY_DELAY", default=1.0))
+HAND_HISTORY_MAX_RETRY_DELAY = float(os.getenv("HAND_HISTORY_MAX_RETRY_DELAY", default=60.0))
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from collections import deque
+from functools import partial
+from typing import Any, Awaitable, Callable, Deque, Hashable, Optional, Set
+
+from app import settings
+
+
+class ActorClosedError(Exception):
+    """the table was removed before the action ran"""
+
+
+def _percentiles(values: Deque[float]) -> dict:
+    ordered = sorted(values)
+    if not ordered:
+        return {"p50": None, "p99": None, "max": None}
+    return {
+        "p50": ordered[int(0.5 * (len(ordered) - 1))] * 1e3,
+        "p99": ordered[int(0.99 * (len(ordered) - 1))] * 1e3,
+        "max": ordered[-1] * 1e3
+    }
+
+
+class ActorStats:
+    """mailbox depth of running table actors and latency of the last
+    TABLE_ACTOR_LATENCY_WINDOW actions: time waited in the mailbox and time
+    the action ran
+    """
+
+    def __init__(self, window: Optional[int] = None) -> None:
+        self.actors: Set["TableActor"] = set()
+        self.processed = 0
+        self.failed = 0
+        self.waits: Deque[float] = deque(maxlen=window or settings.TABLE_ACTOR_LATENCY_WINDOW)
+        self.runs: Deque[float] = deque(maxlen=window or settings.TABLE_ACTOR_LATENCY_WINDOW)
+
+    def record(self, wait: float, run: float, failed: bool) -> None:
+        self.processed += 1
+        self.failed += failed
+        self.waits.append(wait)
+        self.runs.append(run)
+
+    def dict(self) -> dict:
+        depths = [actor.mailbox.qsize() for actor in self.actors]
+        return {
+            "running_tables": len(self.actors),
+            "queued_actions": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "processed": self.processed,
+            "failed": self.failed,
+            "wait_ms": _percentiles(self.waits),
+            "processing_ms": _percentiles(self.runs)
+        }
+
+
+class TableActor:
+    """runs the actions of one table one at a time in its own task.
+
+    Actions wait in a bounded mailbox, submit blocks while it is full. The task
+    starts with the first action and ends after TABLE_ACTOR_IDLE seconds
+    without any, so idle tables hold no task
+    """
+
+    def __init__(self, name: Hashable, size: Optional[int] = None) -> None:
+        self.name = name
+        self.mailbox: asyncio.Queue = asyncio.Queue(maxsize=size or settings.TABLE_MAILBOX_SIZE)
+        self.task: Optional[asyncio.Task] = None
+        self.closed = False
+
+    async def submit(self, action: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """queues <action> and waits until the actor has run it
+
+        Args:
+            action (Callable[..., Awaitable[Any]]): coroutine function, like Session.handle_message
+            *args, **kwargs: its arguments
+
+        Raises:
+            ActorClosedError: the table was removed
+
+        Returns:
+            Any: result of the action, its exception is raised here
+        """
+        if self.closed:
+            raise ActorClosedError(self.name)
+        if self.task is not None and self.task is asyncio.current_task():
+            # submitted by an action of this table, queueing it would wait for itself
+            return await action(*args, **kwargs)
+        future = asyncio.get_running_loop().create_future()
+        await self.mailbox.put((partial(action, *args, **kwargs), future, time.perf_counter()))
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+            actor_stats.actors.add(self)
+        return await future
+
+    async def _run(self) -> None:
+        try:
+            while not (self.closed and self.mailbox.empty()):
+                try:
+                    action, future, queued = self.mailbox.get_nowait()
+                except asyncio.QueueEmpty:
+                    try:
+                        action, future, queued = await asyncio.wait_for(self.mailbox.get(), settings.TABLE_ACTOR_IDLE)
+                    except asyncio.TimeoutError:
+                        if self.mailbox.empty():
+                            return
+                        continue
+                started = time.perf_counter()
+                failed = False
+                # the sender may be gone, its action still runs
+                try:
+                    result = await action()
+                except Exception as error:
+                    failed = True
+                    if not future.done():
+                        future.set_exception(error)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+                actor_stats.record(wait=started - queued, run=time.perf_counter() - started, failed=failed)
+        finally:
+            actor_stats.actors.discard(self)
+
+    def close(self) -> None:
+        """rejects queued actions with ActorClosedError, the running one finishes
+        """
+        self.closed = True
+        while not self.mailbox.empty():
+            action, future, queued = self.mailbox.get_nowait()
+            if not future.done():
+                future.set_exception(ActorClosedError(self.name))
+
+
+actor_stats = ActorStats()
@@ -9,8 +9,10 @@ from app.utils.player import Player
 
 
 class Broadcaster:
-    def __init__(self, players: List[Player] = []):
-        self.players: List[Player] = players
+    __slots__ = ("players",)
+
+    def __init__(self, players: Optional[List[Player]] = None):
+        self.players: List[Player] = players if players is not None else []
 
     def get_player(self, player_id: UUID4) -> Optional[Player]:
         for player in self.players:
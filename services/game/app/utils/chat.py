@@ -23,6 +23,8 @@ class UserMessage(BaseModel):
 
 
 class Message:
+    __slots__ = ("player_id", "username", "message", "timestamp")
+
     def __init__(self, player_id: UUID4, username: str, message: str, timestamp: datetime = datetime.now()) -> None:
         self.player_id = player_id
         self.username = username
@@ -34,17 +36,23 @@ class Message:
     
 
 class Chat:
+    __slots__ = ("session_id",)
+
     def __init__(self, session_id: UUID4) -> None:
         self.session_id = session_id
 
+    @property
+    def key(self) -> str:
+        return f"message:{self.session_id}"
+
     async def send_message(self, message: UserMessage):
         message_data = message.__str__()
         async with r.pipeline(transaction=True) as pipe:
-            (await (pipe.rpush(f"message:{self.session_id}", message_data).execute()))
+            (await (pipe.rpush(self.key, message_data).execute()))
 
     async def get_all_messages(self):
         async with r.pipeline(transaction=True) as pipe:
-            messages = (await (pipe.lrange(f"message:{self.session_id}", 0, -1).execute()))[0]
+            messages = (await (pipe.lrange(self.key, 0, -1).execute()))[0]
             message_objects = []
             for message in messages:
                 message_str = message.split("::")
@@ -0,0 +1,165 @@
+import json
+import os
+from typing import BinaryIO, Dict, Iterator, Tuple
+
+import numpy as np
+
+
+# an export is a directory of raw little-endian column files and INDEX_FILE,
+# which holds the dtype and shape of every column. Hand columns have a row per
+# hand, player and action columns a row per dealt player and per action of all
+# hands in order, <players|actions>_offsets (one row more than hands) tell
+# where the rows of each hand start. Only numpy is needed to read it
+VERSION = 1
+INDEX_FILE = "index.json"
+NO_CARD = 255
+BOARD_CARDS = 5
+HOLE_CARDS = 4
+
+HAND_COLUMNS: Dict[str, Tuple[str, Tuple[int, ...]]] = {
+    "hand_id": ("<i8", ()),
+    "session_id": ("u1", (16,)),
+    "variant": ("u1", ()),
+    "small_blind": ("<f8", ()),
+    "big_blind": ("<f8", ()),
+    "pot": ("<f8", ()),
+    # microseconds since the epoch
+    "ended_at": ("<i8", ()),
+    # card indexes of the whole board dealt at the start of the hand, also when it ended
+    # before the river (its STREET actions tell how much was shown), NO_CARD pads a shorter one
+    "board": ("u1", (BOARD_CARDS,))
+}
+PLAYER_COLUMNS: Dict[str, Tuple[str, Tuple[int, ...]]] = {
+    "player_seat": ("u1", ()),
+    "player_id": ("u1", (16,)),
+    "player_hand": ("u1", (HOLE_CARDS,)),
+    "player_balance": ("<f8", ()),
+    "player_won": ("<f8", ())
+}
+# same values as app.utils.events.ACTION records: EventType value, seat
+# (255 for table events) and amount or street
+ACTION_COLUMNS: Dict[str, Tuple[str, Tuple[int, ...]]] = {
+    "action_type": ("u1", ()),
+    "action_seat": ("u1", ()),
+    "action_amount": ("<f8", ())
+}
+OFFSET_COLUMNS = ("players_offsets", "actions_offsets")
+# layout of one packed action record as HandHistory.actions stores it
+ACTION_RECORD = np.dtype([("type", "u1"), ("seat", "u1"), ("amount", "<f8")])
+
+
+class ColumnWriter:
+    """appends batches of hands to the column files of an export directory,
+    close writes the index
+    """
+
+    def __init__(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.columns = {**HAND_COLUMNS, **PLAYER_COLUMNS, **ACTION_COLUMNS}
+        self.files: Dict[str, BinaryIO] = {
+            name: open(os.path.join(directory, f"{name}.bin"), "wb")
+            for name in [*self.columns, *OFFSET_COLUMNS]
+        }
+        self.hands = 0
+        self.players = 0
+        self.actions = 0
+        np.zeros(1, dtype="<i8").tofile(self.files["players_offsets"])
+        np.zeros(1, dtype="<i8").tofile(self.files["actions_offsets"])
+
+    def append(self, columns: Dict[str, np.ndarray], players_per_hand: np.ndarray, actions_per_hand: np.ndarray) -> None:
+        """writes one batch
+
+        Args:
+            columns (Dict[str, np.ndarray]): every hand, player and action column of the batch
+            players_per_hand (np.ndarray): dealt players of each hand of the batch
+            actions_per_hand (np.ndarray): actions of each hand of the batch
+        """
+        for name, (dtype, shape) in self.columns.items():
+            np.ascontiguousarray(columns[name], dtype=dtype).tofile(self.files[name])
+        (self.players + np.cumsum(players_per_hand, dtype="<i8")).tofile(self.files["players_offsets"])
+        (self.actions + np.cumsum(actions_per_hand, dtype="<i8")).tofile(self.files["actions_offsets"])
+        self.hands += len(players_per_hand)
+        self.players += int(np.sum(players_per_hand))
+        self.actions += int(np.sum(actions_per_hand))
+
+    def close(self) -> dict:
+        """closes the column files and writes INDEX_FILE
+
+        Returns:
+            dict: the index
+        """
+        for file in self.files.values():
+            file.close()
+        rows = {
+            **dict.fromkeys(HAND_COLUMNS, self.hands),
+            **dict.fromkeys(PLAYER_COLUMNS, self.players),
+            **dict.fromkeys(ACTION_COLUMNS, self.actions),
+            **dict.fromkeys(OFFSET_COLUMNS, self.hands + 1)
+        }
+        dtypes = {**self.columns, **dict.fromkeys(OFFSET_COLUMNS, ("<i8", ()))}
+        index = {
+            "version": VERSION,
+            "hands": self.hands,
+            "players": self.players,
+            "actions": self.actions,
+            "columns": {
+                name: {"dtype": dtype, "shape": [rows[name], *shape]}
+                for name, (dtype, shape) in dtypes.items()
+            }
+        }
+        with open(os.path.join(self.directory, INDEX_FILE), "w") as file:
+            json.dump(index, file, indent=2)
+        return index
+
+
+class HandColumns:
+    """read-only memory maps of an export directory, columns are numpy arrays
+    whose pages are read when a computation touches them
+
+        hands = HandColumns("hands/")
+        for chunk in hands.chunks():
+            np.bincount(chunk["action_type"], minlength=14)
+    """
+
+    def __init__(self, directory: str) -> None:
+        with open(os.path.join(directory, INDEX_FILE)) as file:
+            self.index = json.load(file)
+        if self.index["version"] != VERSION:
+            raise ValueError(f"export version {self.index['version']} is not {VERSION}")
+        self.columns: Dict[str, np.ndarray] = {}
+        for name, column in self.index["columns"].items():
+            shape = tuple(column["shape"])
+            if shape[0] == 0:
+                # an empty file can not be mapped
+                self.columns[name] = np.empty(shape, dtype=column["dtype"])
+            else:
+                self.columns[name] = np.memmap(os.path.join(directory, f"{name}.bin"), dtype=column["dtype"], mode="r", shape=shape)
+
+    def __len__(self) -> int:
+        return self.index["hands"]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def chunks(self, size: int = 1_000_000) -> Iterator[Dict[str, np.ndarray]]:
+        """views of <size> hands at a time, with their players and actions
+
+        Args:
+            size (int, optional): hands per chunk. Defaults to 1_000_000.
+
+        Yields:
+            Dict[str, np.ndarray]: every column sliced to the chunk, offsets start at 0
+                and have a row more than the chunk has hands
+        """
+        players_offsets, actions_offsets = self.columns["players_offsets"], self.columns["actions_offsets"]
+        for start in range(0, len(self), size):
+            stop = min(start + size, len(self))
+            players = slice(int(players_offsets[start]), int(players_offsets[stop]))
+            actions = slice(int(actions_offsets[start]), int(actions_offsets[stop]))
+            chunk = {name: self.columns[name][start:stop] for name in HAND_COLUMNS}
+            chunk.update({name: self.columns[name][players] for name in PLAYER_COLUMNS})
+            chunk.update({name: self.columns[name][actions] for name in ACTION_COLUMNS})
+            chunk["players_offsets"] = players_offsets[start:stop + 1] - players.start
+            chunk["actions_offsets"] = actions_offsets[start:stop + 1] - actions.start
+            yield chunk
@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+import secrets
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from app.utils.evaluator import STANDARD_RULES, SHORT_DECK_RULES
+from app import settings
+
+
+SEED_BYTES = 16
+STANDARD_CARDS = STANDARD_RULES.cards
+SHORT_DECK_CARDS = SHORT_DECK_RULES.cards
+
+
+def shuffle(seed: bytes, cards: bytes) -> bytes:
+    """deterministic Fisher-Yates shuffle driven by the SHAKE-256 stream of <seed>,
+    the same seed always gives the same deck so hands can be replayed
+
+    Args:
+        seed (bytes): hand seed
+        cards (bytes): card indices in their initial order
+
+    Returns:
+        bytes: shuffled card indices
+    """
+    order = bytearray(cards)
+    # 4 bytes per draw, rejections are rare enough for a double-size stream
+    stream = hashlib.shake_256(seed).digest(8 * len(order))
+    position = 0
+    for i in range(len(order) - 1, 0, -1):
+        bound = i + 1
+        limit = (1 << 32) - (1 << 32) % bound
+        while True:
+            if position + 4 > len(stream):
+                stream += hashlib.shake_256(seed + len(stream).to_bytes(4, "big")).digest(8 * len(order))
+            value = int.from_bytes(stream[position:position + 4], "big")
+            position += 4
+            if value < limit:
+                break
+        j = value % bound
+        order[i], order[j] = order[j], order[i]
+    return bytes(order)
+
+
+class DeckPool:
+    """pool of pre-shuffled decks, each one with its own CSPRNG seed.
+    Drawing takes a ready deck, refilling runs in the background in small batches
+    """
+
+    def __init__(self, cards: bytes = STANDARD_CARDS, size: int = None, batch: int = None) -> None:
+        self.cards = cards
+        self.size = size or settings.DECK_POOL_SIZE
+        self.batch = batch or settings.DECK_POOL_REFILL_BATCH
+        self.decks: Deque[Tuple[bytes, bytes]] = deque()
+        self.refill_task: Optional[asyncio.Task] = None
+
+    def make(self) -> Tuple[bytes, bytes]:
+        seed = secrets.token_bytes(SEED_BYTES)
+        return seed, shuffle(seed, self.cards)
+
+    def fill(self) -> None:
+        while len(self.decks) < self.size:
+            self.decks.append(self.make())
+
+    def draw(self) -> Tuple[bytes, bytes]:
+        """takes a shuffled deck
+
+        Returns:
+            Tuple[bytes, bytes]: seed and shuffled card indices
+        """
+        deck = self.decks.popleft() if self.decks else self.make()
+        if len(self.decks) < self.size // 2:
+            self.schedule_refill()
+        return deck
+
+    def schedule_refill(self) -> None:
+        if self.refill_task is not None and not self.refill_task.done():
+            return
+        try:
+            self.refill_task = asyncio.get_running_loop().create_task(self.refill())
+        except RuntimeError:
+            self.fill()
+
+    async def refill(self) -> None:
+        while len(self.decks) < self.size:
+            for _ in range(self.batch):
+                self.decks.append(self.make())
+            await asyncio.sleep(0)
+
+
+deck_pool = DeckPool()
+short_deck_pool = DeckPool(cards=SHORT_DECK_CARDS)
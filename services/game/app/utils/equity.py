@@ -0,0 +1,296 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain, combinations
+from math import comb
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.evaluator import evaluator
+from app.utils.preflop import load_table
+from app import settings
+
+
+DECK_SIZE = 52
+BOARD_SIZE = 5
+
+
+def _init_worker() -> None:
+    evaluator.prepare()
+
+
+def _validate(hole: List[int], board: List[int], opponents: int) -> None:
+    known = hole + board
+    if len(hole) != 2:
+        raise ValueError("two hole cards are required")
+    if len(board) > BOARD_SIZE or len(board) in (1, 2):
+        raise ValueError("board must contain 0, 3, 4 or 5 cards")
+    if len(set(known)) != len(known) or any(card < 0 or card >= DECK_SIZE for card in known):
+        raise ValueError("cards must be distinct")
+    if opponents < 1 or len(known) + 2 * opponents + BOARD_SIZE - len(board) > DECK_SIZE:
+        raise ValueError("incorrect number of opponents")
+
+
+def _validate_samples(samples: Optional[int]) -> None:
+    if samples is not None and (isinstance(samples, bool) or not isinstance(samples, int) or samples < 1):
+        raise ValueError("samples must be a positive integer")
+
+
+def simulate_equity(
+    hole: List[int],
+    board: List[int],
+    opponents: int,
+    samples: int,
+    time_budget: float,
+    confidence_half_width: float,
+    seed: Optional[int] = None
+) -> dict:
+    """Monte Carlo equity of hole cards against random opponents' hands.
+    Runs in a worker process, stops after <samples> runouts, after <time_budget>
+    seconds or when the confidence interval of equity is narrow enough.
+
+    Args:
+        hole (List[int]): hero hole card indices
+        board (List[int]): known board card indices
+        opponents (int): number of opponents
+        samples (int): max number of simulated runouts
+        time_budget (float): max simulation time in seconds
+        confidence_half_width (float): stop when equity is known within +- this value
+        seed (Optional[int], optional): random generator seed. Defaults to None.
+
+    Raises:
+        ValueError: samples is not positive
+
+    Returns:
+        dict: win/tie/equity fractions and simulation stats
+    """
+    if samples < 1:
+        raise ValueError("samples must be a positive integer")
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    known = set(hole + board)
+    deck = np.array([card for card in range(DECK_SIZE) if card not in known], dtype=np.int8)
+    missing = BOARD_SIZE - len(board)
+    drawn = missing + 2 * opponents
+
+    done = 0
+    wins = 0
+    ties = 0
+    equity_sum = 0.0
+    equity_squares = 0.0
+    half_width = math.inf
+    while done < samples:
+        size = min(settings.EQUITY_CHUNK, samples - done)
+        picks = np.argpartition(rng.random((size, len(deck))), drawn - 1, axis=1)[:, :drawn]
+        cards = deck[picks]
+        runouts = np.concatenate([np.broadcast_to(np.array(board, dtype=np.int8), (size, len(board))), cards[:, :missing]], axis=1)
+        hero = evaluator.evaluate_batch(np.concatenate([np.broadcast_to(np.array(hole, dtype=np.int8), (size, 2)), runouts], axis=1))
+        villains = np.stack([
+            evaluator.evaluate_batch(np.concatenate([cards[:, missing + 2 * i:missing + 2 * i + 2], runouts], axis=1))
+            for i in range(opponents)
+        ], axis=1)
+        best = villains.max(axis=1)
+        won = hero > best
+        tied = hero == best
+        shares = np.where(won, 1.0, np.where(tied, 1.0 / (1 + (villains == best[:, None]).sum(axis=1)), 0.0))
+
+        done += size
+        wins += int(won.sum())
+        ties += int(tied.sum())
+        equity_sum += float(shares.sum())
+        equity_squares += float((shares ** 2).sum())
+        mean = equity_sum / done
+        variance = max(equity_squares / done - mean ** 2, 0.0)
+        half_width = settings.EQUITY_CONFIDENCE_Z * math.sqrt(variance / done)
+        if half_width <= confidence_half_width or time.perf_counter() - started >= time_budget:
+            break
+
+    return {
+        "win": wins / done,
+        "tie": ties / done,
+        "equity": equity_sum / done,
+        "samples": done,
+        "confidence_half_width": half_width,
+        "elapsed": time.perf_counter() - started
+    }
+
+
+def enumerate_equity(holes: List[List[int]], board: List[int], first_cards: Optional[List[int]] = None) -> dict:
+    """exact showdown counters over every board runout.
+    Runs in a worker process for one share of runouts: the ones whose lowest
+    undealt card is in <first_cards>.
+
+    Args:
+        holes (List[List[int]]): hole card indices of every player
+        board (List[int]): known board card indices
+        first_cards (Optional[List[int]], optional): lowest undealt cards to enumerate. Defaults to all.
+
+    Returns:
+        dict: runouts count and per-player wins, ties and equity shares
+    """
+    known = set(board).union(*holes)
+    deck = [card for card in range(DECK_SIZE) if card not in known]
+    missing = BOARD_SIZE - len(board)
+    if missing == 0:
+        runouts = np.zeros((1, 0), dtype=np.int8)
+    else:
+        first_cards = deck if first_cards is None else first_cards
+        parts = []
+        for first in first_cards:
+            rest = [card for card in deck if card > first]
+            flat = np.fromiter(chain.from_iterable(combinations(rest, missing - 1)), dtype=np.int8)
+            part = np.empty((comb(len(rest), missing - 1), missing), dtype=np.int8)
+            part[:, 0] = first
+            part[:, 1:] = flat.reshape(len(part), missing - 1)
+            parts.append(part)
+        runouts = np.concatenate(parts) if parts else np.zeros((0, missing), dtype=np.int8)
+    size = len(runouts)
+    boards = np.concatenate([np.broadcast_to(np.array(board, dtype=np.int8), (size, len(board))), runouts], axis=1)
+    strengths = np.stack([
+        evaluator.evaluate_batch(np.concatenate([np.broadcast_to(np.array(hole, dtype=np.int8), (size, len(hole))), boards], axis=1))
+        for hole in holes
+    ], axis=1)
+    best = strengths.max(axis=1)
+    winners = strengths == best[:, None]
+    winners_count = winners.sum(axis=1)
+    return {
+        "runouts": size,
+        "wins": (winners & (winners_count == 1)[:, None]).sum(axis=0).tolist(),
+        "ties": (winners & (winners_count > 1)[:, None]).sum(axis=0).tolist(),
+        "shares": (winners / winners_count[:, None]).sum(axis=0).tolist()
+    }
+
+
+def _merge_counters(parts: List[dict], players: int) -> dict:
+    merged = {"runouts": 0, "wins": [0] * players, "ties": [0] * players, "shares": [0.0] * players}
+    for part in parts:
+        merged["runouts"] += part["runouts"]
+        for key in ("wins", "ties", "shares"):
+            merged[key] = [total + value for total, value in zip(merged[key], part[key])]
+    return merged
+
+
+_exact_cache: "OrderedDict[Tuple, List[dict]]" = OrderedDict()
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.EQUITY_WORKERS, initializer=_init_worker)
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def calculate_equity(
+    hole: List[int],
+    board: List[int],
+    opponents: int,
+    samples: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    confidence_half_width: Optional[float] = None
+) -> dict:
+    """runs simulate_equity in the process pool without blocking the event loop,
+    preflop equity comes from the precomputed table when it covers the request
+
+    Raises:
+        ValueError: incorrect cards, opponents count or samples
+
+    Returns:
+        dict: simulate_equity result
+    """
+    _validate(hole=hole, board=board, opponents=opponents)
+    _validate_samples(samples)
+    preflop_table = load_table() if not board else None
+    if preflop_table is not None and opponents <= preflop_table.max_opponents:
+        result = preflop_table.get(hole=hole, opponents=opponents)
+        result.update({
+            "samples": preflop_table.samples,
+            "confidence_half_width": settings.EQUITY_CONFIDENCE_Z * math.sqrt(0.25 / preflop_table.samples),
+            "elapsed": 0.0
+        })
+        return result
+    samples = min(samples or settings.EQUITY_DEFAULT_SAMPLES, settings.EQUITY_MAX_SAMPLES)
+    time_budget = min(time_budget or settings.EQUITY_TIME_BUDGET, settings.EQUITY_MAX_TIME_BUDGET)
+    confidence_half_width = confidence_half_width or settings.EQUITY_CONFIDENCE_HALF_WIDTH
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(),
+        partial(
+            simulate_equity,
+            hole=hole,
+            board=board,
+            opponents=opponents,
+            samples=samples,
+            time_budget=time_budget,
+            confidence_half_width=confidence_half_width
+        )
+    )
+
+
+async def calculate_exact_equity(holes: List[List[int]], board: List[int]) -> List[dict]:
+    """exact equity of every player when no more betting is possible.
+    Small enumerations (turn, flop) run in place, bigger ones are split across
+    the process pool by the lowest undealt card. Results are cached.
+
+    Args:
+        holes (List[List[int]]): hole card indices of every player
+        board (List[int]): known board card indices
+
+    Raises:
+        ValueError: incorrect cards
+
+    Returns:
+        List[dict]: win/tie/equity fractions of each player
+    """
+    key = (tuple(tuple(sorted(hole)) for hole in holes), tuple(sorted(board)))
+    cached = _exact_cache.get(key)
+    if cached is not None:
+        _exact_cache.move_to_end(key)
+        return cached
+
+    known = board + [card for hole in holes for card in hole]
+    if len(holes) < 2 or len(board) > BOARD_SIZE or len(set(known)) != len(known):
+        raise ValueError("incorrect cards for exact equity")
+    deck = [card for card in range(DECK_SIZE) if card not in known]
+    missing = BOARD_SIZE - len(board)
+    if comb(len(deck), missing) <= settings.EXACT_EQUITY_INLINE_RUNOUTS:
+        counters = enumerate_equity(holes=holes, board=board)
+    else:
+        # lowest cards own the most runouts, deal them round robin over the tasks
+        first_cards = deck[:len(deck) - missing + 1]
+        tasks = settings.EQUITY_WORKERS * 4
+        loop = asyncio.get_running_loop()
+        parts = await asyncio.gather(*[
+            loop.run_in_executor(
+                get_executor(),
+                partial(enumerate_equity, holes=holes, board=board, first_cards=first_cards[task::tasks])
+            )
+            for task in range(min(tasks, len(first_cards)))
+        ])
+        counters = _merge_counters(parts=parts, players=len(holes))
+
+    runouts = counters["runouts"]
+    result = [
+        {
+            "win": counters["wins"][index] / runouts,
+            "tie": counters["ties"][index] / runouts,
+            "equity": counters["shares"][index] / runouts
+        }
+        for index in range(len(holes))
+    ]
+    _exact_cache[key] = result
+    if len(_exact_cache) > settings.EXACT_EQUITY_CACHE_SIZE:
+        _exact_cache.popitem(last=False)
+    return result
@@ -0,0 +1,395 @@
+from functools import cached_property
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# card encoding: index = rank_index * 4 + suit_index
+RANKS = ('2', '3', '4', '5', '6', '7', '8', '9', '10', 'jack', 'queen', 'king', 'ace')
+SUITS = ('hearts', 'diamonds', 'clubs', 'spades')
+
+RANK_INDEX = {rank: index for index, rank in enumerate(RANKS)}
+SUIT_INDEX = {suit: index for index, suit in enumerate(SUITS)}
+
+# each rank contributes a base-5 digit, at most 4 cards of a rank can be present
+RANK_KEYS = tuple(5 ** rank for rank in range(len(RANKS)))
+# each suit contributes a 4-bit counter, a nibble above 4 means flush
+SUIT_KEYS = tuple(1 << (4 * suit) for suit in range(len(SUITS)))
+
+HIGH_CARD = 0
+ONE_PAIR = 1
+TWO_PAIR = 2
+THREE_OF_A_KIND = 3
+STRAIGHT = 4
+FLUSH = 5
+FULL_HOUSE = 6
+FOUR_OF_A_KIND = 7
+STRAIGHT_FLUSH = 8
+ROYAL_FLUSH = 9
+
+CATEGORY_NAMES = (
+    "high_card",
+    "one_pair",
+    "two_pair",
+    "three_of_a_kind",
+    "straight",
+    "flush",
+    "full_house",
+    "four_of_a_kind",
+    "straight_flush",
+    "royal_flush"
+)
+
+CATEGORY_SHIFT = 20
+
+
+class Rules:
+    """ranking rules the evaluator tables are generated from
+
+    Args:
+        ranks (Sequence[int]): rank indices present in the deck, consecutive
+        order (Sequence[int]): hand categories from the weakest to the strongest
+    """
+
+    def __init__(self, ranks: Sequence[int], order: Sequence[int]) -> None:
+        self.ranks = tuple(ranks)
+        self.order = tuple(order)
+        self.tiers = {hand_category: tier for tier, hand_category in enumerate(self.order)}
+
+    @property
+    def cards(self) -> bytes:
+        return bytes(rank * 4 + suit for rank in self.ranks for suit in range(len(SUITS)))
+
+
+STANDARD_RULES = Rules(ranks=range(len(RANKS)), order=range(len(CATEGORY_NAMES)))
+# 6+ hold'em: 2-5 removed, a flush is rarer than a full house and beats it
+SHORT_DECK_RULES = Rules(
+    ranks=range(RANK_INDEX['6'], len(RANKS)),
+    order=(
+        HIGH_CARD,
+        ONE_PAIR,
+        TWO_PAIR,
+        THREE_OF_A_KIND,
+        STRAIGHT,
+        FULL_HOUSE,
+        FLUSH,
+        FOUR_OF_A_KIND,
+        STRAIGHT_FLUSH,
+        ROYAL_FLUSH
+    )
+)
+
+
+def card_index(rank: str, suit: str) -> int:
+    return RANK_INDEX[rank] * 4 + SUIT_INDEX[suit]
+
+
+_HASH_BITS = 18
+_HASH_SIZE = 1 << _HASH_BITS
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _hash_slot(key):
+    # fibonacci hashing, works for python ints and int64 arrays alike
+    hashed = (np.asarray(key, dtype=np.uint64) * _HASH_MULTIPLIER) >> np.uint64(64 - _HASH_BITS)
+    return hashed.astype(np.intp)
+
+
+def omaha_combinations(hole: List[int], board: List[int]) -> List[List[int]]:
+    """every 5-card hand of two hole cards and three board cards
+
+    Args:
+        hole (List[int]): hole card indices
+        board (List[int]): board card indices
+
+    Returns:
+        List[List[int]]: 60 card lists for 4 hole cards and 5 board cards
+    """
+    return [list(pair) + list(triple) for pair in combinations(hole, 2) for triple in combinations(board, 3)]
+
+
+def category(strength: int) -> int:
+    """extracts hand category (HIGH_CARD ... ROYAL_FLUSH) from hand strength
+
+    Args:
+        strength (int): value returned by Evaluator.evaluate with standard rules
+
+    Returns:
+        int: hand category
+    """
+    return strength >> CATEGORY_SHIFT
+
+
+def _score(rules: Rules, category: int, kickers: Iterable[int]) -> int:
+    value = rules.tiers[category] << CATEGORY_SHIFT
+    shift = CATEGORY_SHIFT
+    for kicker in kickers:
+        shift -= 4
+        value |= kicker << shift
+    return value
+
+
+def _straights(rules: Rules) -> List[Tuple[int, int]]:
+    # (rank mask, highest rank) ordered from the best straight to the wheel,
+    # the wheel is the ace played below the lowest four ranks
+    low, ace = rules.ranks[0], rules.ranks[-1]
+    straights = [(0b11111 << start, start + 4) for start in range(ace - 4, low - 1, -1)]
+    straights.append(((1 << ace) | (0b1111 << low), low + 3))
+    return straights
+
+
+def _straight_high(mask: int, straights: List[Tuple[int, int]]) -> Optional[int]:
+    for straight_mask, high in straights:
+        if mask & straight_mask == straight_mask:
+            return high
+    return None
+
+
+def _ranks_desc(mask: int) -> List[int]:
+    return [rank for rank in range(len(RANKS) - 1, -1, -1) if mask & (1 << rank)]
+
+
+def _flush_table(rules: Rules) -> List[int]:
+    straights = _straights(rules)
+    table = [0] * (1 << len(RANKS))
+    for mask in range(len(table)):
+        ranks = _ranks_desc(mask)
+        if len(ranks) < 5:
+            continue
+        high = _straight_high(mask, straights)
+        if high is None:
+            table[mask] = _score(rules, FLUSH, ranks[:5])
+        elif high == RANK_INDEX['ace']:
+            table[mask] = _score(rules, ROYAL_FLUSH, [high])
+        else:
+            table[mask] = _score(rules, STRAIGHT_FLUSH, [high])
+    return table
+
+
+def _rank_counts(max_cards: int, ranks: Sequence[int]):
+    counts = [0] * len(RANKS)
+
+    def walk(rank: int, total: int):
+        if rank < 0:
+            if total >= 5:
+                yield counts
+            return
+        most = min(4, max_cards - total) if rank in ranks else 0
+        for count in range(most + 1):
+            counts[rank] = count
+            yield from walk(rank - 1, total + count)
+        counts[rank] = 0
+
+    yield from walk(len(RANKS) - 1, 0)
+
+
+def _best_without_flush(counts: List[int], rules: Rules, straights: List[Tuple[int, int]]) -> int:
+    order = range(len(RANKS) - 1, -1, -1)
+    present = [rank for rank in order if counts[rank]]
+    quads = [rank for rank in order if counts[rank] >= 4]
+    trips = [rank for rank in order if counts[rank] >= 3]
+    pairs = [rank for rank in order if counts[rank] >= 2]
+
+    if quads:
+        kicker = [rank for rank in present if rank != quads[0]][:1]
+        return _score(rules, FOUR_OF_A_KIND, [quads[0]] + kicker)
+    # a full house and a straight can both be made from 7 cards,
+    # the tier order decides which one counts
+    candidates = []
+    if trips and len(pairs) >= 2:
+        pair = [rank for rank in pairs if rank != trips[0]][0]
+        candidates.append(_score(rules, FULL_HOUSE, [trips[0], pair]))
+    mask = sum(1 << rank for rank in present)
+    high = _straight_high(mask, straights)
+    if high is not None:
+        candidates.append(_score(rules, STRAIGHT, [high]))
+    if candidates:
+        return max(candidates)
+    if trips:
+        kickers = [rank for rank in present if rank != trips[0]][:2]
+        return _score(rules, THREE_OF_A_KIND, [trips[0]] + kickers)
+    if len(pairs) >= 2:
+        kicker = [rank for rank in present if rank not in pairs[:2]][:1]
+        return _score(rules, TWO_PAIR, pairs[:2] + kicker)
+    if pairs:
+        kickers = [rank for rank in present if rank != pairs[0]][:3]
+        return _score(rules, ONE_PAIR, [pairs[0]] + kickers)
+    return _score(rules, HIGH_CARD, present[:5])
+
+
+class Evaluator:
+    """best-five-cards evaluator for 5, 6 or 7 cards.
+
+    Cards are integer indices (see card_index). A hand is scored with one probe
+    into a precomputed table: the 13-bit rank mask of a suit holding five or more
+    cards indexes the flush table, every other hand is found in the rank table by
+    the base-5 sum of its rank counts. Bigger strength means better hand.
+    evaluate_batch does the same for a whole numpy array of hands.
+
+    Both tables are generated from <rules>, so other decks and category orders
+    cost the same per hand as standard hold'em.
+    """
+
+    def __init__(self, max_cards: int = 7, rules: Rules = STANDARD_RULES) -> None:
+        self.max_cards = max_cards
+        self.rules = rules
+
+    @cached_property
+    def flush_table(self) -> List[int]:
+        return _flush_table(self.rules)
+
+    @cached_property
+    def rank_table(self) -> Dict[int, int]:
+        straights = _straights(self.rules)
+        table = {}
+        for counts in _rank_counts(self.max_cards, self.rules.ranks):
+            key = sum(count * RANK_KEYS[rank] for rank, count in enumerate(counts))
+            table[key] = _best_without_flush(counts, self.rules, straights)
+        return table
+
+    @cached_property
+    def flush_array(self) -> np.ndarray:
+        return np.array(self.flush_table, dtype=np.int32)
+
+    @cached_property
+    def rank_hash(self) -> Tuple[np.ndarray, np.ndarray]:
+        # open addressing table over rank keys, linear probing on collision
+        keys = np.fromiter(self.rank_table.keys(), dtype=np.int64, count=len(self.rank_table))
+        values = np.fromiter(self.rank_table.values(), dtype=np.int32, count=len(self.rank_table))
+        slot_keys = np.full(_HASH_SIZE, -1, dtype=np.int64)
+        slot_values = np.zeros(_HASH_SIZE, dtype=np.int32)
+        pending = np.arange(len(keys))
+        slots = _hash_slot(keys)
+        while len(pending):
+            free = pending[slot_keys[slots[pending]] == -1]
+            taken, first = np.unique(slots[free], return_index=True)
+            slot_keys[taken] = keys[free[first]]
+            slot_values[taken] = values[free[first]]
+            pending = pending[slot_keys[slots[pending]] != keys[pending]]
+            slots[pending] = (slots[pending] + 1) & (_HASH_SIZE - 1)
+        return slot_keys, slot_values
+
+    def prepare(self) -> None:
+        """builds lookup tables ahead of the first showdown
+        """
+        self.flush_table
+        self.rank_table
+        self.flush_array
+        self.rank_hash
+
+    def category(self, strength: int) -> int:
+        """hand category (HIGH_CARD ... ROYAL_FLUSH) of a strength scored with these rules
+
+        Args:
+            strength (int): value returned by evaluate
+
+        Returns:
+            int: hand category
+        """
+        return self.rules.order[strength >> CATEGORY_SHIFT]
+
+    def evaluate(self, cards: Iterable[int]) -> int:
+        """scores 5, 6 or 7 cards
+
+        Args:
+            cards (Iterable[int]): card indices
+
+        Returns:
+            int: comparable hand strength
+        """
+        flush_table = self.flush_table
+        key = 0
+        suit_masks = [0, 0, 0, 0]
+        for card in cards:
+            key += RANK_KEYS[card >> 2]
+            suit_masks[card & 3] |= 1 << (card >> 2)
+        for mask in suit_masks:
+            strength = flush_table[mask]
+            if strength:
+                return strength
+        return self.rank_table[key]
+
+    def evaluate_omaha(self, hole: List[int], board: List[int]) -> int:
+        """scores an Omaha hand: exactly two hole cards and three board cards
+
+        Args:
+            hole (List[int]): four hole card indices
+            board (List[int]): five board card indices
+
+        Returns:
+            int: comparable hand strength
+        """
+        return max(self.evaluate(cards) for cards in omaha_combinations(hole=hole, board=board))
+
+    def evaluate_omaha_batch(self, holes: np.ndarray, boards: np.ndarray) -> np.ndarray:
+        """scores many Omaha hands at once, all 60 combinations of each in one batch
+
+        Args:
+            holes (np.ndarray): (N, 4) array of hole card indices
+            boards (np.ndarray): (N, 5) array of board card indices
+
+        Returns:
+            np.ndarray: (N,) int32 array of hand strengths
+        """
+        holes = np.asarray(holes)
+        boards = np.asarray(boards)
+        cards = np.concatenate([holes[:, _OMAHA_HOLE_PAIRS], boards[:, _OMAHA_BOARD_TRIPLES]], axis=2)
+        return self.evaluate_batch(cards.reshape(-1, 5)).reshape(len(holes), -1).max(axis=1)
+
+    def evaluate_batch(self, cards: np.ndarray) -> np.ndarray:
+        """scores many hands at once
+
+        Args:
+            cards (np.ndarray): (N, 5), (N, 6) or (N, 7) array of card indices
+
+        Raises:
+            ValueError: a row is not a hand of these rules, like repeated cards
+                or short deck cards below six
+
+        Returns:
+            np.ndarray: (N,) int32 array of hand strengths, same scale as evaluate
+        """
+        cards = np.asarray(cards, dtype=np.intp)
+        packed = _CARD_KEYS[cards].sum(axis=1)
+        keys = packed & 0xFFFFFFFF
+        suit_counts = packed >> 32
+
+        slot_keys, slot_values = self.rank_hash
+        slots = _hash_slot(keys)
+        misses = np.flatnonzero(slot_keys[slots] != keys)
+        while len(misses):
+            # an empty slot ends the probe, the rank key is not in the table
+            unknown = misses[slot_keys[slots[misses]] == -1]
+            if len(unknown):
+                raise ValueError(f"cards {cards[unknown[0]].tolist()} are not a hand")
+            slots[misses] = (slots[misses] + 1) & (_HASH_SIZE - 1)
+            misses = misses[slot_keys[slots[misses]] != keys[misses]]
+        strengths = slot_values[slots]
+
+        # +3 carries a nibble into its high bit only when the suit has 5+ cards
+        flushed = np.flatnonzero((suit_counts + 0x3333) & 0x8888)
+        if len(flushed):
+            flush_counts = suit_counts[flushed]
+            flush_suits = np.zeros(len(flushed), dtype=np.intp)
+            for suit in range(1, len(SUITS)):
+                flush_suits[((flush_counts >> (4 * suit)) & 0xF) >= 5] = suit
+            hands = cards[flushed]
+            suited = (hands & 3) == flush_suits[:, None]
+            masks = np.where(suited, 1 << (hands >> 2), 0).sum(axis=1)
+            strengths[flushed] = self.flush_array[masks]
+        return strengths
+
+
+# (6 * 10) pairs and triples of positions, broadcast against each other
+_OMAHA_HOLE_PAIRS = np.repeat(np.array(list(combinations(range(4), 2))), 10, axis=0).reshape(60, 2)
+_OMAHA_BOARD_TRIPLES = np.tile(np.array(list(combinations(range(5), 3))), (6, 1))
+
+# rank key in the low 32 bits, suit counters in the high ones, summed in one pass
+_CARD_KEYS = np.array(
+    [RANK_KEYS[card >> 2] | (SUIT_KEYS[card & 3] << 32) for card in range(len(RANKS) * len(SUITS))],
+    dtype=np.int64
+)
+
+evaluator = Evaluator()
+short_deck_evaluator = Evaluator(rules=SHORT_DECK_RULES)
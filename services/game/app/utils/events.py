@@ -0,0 +1,169 @@
+import struct
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from pydantic import UUID4
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from app.utils import snapshot
+from app import settings
+
+
+# every commit of a session appends one entry to the stream of its table. The
+# entry id is "<revision>-0", so the entries a snapshot misses are the ones with
+# bigger ids. An entry holds what the commit did in ACTIONS_FIELD and every
+# encoded field that changed: "s:<name>" of the session, "p:<player id>:<name>"
+# of players. The revision is left out, it is the id. Values are absolute, so
+# replaying the entries after a snapshot on top of it rebuilds the last commit
+ACTIONS_FIELD = "a"
+SESSION_PREFIX = "s:"
+PLAYER_PREFIX = "p:"
+# event type, seat (NO_SEAT for table events) and amount or street
+ACTION = struct.Struct("<BBd")
+NO_SEAT = 255
+
+
+class EventType(Enum):
+    DEAL = 1
+    BLIND = 2
+    BET = 3
+    CALL = 4
+    RAISE = 5
+    FOLD = 6
+    CHECK = 7
+    STREET = 8
+    SHOWDOWN = 9
+    PAYOUT = 10
+    JOIN = 11
+    LEAVE = 12
+    SEAT = 13
+
+
+Event = Tuple[EventType, Optional[int], float]
+Entry = Tuple[bytes, Dict[bytes, bytes]]
+
+
+class EventLogError(Exception):
+    """entries between the snapshot and the last commit are missing, SESSION_EVENTS_MAXLEN trimmed them"""
+
+
+def events_key(session_id: UUID4) -> str:
+    return f"events:{session_id}"
+
+
+def entry_revision(entry_id: bytes) -> int:
+    return int(entry_id.split(b"-")[0])
+
+
+def encode_entry(actions: List[Event], session_fields: Dict[str, bytes], player_fields: Dict[UUID4, Dict[str, bytes]]) -> Dict[str, bytes]:
+    """stream entry of one commit
+
+    Args:
+        actions (List[Event]): events recorded by the actions of the commit
+        session_fields (Dict[str, bytes]): encoded session fields that changed
+        player_fields (Dict[UUID4, Dict[str, bytes]]): player id -> encoded fields that changed
+
+    Returns:
+        Dict[str, bytes]: XADD fields
+    """
+    entry = {
+        ACTIONS_FIELD: b"".join(
+            ACTION.pack(event.value, NO_SEAT if seat is None else seat, value)
+            for event, seat, value in actions
+        )
+    }
+    for name, value in session_fields.items():
+        if name != snapshot.REVISION_FIELD:
+            entry[SESSION_PREFIX + name] = value
+    for player_id, fields in player_fields.items():
+        for name, value in fields.items():
+            entry[f"{PLAYER_PREFIX}{player_id.hex}:{name}"] = value
+    return entry
+
+
+def decode_actions(data: bytes) -> List[dict]:
+    return [
+        {"type": EventType(event), "seat": None if seat == NO_SEAT else seat, "value": value}
+        for event, seat, value in ACTION.iter_unpack(data)
+    ]
+
+
+def queue_append(pipe: Pipeline, session_id: UUID4, revision: int, entry: Dict[str, bytes]) -> None:
+    """queues XADD of the entry of commit <revision>, the stream keeps about
+    SESSION_EVENTS_MAXLEN entries. Redis rejects an id that is not bigger than
+    the last one, so an entry is never written twice
+    """
+    pipe.xadd(
+        events_key(session_id),
+        entry,
+        id=f"{revision}-0",
+        maxlen=settings.SESSION_EVENTS_MAXLEN,
+        approximate=True
+    )
+
+
+def queue_read(pipe: Pipeline, session_id: UUID4, after: int) -> None:
+    pipe.xrange(events_key(session_id), min=f"{after + 1}-0")
+
+
+async def read(client: Redis, session_id: UUID4, after: int) -> List[Entry]:
+    """entries of the commits after revision <after>, oldest first
+
+    Args:
+        client (Redis): binary connection
+        session_id (UUID4): session uuid
+        after (int): revision of the snapshot
+
+    Returns:
+        List[Entry]: XRANGE result
+    """
+    return await client.xrange(events_key(session_id), min=f"{after + 1}-0")
+
+
+def replay(
+    fields: Dict[bytes, bytes],
+    players: Dict[UUID4, Dict[bytes, bytes]],
+    entries: List[Entry],
+    after: int,
+    until: int
+) -> List[dict]:
+    """applies the entries of revisions after <after> up to <until> on snapshot fields, in place
+
+    Args:
+        fields (Dict[bytes, bytes]): session hash fields written at revision <after>
+        players (Dict[UUID4, Dict[bytes, bytes]]): player id -> player hash fields
+        entries (List[Entry]): XRANGE result, entries out of the range are skipped
+        after (int): revision of the snapshot
+        until (int): revision of the last commit
+
+    Raises:
+        EventLogError: an entry of the range is missing
+
+    Returns:
+        List[dict]: events of the applied entries, oldest first
+    """
+    actions = []
+    expected = after + 1
+    for entry_id, entry in entries:
+        revision = entry_revision(entry_id)
+        if revision <= after:
+            continue
+        if revision > until:
+            break
+        if revision != expected:
+            raise EventLogError(f"entry {expected} is missing")
+        expected += 1
+        fields[snapshot.REVISION_FIELD.encode()] = snapshot.REVISION_CODEC[0](revision)
+        for name, value in entry.items():
+            if name.startswith(SESSION_PREFIX.encode()):
+                fields[name[len(SESSION_PREFIX):]] = value
+            elif name.startswith(PLAYER_PREFIX.encode()):
+                player_id, field = name[len(PLAYER_PREFIX):].split(b":", 1)
+                players.setdefault(UUID(player_id.decode()), {})[field] = value
+            else:
+                actions.extend(decode_actions(value))
+    if expected != until + 1:
+        raise EventLogError(f"entries {expected}-{until} are missing")
+    return actions
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Deque, List, Optional
+
+from tortoise import connections
+
+from app.models import HandHistory
+from app.utils.redis import binary_r
+from app.utils import events
+from app import settings
+
+
+logger = logging.getLogger(__name__)
+
+# HandHistory columns written by COPY, in the order of a row
+COLUMNS = (
+    "session_id", "hand_seed", "variant", "small_blind", "big_blind", "board",
+    "players", "actions", "pot", "first_revision", "last_revision", "ended_at"
+)
+
+
+class ArchiveStats:
+    """counters of the hand history archiver
+    """
+
+    def __init__(self) -> None:
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failed = 0
+        # flushes failed in a row, the archiver backs off while it is not 0
+        self.failing = 0
+        self.batch_seconds = 0.0
+
+    def dict(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "failed": self.failed,
+            "failing": self.failing,
+            "batch_ms": self.batch_seconds / self.batches * 1e3 if self.batches else None
+        }
+
+
+class HandArchiver:
+    """keeps finished hands in memory and copies them to hand_histories in batches.
+
+    submit only appends to a bounded queue, the action that ended a hand never
+    waits for Postgres. A batch is written once HAND_HISTORY_BATCH_SIZE hands are
+    queued or every HAND_HISTORY_FLUSH_INTERVAL seconds, with the actions of its
+    hands read from the table event logs in one pipeline and the rows sent with
+    one COPY. A batch that fails goes back to the front of the queue and is
+    retried after HAND_HISTORY_RETRY_DELAY, doubled after every failure in a row,
+    when the queue is full the oldest hands are dropped
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, interval: Optional[float] = None, max_queued: Optional[int] = None) -> None:
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_queued = max_queued
+        self.queue: Deque[dict] = deque()
+        self.wakeup: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+        self.stats = ArchiveStats()
+
+    def get_batch_size(self) -> int:
+        return settings.HAND_HISTORY_BATCH_SIZE if self.batch_size is None else self.batch_size
+
+    def get_interval(self) -> float:
+        return settings.HAND_HISTORY_FLUSH_INTERVAL if self.interval is None else self.interval
+
+    def get_max_queued(self) -> int:
+        return settings.HAND_HISTORY_MAX_QUEUED if self.max_queued is None else self.max_queued
+
+    def submit(self, record: dict) -> None:
+        """queues a finished hand
+
+        Args:
+            record (dict): Session.hand_record with "last_revision" set
+        """
+        if len(self.queue) >= self.get_max_queued():
+            self.queue.popleft()
+            self.stats.dropped += 1
+        self.queue.append(record)
+        self.stats.submitted += 1
+        # while Postgres fails the next attempt waits for its backoff
+        if self.wakeup is not None and not self.stats.failing and len(self.queue) >= self.get_batch_size():
+            self.wakeup.set()
+
+    def start(self) -> None:
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def get_retry_delay(self) -> float:
+        delay = settings.HAND_HISTORY_RETRY_DELAY * 2 ** (self.stats.failing - 1)
+        return min(delay, settings.HAND_HISTORY_MAX_RETRY_DELAY)
+
+    async def _run(self) -> None:
+        while True:
+            if self.stats.failing:
+                await asyncio.sleep(self.get_retry_delay())
+            else:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), self.get_interval())
+                except asyncio.TimeoutError:
+                    pass
+            self.wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                self.stats.failing += 1
+                logger.exception(
+                    "hand history batch failed, %s hands queued, retrying in %.1f s", len(self.queue), self.get_retry_delay()
+                )
+            else:
+                self.stats.failing = 0
+
+    async def flush(self) -> None:
+        """writes queued hands batch by batch until the queue is empty
+        """
+        while self.queue:
+            await self.write_batch()
+
+    async def write_batch(self) -> int:
+        """writes the oldest queued hands, at most HAND_HISTORY_BATCH_SIZE
+
+        Returns:
+            int: hands written
+        """
+        batch = [self.queue.popleft() for _ in range(min(self.get_batch_size(), len(self.queue)))]
+        started = time.perf_counter()
+        try:
+            rows = await self._rows(batch)
+            client = connections.get("default")
+            async with client.acquire_connection() as connection:
+                await connection.copy_records_to_table(HandHistory._meta.db_table, records=rows, columns=COLUMNS)
+        except Exception:
+            self.queue.extendleft(reversed(batch))
+            self.stats.failed += 1
+            raise
+        self.stats.batches += 1
+        self.stats.written += len(batch)
+        self.stats.batch_seconds += time.perf_counter() - started
+        return len(batch)
+
+    async def _rows(self, batch: List[dict]) -> List[tuple]:
+        async with binary_r.pipeline(transaction=True) as pipe:
+            for record in batch:
+                pipe.xrange(
+                    events.events_key(record["session_id"]),
+                    min=f"{record['first_revision'] + 1}-0",
+                    max=f"{record['last_revision']}-0"
+                )
+            logs = await pipe.execute()
+        rows = []
+        for record, entries in zip(batch, logs):
+            if len(entries) != record["last_revision"] - record["first_revision"]:
+                logger.warning("event log of a hand at %s is incomplete, its actions are partial", record["session_id"])
+            actions = b"".join(entry.get(events.ACTIONS_FIELD.encode(), b"") for entry_id, entry in entries)
+            rows.append((
+                record["session_id"],
+                record["hand_seed"],
+                record["variant"],
+                record["small_blind"],
+                record["big_blind"],
+                record["board"],
+                json.dumps(record["players"]),
+                actions,
+                record["pot"],
+                record["first_revision"],
+                record["last_revision"],
+                record["ended_at"]
+            ))
+        return rows
+
+    async def stop(self) -> None:
+        """stops the timer and writes the hands still queued
+        """
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("hand history lost %s hands on shutdown", len(self.queue))
+
+
+hand_archiver = HandArchiver()
@@ -0,0 +1,119 @@
+import json
+from typing import Optional
+
+from pydantic import UUID4
+from redis.asyncio.client import Pipeline
+
+from app.utils.redis import r
+from app import settings
+
+
+# SessionStatus.LOBBY and SessionStatus.GAME tables are listed, paused ones are not.
+# Each listed status has a sorted set of table ids scored by free seats, all
+# listed tables are in one scored by big blind, and their summaries are kept in
+# one hash, so listing never reads a session snapshot
+LISTED_STATUSES = (1, 2)
+BIG_BLIND_KEY = "lobby:big_blind"
+TABLES_KEY = "lobby:tables"
+
+SCRATCH_KEY = "lobby:scratch"
+
+# KEYS: status set, big blind set, summaries hash, scratch key
+# ARGV: min free seats, min big blind, max big blind ("-inf" and "+inf" for none), offset, limit.
+# A big blind filter intersects the status set with the blind range inside Redis
+# (ZRANGESTORE, ZINTERSTORE), tables are never checked one by one. Returns a flag
+# telling whether more tables match, then the summaries of the page
+LOBBY_PAGE = """
+local unpack = unpack or table.unpack
+local source = KEYS[1]
+if ARGV[2] ~= '-inf' or ARGV[3] ~= '+inf' then
+    redis.call('ZRANGESTORE', KEYS[4], KEYS[2], ARGV[2], ARGV[3], 'BYSCORE')
+    redis.call('ZINTERSTORE', KEYS[4], 2, KEYS[1], KEYS[4], 'WEIGHTS', 1, 0)
+    source = KEYS[4]
+end
+local limit = tonumber(ARGV[5])
+local ids = redis.call('ZRANGEBYSCORE', source, ARGV[1], '+inf', 'LIMIT', ARGV[4], limit + 1)
+redis.call('DEL', KEYS[4])
+local more = 0
+if #ids > limit then
+    more = 1
+    ids[#ids] = nil
+end
+if #ids == 0 then
+    return {more}
+end
+local summaries = redis.call('HMGET', KEYS[3], unpack(ids))
+table.insert(summaries, 1, more)
+return summaries
+"""
+
+lobby_page_script = r.register_script(LOBBY_PAGE)
+
+
+def status_key(status: int) -> str:
+    return f"lobby:status:{status}"
+
+
+def queue_update(pipe: Pipeline, summary: dict) -> None:
+    """queues index updates of one table, tables of a status that is not listed are removed
+
+    Args:
+        pipe (Pipeline): pipeline of the session commit
+        summary (dict): Session.lobby_summary
+    """
+    session_id = summary["id"]
+    if summary["status"] not in LISTED_STATUSES:
+        queue_removal(pipe, session_id)
+        return
+    for status in LISTED_STATUSES:
+        if status != summary["status"]:
+            pipe.zrem(status_key(status), session_id)
+    pipe.zadd(status_key(summary["status"]), {session_id: summary["free_seats"]})
+    pipe.zadd(BIG_BLIND_KEY, {session_id: summary["big_blind"]})
+    pipe.hset(TABLES_KEY, session_id, json.dumps(summary))
+
+
+def queue_removal(pipe: Pipeline, session_id: UUID4) -> None:
+    for status in LISTED_STATUSES:
+        pipe.zrem(status_key(status), str(session_id))
+    pipe.zrem(BIG_BLIND_KEY, str(session_id))
+    pipe.hdel(TABLES_KEY, str(session_id))
+
+
+async def list_tables(
+    status: int,
+    min_free_seats: int = 1,
+    min_big_blind: Optional[float] = None,
+    max_big_blind: Optional[float] = None,
+    offset: int = 0,
+    limit: Optional[int] = None
+) -> dict:
+    """one page of listed tables, fewest free seats first
+
+    Args:
+        status (int): SessionStatus value
+        min_free_seats (int, optional): tables with fewer free seats are skipped. Defaults to 1.
+        min_big_blind (Optional[float], optional): lowest big blind. Defaults to None.
+        max_big_blind (Optional[float], optional): highest big blind. Defaults to None.
+        offset (int, optional): matching tables to skip. Defaults to 0.
+        limit (Optional[int], optional): page size. Defaults to settings.LOBBY_PAGE_SIZE.
+
+    Returns:
+        dict: table summaries and the offset of the next page, None on the last one
+    """
+    limit = limit or settings.LOBBY_PAGE_SIZE
+    more, *summaries = await lobby_page_script(
+        keys=[status_key(status), BIG_BLIND_KEY, TABLES_KEY, SCRATCH_KEY],
+        args=[
+            min_free_seats,
+            min_big_blind if min_big_blind is not None else "-inf",
+            max_big_blind if max_big_blind is not None else "+inf",
+            offset,
+            limit
+        ]
+    )
+    tables = [json.loads(summary) for summary in summaries if summary is not None]
+    return {
+        "tables": tables,
+        "next_offset": offset + len(summaries) if more else None
+    }
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from redis.asyncio.client import Pipeline
+from redis.exceptions import WatchError
+
+from app import settings
+
+
+logger = logging.getLogger(__name__)
+
+class StaleSessionError(Exception):
+    """the stored session changed after this worker read it"""
+
+
+class WriteBehind:
+    """coalesces snapshot writes of in-memory sessions.
+
+    Every schedule call replaces the pending writer of its key, the write itself
+    happens at most <delay> seconds after the first unsaved change, so a burst
+    of actions costs one write. flush writes right away, at hand boundaries
+    and on shutdown
+    """
+
+    def __init__(self, delay: Optional[float] = None) -> None:
+        self.delay = delay
+        self.pending: Dict[Hashable, Callable[[], Awaitable[None]]] = {}
+        self.tasks: Dict[Hashable, asyncio.Task] = {}
+
+    def get_delay(self) -> float:
+        return settings.SESSION_WRITE_DELAY if self.delay is None else self.delay
+
+    def schedule(self, key: Hashable, write: Callable[[], Awaitable[None]]) -> None:
+        """marks <key> dirty, <write> stores its latest state
+
+        Args:
+            key (Hashable): session id
+            write (Callable[[], Awaitable[None]]): coroutine function writing the snapshot
+        """
+        self.pending[key] = write
+        task = self.tasks.get(key)
+        if task is None or task.done():
+            self.tasks[key] = asyncio.get_running_loop().create_task(self._write_later(key))
+
+    async def _write_later(self, key: Hashable) -> None:
+        await asyncio.sleep(self.get_delay())
+        self.tasks.pop(key, None)
+        await self._write(key)
+
+    async def _write(self, key: Hashable) -> None:
+        write = self.pending.pop(key, None)
+        if write is None:
+            return
+        try:
+            await write()
+        except Exception:
+            logger.exception("snapshot write of %s failed, retrying", key)
+            if key not in self.pending:
+                self.schedule(key, write)
+
+    async def flush(self, key: Hashable) -> None:
+        """writes pending snapshot of <key> now
+
+        Args:
+            key (Hashable): session id
+        """
+        task = self.tasks.pop(key, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        await self._write(key)
+
+    def discard(self, key: Hashable) -> None:
+        """drops pending snapshot of a deleted session so it is not written back
+        """
+        self.pending.pop(key, None)
+        task = self.tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    async def flush_all(self) -> None:
+        for key in list(self.pending):
+            await self.flush(key)
+
+
+class UnitOfWork:
+    """bookkeeping of one session action: whether the snapshot was already read
+    and changed, extra redis commands to send with its commit and functions to
+    call once it is committed
+    """
+
+    def __init__(self) -> None:
+        self.loaded = False
+        self.dirty = False
+        self.flush = False
+        self.commands: List[Callable[[Pipeline], Any]] = []
+        self.callbacks: List[Callable[[], Any]] = []
+
+
+class PendingChanges:
+    """commits of a session that are not written yet: their event log entries,
+    whether the snapshot fields are due and what the lobby and player indexes need
+    """
+
+    def __init__(self) -> None:
+        self.entries: List[Tuple[int, Dict[str, bytes]]] = []
+        self.snapshot = False
+        self.lobby = False
+        self.joined: Set[Hashable] = set()
+        self.left: Set[Hashable] = set()
+
+    def add(self, revision: int, entry: Dict[str, bytes], snapshot: bool, lobby: bool, joined: Set[Hashable], left: Set[Hashable]) -> None:
+        self.entries.append((revision, entry))
+        self.snapshot = self.snapshot or snapshot
+        self.lobby = self.lobby or lobby
+        self.joined = (self.joined - left) | joined
+        self.left = (self.left - joined) | left
+
+    def merge(self, later: "PendingChanges") -> "PendingChanges":
+        """puts changes taken by a failed write back in front of the ones committed since
+        """
+        self.entries.extend(later.entries)
+        self.snapshot = self.snapshot or later.snapshot
+        self.lobby = self.lobby or later.lobby
+        self.joined = (self.joined - later.left) | later.joined
+        self.left = (self.left - later.joined) | later.left
+        return self
+
+
+class CommitStats:
+    """counters of compare-and-set commits of session snapshots
+    """
+
+    def __init__(self) -> None:
+        self.commits = 0
+        self.conflicts = 0
+        self.retries = 0
+        self.rejected = 0
+
+    @property
+    def conflict_rate(self) -> float:
+        attempts = self.commits + self.conflicts
+        return self.conflicts / attempts if attempts else 0.0
+
+    def dict(self) -> dict:
+        return {
+            "commits": self.commits,
+            "conflicts": self.conflicts,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "conflict_rate": self.conflict_rate
+        }
+
+
+async def compare_and_set(key: str, field: str, expected: bytes, pipe: Pipeline) -> None:
+    """executes the commands queued on <pipe> in MULTI/EXEC only if field <field>
+    of hash <key> still holds <expected>. The hash is WATCHed before the field is
+    read, so a commit landing between the read and EXEC aborts the transaction too
+
+    Args:
+        key (str): hash holding the guard field
+        field (str): guard field name
+        expected (bytes): value read by this worker, b"" if the field was missing
+        pipe (Pipeline): pipeline with queued commands, it is executed
+
+    Raises:
+        StaleSessionError: the field holds another value, nothing was written
+    """
+    commands, pipe.command_stack = pipe.command_stack, []
+    await pipe.watch(key)
+    if (await pipe.hget(key, field) or b"") != expected:
+        commit_stats.conflicts += 1
+        raise StaleSessionError(key)
+    pipe.multi()
+    for args, options in commands:
+        pipe.execute_command(*args, **options)
+    try:
+        await pipe.execute()
+    except WatchError:
+        commit_stats.conflicts += 1
+        raise StaleSessionError(key) from None
+    commit_stats.commits += 1
+
+
+write_behind = WriteBehind()
+commit_stats = CommitStats()
@@ -1,82 +1,153 @@
-import random
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from enum import Enum
+from bisect import insort
 from collections import Counter
 from itertools import combinations
 
 from fastapi import WebSocket
 from pydantic import UUID4
 
+from app.utils.evaluator import evaluator, card_index, RANKS, SUITS
+from app.utils.deck import DeckPool, deck_pool, shuffle
 from app import settings
 
 
 class Deck:
-    def __init__(self) -> None:
-        self.suits = ['hearts', 'diamonds', 'clubs', 'spades']
-        self.ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'jack', 'queen', 'king', 'ace']
-        self.cards = [Card(rank, suit) for suit in self.suits for rank in self.ranks]
-        random.shuffle(self.cards)
+    """shuffled deck taken from the pre-shuffled pool, or rebuilt from the seed of a played hand.
+    The pool decides which cards the deck holds (52 or short deck 36)
+    """
+
+    def __init__(self, seed: Optional[bytes] = None, pool: DeckPool = deck_pool) -> None:
+        if seed is None:
+            self.seed, self.order = pool.draw()
+        else:
+            self.seed, self.order = seed, shuffle(seed, pool.cards)
+        self.position = 0
+
+    @property
+    def cards(self) -> List["Card"]:
+        return [CARDS[index] for index in self.order[self.position:]]
 
     def deal_card(self):
-        return self.cards.pop()
+        card = CARDS[self.order[self.position]]
+        self.position += 1
+        return card
+
+    def deal_hand(self, players: int, hole_cards: int = 2, board_cards: int = 5) -> Tuple[List["Card"], List[List["Card"]]]:
+        """deals board and every player's hole cards with one slice of the deck
+
+        Args:
+            players (int): players count
+            hole_cards (int, optional): hole cards per player. Defaults to 2.
+            board_cards (int, optional): board cards. Defaults to 5.
+
+        Returns:
+            Tuple[List[Card], List[List[Card]]]: board cards and hole cards of each player
+        """
+        end = self.position + board_cards + players * hole_cards
+        dealt = [CARDS[index] for index in self.order[self.position:end]]
+        self.position = end
+        holes = [dealt[board_cards + i * hole_cards:board_cards + (i + 1) * hole_cards] for i in range(players)]
+        return dealt[:board_cards], holes
 
 
 class Card:
-    def __init__(self, rank, suit):
-        self.rank = rank
-        self.suit = suit
+    """one of 52 interned cards, Card(rank, suit) returns the shared instance.
+
+    rank and suit are indices into evaluator.RANKS / evaluator.SUITS,
+    index is the evaluator card index and mask its bit in a 52-bit card set
+    """
+    __slots__ = ("rank", "suit", "index", "mask")
+
+    def __new__(cls, rank: str, suit: str) -> "Card":
+        return CARDS[card_index(rank, suit)]
+
+    @classmethod
+    def from_index(cls, index: int) -> "Card":
+        return CARDS[index]
+
+    @classmethod
+    def _intern(cls, index: int) -> "Card":
+        card = object.__new__(cls)
+        card.rank = index >> 2
+        card.suit = index & 3
+        card.index = index
+        card.mask = 1 << index
+        return card
+
+    def __reduce__(self):
+        # copies and unpickled cards resolve to the interned instance
+        return (Card.from_index, (self.index,))
+
+    @property
+    def rank_name(self) -> str:
+        return RANKS[self.rank]
+
+    @property
+    def suit_name(self) -> str:
+        return SUITS[self.suit]
 
     def __str__(self):
-        return f"{self.rank} of {self.suit}"
+        return f"{self.rank_name} of {self.suit_name}"
     
     def __repr__(self):
-        return f"{self.rank}{self.suit[0]}"
+        return f"{self.rank_name}{self.suit_name[0]}"
     
     @property
     def dict(self):
         return {
-            "rank": self.rank,
-            "suit": self.suit
+            "rank": self.rank_name,
+            "suit": self.suit_name
         }
+
+
+CARDS = tuple(Card._intern(index) for index in range(len(RANKS) * len(SUITS)))
+
+
+def _card_rank(card: Card) -> int:
+    return card.rank
     
 
 class Hand:
-    def __init__(self, cards: List[Card] = []):
-        self.cards: List[Card] = sorted(cards, key=lambda card: self.rank_value(card.rank))
-        self.ranks = [card.rank for card in self.cards]
-        self.suits = [card.suit for card in self.cards]
-        self.rank_counts = Counter(self.ranks)
-        self.suit_counts = Counter(self.suits)
+    __slots__ = ("cards",)
+
+    def __init__(self, cards: Optional[List[Card]] = None):
+        self.cards: List[Card] = sorted(cards or [], key=_card_rank)
+
+    # derived fields are computed on demand, cards may be changed in place
+    @property
+    def ranks(self) -> List[str]:
+        return [card.rank_name for card in self.cards]
+
+    @property
+    def suits(self) -> List[str]:
+        return [card.suit_name for card in self.cards]
+
+    @property
+    def rank_counts(self) -> Counter:
+        return Counter(self.ranks)
+
+    @property
+    def suit_counts(self) -> Counter:
+        return Counter(self.suits)
 
     @property
     def dict(self):
+        ranks = self.ranks
+        suits = self.suits
         return {
             "cards": [card.dict for card in self.cards],
-            "ranks": self.ranks,
-            "suits": self.suits,
-            "rank_counts": dict(self.rank_counts),
-            "suit_counts": dict(self.suit_counts)
+            "ranks": ranks,
+            "suits": suits,
+            "rank_counts": dict(Counter(ranks)),
+            "suit_counts": dict(Counter(suits))
         }
 
     def add_card(self, card):
-        self.cards.append(card)
-        self.cards = sorted(self.cards, key=lambda card: self.rank_value(card.rank))
-        self.ranks = [card.rank for card in self.cards]
-        self.suits = [card.suit for card in self.cards]
-        self.rank_counts = Counter(self.ranks)
-        self.suit_counts = Counter(self.suits)
-
-    def rank_value(self, rank):
-        if rank == 'ace':
-            return 14
-        elif rank == 'king':
-            return 13
-        elif rank == 'queen':
-            return 12
-        elif rank == 'jack':
-            return 11
-        else:
-            return int(rank)
+        insort(self.cards, card, key=_card_rank)
+
+    def rank_value(self, rank: int) -> int:
+        return rank + 2
 
     def is_straight(self, ranks):
         values = [self.rank_value(rank) for rank in ranks]
@@ -108,7 +179,7 @@ class Hand:
         suits = [card.suit for card in cards]
         rank_counts = Counter(ranks)
 
-        if self.is_straight(ranks) and self.is_flush(suits) and ranks == ['10', 'Jack', 'Queen', 'King', 'Ace']:
+        if self.is_straight(ranks) and self.is_flush(suits) and ranks == [8, 9, 10, 11, 12]:
             return (9, [(card.rank, card.suit) for card in cards])  # Royal Flush
         elif self.is_straight(ranks) and self.is_flush(suits):
             return (8, [(card.rank, card.suit) for card in cards])  # Straight Flush
@@ -143,6 +214,36 @@ class Hand:
         else:
             return (0, [(card.rank, card.suit) for card in cards])  # High Card
         
+    def score(self, board: Optional["Hand"] = None) -> int:
+        """scores hand (with board cards if passed) by lookup evaluator
+
+        Args:
+            board (Optional[Hand], optional): board cards. Defaults to None.
+
+        Returns:
+            int: comparable hand strength, bigger is better
+        """
+        cards = self.cards if board is None else self.cards + board.cards
+        return evaluator.evaluate([card.index for card in cards])
+
+    def legacy_key(self, board: Optional["Hand"] = None) -> tuple:
+        """total order key over Hand.evaluate result: category and its cards first,
+        then all cards from the highest one, as the legacy showdown broke ties
+
+        Args:
+            board (Optional[Hand], optional): board cards. Defaults to None.
+
+        Returns:
+            tuple: comparable key, bigger is better
+        """
+        hand = Hand(self.cards if board is None else self.cards + board.cards)
+        category, cards = hand.evaluate()
+        return (
+            category,
+            [self.rank_value(rank) for rank, suit in cards],
+            sorted((self.rank_value(card.rank) for card in hand.cards), reverse=True)
+        )
+
     def evaluate(self):
         best_hand = (0, [])
         for combo in combinations(self.cards, 5):
@@ -163,11 +264,7 @@ class Hand:
 
 
 def dict_to_pokerhand(hand_dict):
-    hand = Hand()
-    for card_dict in hand_dict.get('cards', []):
-        card = Card(card_dict['rank'], card_dict['suit'])
-        hand.add_card(card)
-    return hand
+    return Hand([Card(card_dict['rank'], card_dict['suit']) for card_dict in hand_dict.get('cards', [])])
 
 
 class PlayerStatus(Enum):
@@ -183,12 +280,16 @@ class PlayerStatus(Enum):
 
 
 class Player:
+    __slots__ = ("id", "name", "balance", "hand", "currentbet", "contributed", "websocket", "status")
+
     def __init__(self, uuid: UUID4, name: str, websocket: Optional[WebSocket] = None, balance: float = None) -> None:
         self.id = uuid
         self.name = name
         self.balance = balance or settings.DEFAULT_START_BALANCE
         self.hand: Hand = Hand()
         self.currentbet = 0
+        # chips put in the pot during the current hand, pot layers are split by it
+        self.contributed = 0.0
         self.websocket: Optional[WebSocket] = websocket
         self.status = PlayerStatus.NOT_READY
 
@@ -216,6 +317,7 @@ class Player:
                 self.balance -= delta
                 self.status = PlayerStatus.BET
             self.currentbet += delta
+            self.contributed += delta
             return delta
         except Exception:
             return None
@@ -235,6 +337,7 @@ class Player:
                 self.currentbet = bet
                 self.balance -= delta
                 self.status = PlayerStatus.CALL
+            self.contributed += delta
             return delta
         except Exception:
             return None
@@ -259,6 +362,7 @@ class Player:
                 self.balance -= delta
                 self.status = PlayerStatus.RAISE
             self.currentbet += delta
+            self.contributed += delta
             return delta
         except Exception:
             return None
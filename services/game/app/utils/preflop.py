@@ -0,0 +1,125 @@
+import mmap
+import os
+import struct
+import sys
+from typing import List, Optional
+
+import numpy as np
+
+from app.utils.evaluator import RANKS
+from app import settings
+
+
+# file layout: 16-byte header (magic, version, max opponents, fields, samples),
+# then float32 [opponents][class][win, tie, equity]
+MAGIC = b"PFEQ"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHI2x")
+CLASSES = len(RANKS) * len(RANKS)
+FIELDS = ("win", "tie", "equity")
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "preflop_equity.bin")
+
+
+def hand_class(hole: List[int]) -> int:
+    """starting hand class of two hole cards, 169 classes in a 13x13 grid:
+    pairs on the diagonal, suited hands above it, offsuit hands below it
+
+    Args:
+        hole (List[int]): two hole card indices
+
+    Returns:
+        int: class index
+    """
+    high, low = sorted((card >> 2 for card in hole), reverse=True)
+    if (hole[0] & 3) == (hole[1] & 3):
+        return low * len(RANKS) + high
+    return high * len(RANKS) + low
+
+
+def class_representative(index: int) -> List[int]:
+    row, column = divmod(index, len(RANKS))
+    if row == column:
+        return [row * 4, row * 4 + 1]
+    if row < column:
+        return [column * 4, row * 4]
+    return [row * 4, column * 4 + 1]
+
+
+class PreflopTable:
+    """preflop equity of every starting hand class against 1..N random hands,
+    read straight from a memory-mapped file so all processes share its pages
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH) -> None:
+        self.path = path
+        with open(path, "rb") as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, max_opponents, fields, samples = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION or fields != len(FIELDS):
+            raise ValueError(f"{path} is not a preflop equity table")
+        self.max_opponents = max_opponents
+        self.samples = samples
+        self.values = np.frombuffer(self.buffer, dtype="<f4", offset=HEADER.size).reshape(max_opponents, CLASSES, len(FIELDS))
+
+    def get(self, hole: List[int], opponents: int) -> Optional[dict]:
+        """O(1) lookup of precomputed equity
+
+        Args:
+            hole (List[int]): two hole card indices
+            opponents (int): number of opponents
+
+        Returns:
+            Optional[dict]: win/tie/equity fractions, None if opponents count is out of the table
+        """
+        if opponents < 1 or opponents > self.max_opponents:
+            return None
+        values = self.values[opponents - 1, hand_class(hole)]
+        return {field: float(value) for field, value in zip(FIELDS, values)}
+
+
+_table: Optional[PreflopTable] = None
+
+
+def load_table(path: str = DEFAULT_PATH) -> Optional[PreflopTable]:
+    global _table
+    if _table is None and os.path.exists(path):
+        _table = PreflopTable(path=path)
+    return _table
+
+
+def build_table(path: str, max_opponents: int, samples: int) -> None:
+    """simulates every class against 1..max_opponents random hands and writes the table
+
+    Args:
+        path (str): output file
+        max_opponents (int): biggest number of opponents
+        samples (int): runouts per class and opponents count
+    """
+    from app.utils.equity import simulate_equity
+
+    values = np.zeros((max_opponents, CLASSES, len(FIELDS)), dtype="<f4")
+    for opponents in range(1, max_opponents + 1):
+        for index in range(CLASSES):
+            result = simulate_equity(
+                hole=class_representative(index),
+                board=[],
+                opponents=opponents,
+                samples=samples,
+                time_budget=float("inf"),
+                confidence_half_width=0.0,
+                seed=opponents * CLASSES + index
+            )
+            values[opponents - 1, index] = [result[field] for field in FIELDS]
+        print(f"{opponents} opponent(s) done", file=sys.stderr)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, max_opponents, len(FIELDS), samples))
+        file.write(values.tobytes())
+
+
+if __name__ == "__main__":
+    # python -m app.utils.preflop [samples] [path]
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_PATH
+    build_table(path=path, max_opponents=settings.DEFAULT_MAX_PLAYERS - 1, samples=samples)
@@ -1,34 +1,60 @@
+import asyncio
+import inspect
 import json
+import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
 from random import randint, choice
-from typing import List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
 from operator import is_not
-from functools import partial
-from enum import Enum
+from functools import partial, wraps
+from enum import Enum, IntEnum
 from uuid import uuid4, UUID
 from copy import deepcopy
 
 from fastapi import WebSocket
 from pydantic import UUID4
+from redis.asyncio.client import Pipeline
+from redis.exceptions import ResponseError
 
-from app.utils.redis import r, ping_redis_connection
+from app.utils.redis import r, binary_r, ping_redis_connection
 from app.utils.broadcast import Broadcaster
 from app.utils.chat import Chat, Message
-from app.utils.player import Player, PlayerStatus, Deck, Card, Hand, dict_to_pokerhand
+from app.utils.player import Player, PlayerStatus, Deck, Card, Hand, CARDS, dict_to_pokerhand
+from app.utils.showdown import showdown_batcher, short_deck_batcher, build_pots, resolve_pots
+from app.utils.evaluator import omaha_combinations
+from app.utils.equity import calculate_equity, calculate_exact_equity
+from app.utils.deck import DeckPool, deck_pool, short_deck_pool
+from app.utils.actor import ActorClosedError, TableActor
+from app.utils.history import hand_archiver
+from app.utils.persistence import (
+    PendingChanges, StaleSessionError, UnitOfWork, commit_stats, compare_and_set, write_behind
+)
+from app.utils import snapshot, lobby, events
 from app.utils.consumer import start_consumer
 from app import settings
 
 
+logger = logging.getLogger(__name__)
+
+
 class AbstractSessionFactory(object):
     def create_session(self):
         raise NotImplementedError()
 
 
-class SessionStatus(Enum):
+class SessionStatus(IntEnum):
     LOBBY = 1
     GAME = 2
     PAUSED = 3
 
+    @classmethod
+    def _missing_(cls, value):
+        # query parameters may name the status, ?status=game
+        if isinstance(value, str):
+            return cls.__members__.get(value.upper())
+        return None
+
 
 # number of checks in game
 class SessionStage(Enum):
@@ -39,7 +65,35 @@ class SessionStage(Enum):
     SHOWDOWN = 4
 
 
+class GameVariant(IntEnum):
+    HOLDEM = 1
+    OMAHA = 2
+    SHORT_DECK = 3
+
+    @classmethod
+    def _missing_(cls, value):
+        # query parameters may name the variant, ?variant=omaha
+        if isinstance(value, str):
+            return cls.__members__.get(value.upper())
+        return None
+
+    @property
+    def hole_cards(self) -> int:
+        return 4 if self == GameVariant.OMAHA else 2
+
+    @property
+    def pot_limit(self) -> bool:
+        return self == GameVariant.OMAHA
+
+    @property
+    def deck_pool(self) -> DeckPool:
+        # the pool decides which cards a hand seed shuffles
+        return short_deck_pool if self == GameVariant.SHORT_DECK else deck_pool
+
+
 class SidePot:
+    __slots__ = ("amount", "eligible_players")
+
     def __init__(self):
         self.amount: float = 0
         self.eligible_players: List[Player] = []
@@ -75,7 +129,51 @@ class SidePot:
         return side_pot
 
 
+# session fields the lobby index is built from
+LOBBY_FIELDS = {"status", "seats", "max_players", "players", "small_blind", "big_blind", "variant"}
+
+
+# player id -> id of the session the player is at, for every stored session
+PLAYER_SESSIONS_KEY = "player_sessions"
+
+
+def session_key(session_id: UUID4) -> str:
+    return f"session:{session_id}"
+
+
+def player_key(session_id: UUID4, player_id: UUID4) -> str:
+    return f"player:{session_id}:{player_id}"
+
+
+def transactional(method):
+    """runs a Session action inside Session.transaction, an action whose commit
+    lost to another worker runs again on the fresh snapshot"""
+    @wraps(method)
+    async def wrapper(self: "Session", *args, **kwargs):
+        for attempt in range(settings.SESSION_COMMIT_RETRIES + 1):
+            try:
+                async with self.transaction():
+                    return await method(self, *args, **kwargs)
+            except StaleSessionError:
+                if attempt == settings.SESSION_COMMIT_RETRIES:
+                    commit_stats.rejected += 1
+                    raise
+                commit_stats.retries += 1
+    return wrapper
+
+
 class Session(Broadcaster):
+    # a worker holds thousands of tables, attributes live in slots instead of
+    # a per-object dict and the client data is built only when it is sent
+    __slots__ = (
+        "max_players", "id", "seats", "small_blind", "big_blind", "status", "stage", "board",
+        "current_player", "dealer", "current_bet", "total_bet", "owner", "deck", "hand_seed",
+        "chat", "actor", "container", "indexed_players", "messages", "unit_of_work",
+        "last_activity", "revision", "hand_start", "stored_fields", "stored_players",
+        "committed_fields", "committed_players", "events", "pending", "write_lock",
+        "side_pots", "main_pot", "variant", "equity_task"
+    )
+
     # COMPLETE
     def __init__(
         self,
@@ -83,23 +181,23 @@ class Session(Broadcaster):
         max_players: Optional[int] = None,
         small_blind: Optional[float] = settings.DEFAULT_SMALL_BLIND,
         big_blind: Optional[float] = settings.DEFAULT_BIG_BLIND,
-        players: List[Player] = [],
-        seats: List[Optional[UUID4]] = [],
+        players: Optional[List[Player]] = None,
+        seats: Optional[List[Optional[UUID4]]] = None,
         status: Optional[SessionStatus] = SessionStatus.LOBBY,
         stage: Optional[SessionStage] = SessionStage.PREFLOP,
-        board: Hand = Hand(),
+        board: Optional[Hand] = None,
         current_player: Optional[int] = None,
         dealer: Optional[int] = None,
         current_bet: Optional[float] = None,
         total_bet: Optional[float] = None,
         owner: Optional[UUID4] = None,
-        data: Optional[dict] = None,
-        side_pots: List[SidePot] = [],
-        main_pot: float = 0.0
+        side_pots: Optional[List[SidePot]] = None,
+        main_pot: float = 0.0,
+        variant: GameVariant = GameVariant.HOLDEM
     ) -> None:
-        super().__init__(players)
+        super().__init__(players if players is not None else [])
         self.max_players: int = max_players or settings.DEFAULT_MAX_PLAYERS
-        if seats == []:
+        if not seats:
             seats = [None for _ in range(self.max_players)]
         self.id: UUID4 = uuid or uuid4()
         self.seats: List[Optional[UUID4]] = seats
@@ -107,39 +205,43 @@ class Session(Broadcaster):
         self.big_blind: float = big_blind
         self.status: SessionStatus = status
         self.stage: SessionStage = stage
-        self.board: Hand = board
+        self.board: Hand = board if board is not None else Hand()
         self.current_player: Optional[int] = current_player
         self.dealer: Optional[int] = dealer
         self.current_bet: Optional[float] = current_bet
         self.total_bet: Optional[float] = total_bet
         self.owner: Optional[UUID4] = owner
-        self.deck: Deck = Deck()
+        self.deck: Optional[Deck] = None
+        self.hand_seed: Optional[str] = None
         self.chat: Chat = Chat(session_id=self.id)
-        self.side_pots: List[SidePot] = side_pots
+        # player messages and other changes of the table go through its mailbox
+        self.actor: TableActor = TableActor(name=self.id)
+        # container holding this session and the players it has indexed
+        self.container: Optional["SessionsContainer"] = None
+        self.indexed_players: Set[UUID4] = set()
+        self.messages: Optional[List[str]] = None
+        self.unit_of_work: Optional[UnitOfWork] = None
+        self.last_activity: Optional[float] = None
+        # snapshot revision this object is based on, commits expect it unchanged in Redis
+        self.revision: int = 0
+        # last revision before the current hand was dealt, its commits follow it in the event log
+        self.hand_start: int = 0
+        # encoded hash fields as last written or read, snapshot writes only send the difference
+        self.stored_fields: Dict[str, bytes] = {}
+        self.stored_players: Dict[UUID4, Dict[str, bytes]] = {}
+        # encoded fields of the last commit, the event log entry of a commit holds the difference
+        self.committed_fields: Dict[str, bytes] = {}
+        self.committed_players: Dict[UUID4, Dict[str, bytes]] = {}
+        # events recorded by the running action, and commits not written yet
+        self.events: List[events.Event] = []
+        self.pending: PendingChanges = PendingChanges()
+        # write-behind and commits must not send entries out of order
+        self.write_lock = asyncio.Lock()
+        self.side_pots: List[SidePot] = side_pots if side_pots is not None else []
         self.main_pot = main_pot
-        seats_dict = [str(seat) for seat in self.seats]
-        if data is None:
-            self.data = {
-                "id": str(self.id),
-                "status": self.status.value,
-                "seats": seats_dict,
-                "small_blind": self.small_blind,
-                "big_blind": self.big_blind,
-                "max_players": self.max_players,
-                "players": [player.dict for player in self.players],
-                "stage": self.stage.value,
-                "board": self.board.dict,
-                "current_player": self.current_player,
-                "dealer": self.dealer,
-                "current_bet": self.current_bet,
-                "total_bet": self.total_bet,
-                "owner": str(self.owner) if self.owner is not None else None,
-                "chat": [],
-                "side_pots": [side_pot.dict() for side_pot in self.side_pots],
-                "main_pot": self.main_pot
-            }
-        else:
-            self.data = data
+        self.variant: GameVariant = variant
+        # all-in equity being enumerated, it is sent after the state it belongs to
+        self.equity_task: Optional[asyncio.Task] = None
 
     # COMPLETE
     @classmethod
@@ -149,19 +251,19 @@ class Session(Broadcaster):
         max_players: Optional[int] = None,
         small_blind: Optional[float] = settings.DEFAULT_SMALL_BLIND,
         big_blind: Optional[float] = settings.DEFAULT_BIG_BLIND,
-        players: List[Player] = [],
-        seats: List[Optional[UUID4]] = [],
+        players: Optional[List[Player]] = None,
+        seats: Optional[List[Optional[UUID4]]] = None,
         status: Optional[SessionStatus] = SessionStatus.LOBBY,
         stage: Optional[SessionStage] = SessionStage.PREFLOP,
-        board: Hand = Hand(),
+        board: Optional[Hand] = None,
         current_player: Optional[int] = None,
         dealer: Optional[int] = None,
         current_bet: Optional[float] = None,
         total_bet: Optional[float] = None,
         owner: Optional[UUID4] = None,
-        data: Optional[dict] = None,
-        side_pots: List[SidePot] = [],
-        main_pot: int = 0.0
+        side_pots: Optional[List[SidePot]] = None,
+        main_pot: int = 0.0,
+        variant: GameVariant = GameVariant.HOLDEM
     ) -> "Session":
         """creates new Session object
 
@@ -170,17 +272,17 @@ class Session(Broadcaster):
             max_players (Optional[int], optional): session max players count. Defaults to None.
             small_blind (Optional[float], optional): game small blind. Defaults to None.
             big_blind (Optional[float], optional): game big blind. Defaults to None.
-            players (List[Player], optional): list of Player objects. Defaults to [].
-            seats (List[Optional[UUID4]], optional): list of seats(not None is busy). Defaults to [].
+            players (Optional[List[Player]], optional): list of Player objects. Defaults to None.
+            seats (Optional[List[Optional[UUID4]]], optional): list of seats(not None is busy). Defaults to None.
             status (Optional[SessionStatus], optional): game status(lobby, pause, game). Defaults to SessionStatus.LOBBY.
             stage (Optional[SessionStage], optional): game stage(null, first, second, third, fourth). Defaults to SessionStage.PREFLOP.
-            board (Hand, optional): game board cards(5 pieces)
+            board (Optional[Hand], optional): game board cards(5 pieces). Defaults to None.
             current_player (Optional[int], optional): game current player(number of seat). Defaults to None.
             dealer (Optional[int], optional): current game dealer(number of seat). Defaults to None.
             current_bet (Optional[float], optional): game current bet. Defaults to None.
             total_bet (Optional[float], optional): game total bet. Defaults to None.
             owner (Optional[UUID4], optional): game lobby creator(owner) uuid. Defaults to None.
-            data (Optional[dict], optional): all the game info. Defaults to None.
+            variant (GameVariant, optional): poker variant dealt at the table. Defaults to GameVariant.HOLDEM.
 
         Returns:
             Session: Session object
@@ -191,8 +293,8 @@ class Session(Broadcaster):
             max_players=max_players,
             small_blind=small_blind,
             big_blind=big_blind,
-            players=deepcopy(players),
-            seats=seats.copy(),
+            players=deepcopy(players) if players is not None else None,
+            seats=seats.copy() if seats is not None else None,
             status=status,
             stage=stage,
             board=board,
@@ -201,59 +303,346 @@ class Session(Broadcaster):
             current_bet=current_bet,
             total_bet=total_bet,
             owner=owner,
-            data=data,
             side_pots=side_pots,
-            main_pot=main_pot
+            main_pot=main_pot,
+            variant=variant
         )
         await session.save()
         return session
 
     # COMPLETE
     # NOTE for existing Session object
-    async def get_data(self) -> dict:
-        async with r.pipeline(transaction=True) as pipe:
-            data_json = (await (pipe.get(f"session:{self.id}").execute()))[0]
-        data: dict = json.loads(data_json)
-        self.data = data
-        self.id = UUID(data["id"])
-        self.status = SessionStatus(data['status'])
-        self.seats = [UUID(seat) if seat != "None" else None for seat in data["seats"]]
-        self.small_blind = data["small_blind"]
-        self.big_blind = data["big_blind"]
-        self.max_players = data["max_players"]
-        self.stage = SessionStage(data['stage'])
-        board = dict_to_pokerhand(hand_dict=data["board"])
-        self.board = board
-        self.current_player = data["current_player"]
-        self.dealer = data["dealer"]
-        self.current_bet = data["current_bet"]
-        self.total_bet = data["total_bet"]
-        self.owner = UUID(data["owner"]) if data["owner"] != "None" else None
-        self.main_pot = data["main_pot"]
-        # player_ids = [UUID(player_data["id"]) for player_data in data["players"]]
-        for player_data in data["players"]:
-            player = self.get_player(player_id=UUID(player_data["id"]))
-            if player is not None:
-                player.name = player_data["name"]
-                player.balance = player_data["balance"]
-                player.hand = dict_to_pokerhand(player_data["hand"])
-                player.currentbet = player_data["currentbet"]
-                player.status = PlayerStatus(player_data['status'])
-        self.side_pots: List[SidePot] = [SidePot.from_dict(data=pot, players=self.players) for pot in data["side_pots"]]
-        return data    
-
-    async def set_data(self, data: dict) -> None:
-        data_json = json.dumps(data, default=str)
-        async with r.pipeline(transaction=True) as pipe:
-            await (pipe.set(f"session:{self.id}", data_json).execute())
-        self.data = data
+    async def get_data(self, reload: bool = False) -> dict:
+        """reads the session snapshot into this object, unless the object is current
+
+        Args:
+            reload (bool, optional): read even in memory mode, used to rebuild a session
+                this worker does not hold yet. Defaults to False.
+
+        Returns:
+            dict: session data as clients receive it
+        """
+        if settings.SESSION_STATE_MODE == "memory" and not reload:
+            # this worker owns the table, its objects are newer than any snapshot
+            return self.data
+        unit = self.unit_of_work
+        if unit is not None and unit.loaded and not reload:
+            return self.data
+        # players this worker knows are read in the same round trip as the session, and
+        # so are the event log entries after the last snapshot it has seen
+        known = [player.id for player in self.players]
+        after = None
+        if snapshot.SNAPSHOT_FIELD in self.stored_fields:
+            after = snapshot.REVISION_CODEC[1](self.stored_fields[snapshot.SNAPSHOT_FIELD])
+        async with binary_r.pipeline(transaction=True) as pipe:
+            pipe.hgetall(session_key(self.id))
+            pipe.lrange(self.chat.key, 0, -1)
+            for player_id in known:
+                pipe.hgetall(player_key(self.id, player_id))
+            if after is not None:
+                events.queue_read(pipe, self.id, after)
+            fields, messages, *player_fields = await pipe.execute(raise_on_error=False)
+        entries = player_fields.pop() if after is not None else None
+        self.messages = [message.decode() for message in messages]
+        self.events, self.pending = [], PendingChanges()
+        if isinstance(fields, ResponseError):
+            # json blob written before sessions became hashes
+            blob = json.loads(await binary_r.get(session_key(self.id)))
+            state = snapshot.session_from_json(blob)
+            players = {player["id"]: player for player in map(snapshot.player_from_json, blob["players"])}
+            schema_version = 0
+        else:
+            schema_version = snapshot.version(fields)
+            stored_players = {player_id: values for player_id, values in zip(known, player_fields) if values}
+            committed_fields, replayed_players = dict(fields), {}
+            written, revision = snapshot.revisions(fields)
+            if schema_version == snapshot.VERSION and revision > written:
+                if after is None or after > written:
+                    entries = await events.read(binary_r, self.id, after=written)
+                events.replay(committed_fields, replayed_players, entries, after=written, until=revision)
+            state = self._decode_session(committed_fields, schema_version)
+            missing = [player_id for player_id in state["players"] if player_id not in stored_players]
+            if missing:
+                async with binary_r.pipeline(transaction=True) as pipe:
+                    for player_id in missing:
+                        pipe.hgetall(player_key(self.id, player_id))
+                    stored_players.update(
+                        (player_id, values) for player_id, values in zip(missing, await pipe.execute()) if values
+                    )
+            committed_players = {
+                player_id: {**stored_players.get(player_id, {}), **replayed_players.get(player_id, {})}
+                for player_id in stored_players.keys() | replayed_players.keys()
+            }
+            players = {
+                player_id: self._decode_player(committed_players[player_id], schema_version)
+                for player_id in state["players"]
+                if committed_players.get(player_id)
+            }
+            self.stored_fields = {name.decode(): value for name, value in fields.items()}
+            self.stored_players = {
+                player_id: {name.decode(): value for name, value in values.items()}
+                for player_id, values in stored_players.items()
+            }
+            self.committed_fields = {name.decode(): value for name, value in committed_fields.items()}
+            self.committed_players = {
+                player_id: {name.decode(): value for name, value in committed_players[player_id].items()}
+                for player_id in players
+            }
+        if unit is not None:
+            unit.loaded = True
+        self.set_state(state=state, players=players)
+        self.index_players()
+        if schema_version < snapshot.VERSION:
+            self.stored_fields, self.stored_players = {}, {}
+            self.committed_fields, self.committed_players = self._encode()
+            self.pending.snapshot = True
+            await self.write_snapshot(replace=schema_version == 0)
+        return self.data
+
+    @staticmethod
+    def _decode_session(fields: Dict[bytes, bytes], schema_version: int) -> dict:
+        if schema_version == 1:
+            return snapshot.session_from_json({name.decode(): json.loads(value) for name, value in fields.items()})
+        return snapshot.decode(snapshot.SESSION_SCHEMA, fields)
+
+    @staticmethod
+    def _decode_player(fields: Dict[bytes, bytes], schema_version: int) -> dict:
+        if schema_version == 1:
+            return snapshot.player_from_json({name.decode(): json.loads(value) for name, value in fields.items()})
+        return snapshot.decode(snapshot.PLAYER_SCHEMA, fields)
+
+    def get_state(self) -> Tuple[dict, Dict[UUID4, dict]]:
+        """typed state of the session and of every player, in app.utils.snapshot schemas
+
+        Returns:
+            Tuple[dict, Dict[UUID4, dict]]: session state and player id -> player state
+        """
+        state = {
+            "id": self.id,
+            "status": self.status.value,
+            "seats": self.seats,
+            "small_blind": self.small_blind,
+            "big_blind": self.big_blind,
+            "max_players": self.max_players,
+            "stage": self.stage.value,
+            "board": [card.index for card in self.board.cards],
+            "current_player": self.current_player,
+            "dealer": self.dealer,
+            "current_bet": self.current_bet,
+            "total_bet": self.total_bet,
+            "owner": self.owner,
+            "main_pot": self.main_pot,
+            "side_pots": [(side_pot.amount, [player.id for player in side_pot.eligible_players]) for side_pot in self.side_pots],
+            "variant": self.variant.value,
+            "last_activity": self.last_activity,
+            "players": [player.id for player in self.players],
+            "revision": self.revision,
+            "hand_start": self.hand_start
+        }
+        players = {
+            player.id: {
+                "id": player.id,
+                "name": player.name,
+                "balance": player.balance,
+                "hand": [card.index for card in player.hand.cards],
+                "currentbet": player.currentbet,
+                "status": player.status.value,
+                "contributed": player.contributed
+            }
+            for player in self.players
+        }
+        return state, players
+
+    def set_state(self, state: dict, players: Dict[UUID4, dict]) -> None:
+        """applies stored state. Players that joined through other workers get
+        Player objects without a websocket, players they removed are dropped
+
+        Args:
+            state (dict): session state
+            players (Dict[UUID4, dict]): player id -> player state
+        """
+        self.id = state["id"]
+        self.status = SessionStatus(state["status"])
+        self.seats = state["seats"]
+        self.small_blind = state["small_blind"]
+        self.big_blind = state["big_blind"]
+        self.max_players = state["max_players"]
+        self.stage = SessionStage(state["stage"])
+        self.board = Hand([CARDS[card] for card in state["board"]])
+        self.current_player = state["current_player"]
+        self.dealer = state["dealer"]
+        self.current_bet = state["current_bet"]
+        self.total_bet = state["total_bet"]
+        self.owner = state["owner"]
+        self.main_pot = state["main_pot"]
+        self.variant = GameVariant(state.get("variant", GameVariant.HOLDEM.value))
+        self.last_activity = state.get("last_activity")
+        self.revision = state.get("revision") or 0
+        self.hand_start = state.get("hand_start") or 0
+        held = {player.id: player for player in self.players}
+        self.players[:] = []
+        for player_id in state["players"]:
+            player_state = players.get(player_id)
+            if player_state is None:
+                continue
+            player = held.get(player_id) or Player(uuid=player_id, name=player_state["name"])
+            player.name = player_state["name"]
+            player.balance = player_state["balance"]
+            player.hand = Hand([CARDS[card] for card in player_state["hand"]])
+            player.currentbet = player_state["currentbet"]
+            player.status = PlayerStatus(player_state["status"])
+            # snapshots written before the field existed hold no contributions
+            player.contributed = player_state.get("contributed") or 0.0
+            self.players.append(player)
+        self.side_pots = []
+        for amount, eligible in state["side_pots"]:
+            side_pot = SidePot()
+            side_pot.amount = amount
+            side_pot.eligible_players = [player for player in self.players if player.id in eligible]
+            self.side_pots.append(side_pot)
+
+    def _encode(self) -> Tuple[Dict[str, bytes], Dict[UUID4, Dict[str, bytes]]]:
+        """encoded hash fields of the session and of every player
+        """
+        state, player_states = self.get_state()
+        fields = snapshot.encode(snapshot.SESSION_SCHEMA, state)
+        fields[snapshot.VERSION_FIELD] = snapshot.HEADER.pack(snapshot.VERSION)
+        players = {
+            player_id: snapshot.encode(snapshot.PLAYER_SCHEMA, player_state)
+            for player_id, player_state in player_states.items()
+        }
+        return fields, players
+
+    def _next_revision(self, snapshot_due: bool) -> None:
+        """commits the current state as a new revision: the fields that changed
+        since the last one become its event log entry, written with the pending ones
+
+        Args:
+            snapshot_due (bool): the write also brings the snapshot fields up to date
+        """
+        self.revision += 1
+        fields, players = self._encode()
+        changed = {name: value for name, value in fields.items() if self.committed_fields.get(name) != value}
+        changed_players = {}
+        for player_id, player_fields in players.items():
+            committed = self.committed_players.get(player_id, {})
+            changed_player = {name: value for name, value in player_fields.items() if committed.get(name) != value}
+            if changed_player:
+                changed_players[player_id] = changed_player
+        self.pending.add(
+            revision=self.revision,
+            entry=events.encode_entry(self.events, changed, changed_players),
+            snapshot=snapshot_due,
+            lobby=bool(changed.keys() & LOBBY_FIELDS),
+            joined=players.keys() - self.committed_players.keys(),
+            left=self.committed_players.keys() - players.keys()
+        )
+        self.events = []
+        self.committed_fields, self.committed_players = fields, players
+
+    def _queue_changes(self, pipe: Pipeline, pending: PendingChanges, replace: bool = False) -> Tuple[Dict[str, bytes], Dict[UUID4, Dict[str, bytes]]]:
+        """queues the event log entries of <pending> commits, then HSETs of the
+        snapshot fields that differ from the stored ones when the snapshot is due
+        and of the revision and last activity alone when it is not
+
+        Args:
+            pipe (Pipeline): pipeline of the commit
+            pending (PendingChanges): commits to write
+            replace (bool, optional): drop the stored key first, it holds an old json blob. Defaults to False.
+
+        Returns:
+            Tuple[Dict[str, bytes], Dict[UUID4, Dict[str, bytes]]]: encoded session and player fields
+                to remember once the pipeline is executed
+        """
+        for revision, entry in pending.entries:
+            events.queue_append(pipe, self.id, revision, entry)
+        stored_players = {
+            player_id: fields for player_id, fields in self.stored_players.items() if player_id not in pending.left
+        }
+        if pending.snapshot or snapshot.SNAPSHOT_FIELD not in self.stored_fields:
+            fields = dict(self.committed_fields)
+            fields[snapshot.SNAPSHOT_FIELD] = fields[snapshot.REVISION_FIELD]
+            if replace:
+                pipe.delete(session_key(self.id))
+            changed = {name: value for name, value in fields.items() if self.stored_fields.get(name) != value}
+            if changed:
+                pipe.hset(session_key(self.id), mapping=changed)
+            for player_id, player_fields in self.committed_players.items():
+                stored = stored_players.get(player_id, {})
+                changed = {name: value for name, value in player_fields.items() if stored.get(name) != value}
+                if changed:
+                    pipe.hset(player_key(self.id, player_id), mapping=changed)
+            stored_players = self.committed_players
+        else:
+            # the fields stay at the snapshot, the entries after it hold the rest. last_activity
+            # is kept current too, the idle sweep of session_provider reads only that field
+            fields = dict(self.stored_fields)
+            current = {
+                name: self.committed_fields[name]
+                for name in (snapshot.REVISION_FIELD, "last_activity") if name in self.committed_fields
+            }
+            fields.update(current)
+            pipe.hset(session_key(self.id), mapping=current)
+        if pending.lobby:
+            lobby.queue_update(pipe, self.lobby_summary())
+        if pending.joined:
+            pipe.hset(PLAYER_SESSIONS_KEY, mapping=dict.fromkeys(map(str, pending.joined), str(self.id)))
+        if pending.left:
+            pipe.delete(*[player_key(self.id, player_id) for player_id in pending.left])
+            pipe.hdel(PLAYER_SESSIONS_KEY, *map(str, pending.left))
+        return fields, stored_players
+
+    def lobby_summary(self) -> dict:
+        """table as /game/lobby lists it
+        """
+        return {
+            "id": str(self.id),
+            "status": self.status.value,
+            "free_seats": self.seats.count(None),
+            "max_players": self.max_players,
+            "players": len(self.players),
+            "small_blind": self.small_blind,
+            "big_blind": self.big_blind,
+            "variant": self.variant.value
+        }
+
+    async def get_field(self, name: str) -> Any:
+        """reads one stored field of the session without loading the rest
+
+        Args:
+            name (str): field name, like "current_player" or "last_activity"
+
+        Returns:
+            Any: decoded value in snapshot schema types, None if the field is not stored
+        """
+        header, value = await binary_r.hmget(session_key(self.id), snapshot.VERSION_FIELD, name)
+        return snapshot.decode_value(snapshot.SESSION_SCHEMA, name, value, snapshot.header_version(header))
+
+    async def get_player_field(self, player_id: UUID4, name: str) -> Any:
+        """reads one stored field of a player, like "balance"
+
+        Args:
+            player_id (UUID4): player uuid
+            name (str): field name
+
+        Returns:
+            Any: decoded value in snapshot schema types, None if the field is not stored
+        """
+        async with binary_r.pipeline(transaction=True) as pipe:
+            pipe.hget(session_key(self.id), snapshot.VERSION_FIELD)
+            pipe.hget(player_key(self.id, player_id), name)
+            header, value = await pipe.execute()
+        return snapshot.decode_value(snapshot.PLAYER_SCHEMA, name, value, snapshot.header_version(header))
     
+    @transactional
     async def add_player(self, player: Player) -> bool:
         await self.get_data()
         if len(self.players) < self.max_players:
             self.players.append(player)
+            self.record_event(events.EventType.JOIN, value=player.balance)
             await self.save()
-            await self.send_all_data(self.data)
+            # a conflicting commit runs the action again, players see only the written state
+            self.on_commit(self.send_state)
             return True
         return False
     
@@ -291,16 +680,18 @@ class Session(Broadcaster):
 
     # COMPLETE
     # NOTE for existing Session object
+    @transactional
     async def remove_player(self, user_id: UUID4) -> bool:
         await self.get_data()
         player = self.get_player(player_id=user_id)
         if player is None:
             return False
         self.players.remove(player)
+        self.record_event(events.EventType.LEAVE, seat=self.seats.index(user_id) if user_id in self.seats else None)
         if user_id in self.seats:
             player_seat = self.seats.index(user_id)
-            self.seats[player_seat] = None
             seat_index = await self._get_next_busy_seat(user_id=user_id)
+            self.seats[player_seat] = None
             if self.current_player == player_seat:
                 self.current_player == seat_index
             if self.dealer == player_seat:
@@ -312,41 +703,240 @@ class Session(Broadcaster):
             if seat == user_id:
                 seat = None
         await self.save()
-        await self.send_all_data(self.data)
+        self.on_commit(self.send_state)
         return True
     
     # COMPLETE
     @classmethod
     async def delete(cls, session_id: UUID4) -> bool:
-        async with r.pipeline(transaction=True) as pipe:
-            await (pipe.delete(f"session:{session_id}").execute())
+        write_behind.discard(session_id)
+        try:
+            header, players = await binary_r.hmget(session_key(session_id), snapshot.VERSION_FIELD, "players")
+        except ResponseError:
+            # json blob, its players are inside it
+            header, players = None, None
+        player_ids = snapshot.decode_value(snapshot.SESSION_SCHEMA, "players", players, snapshot.header_version(header)) or []
+        keys = [player_key(session_id, player_id) for player_id in player_ids]
+        async with binary_r.pipeline(transaction=True) as pipe:
+            pipe.delete(session_key(session_id), f"seeds:{session_id}", events.events_key(session_id), *keys)
+            if player_ids:
+                pipe.hdel(PLAYER_SESSIONS_KEY, *map(str, player_ids))
+            lobby.queue_removal(pipe, session_id)
+            await pipe.execute()
         return True
+
+    async def record_hand_seed(self) -> None:
+        """keeps seeds of the last hands with the variant they were dealt in,
+        replay_deck rebuilds the deck of a hand from its entry
+        """
+        push = partial(self._push_hand_seed, self.hand_seed)
+        if self.unit_of_work is not None:
+            self.unit_of_work.commands.append(push)
+            return
+        async with binary_r.pipeline(transaction=True) as pipe:
+            push(pipe)
+            await pipe.execute()
+
+    def _push_hand_seed(self, hand_seed: str, pipe: Pipeline) -> None:
+        pipe.rpush(f"seeds:{self.id}", f"{self.variant.value}:{hand_seed}")
+        pipe.ltrim(f"seeds:{self.id}", -settings.HAND_SEEDS_HISTORY, -1)
+
+    @staticmethod
+    def replay_deck(entry: str) -> Deck:
+        """deck of a played hand, shuffled again from its seeds:{session_id} entry
+
+        Args:
+            entry (str): "<variant>:<seed hex>", entries without a variant are hold'em
+
+        Returns:
+            Deck: deck in the order the hand was dealt from
+        """
+        variant, _, seed = entry.rpartition(":")
+        pool = GameVariant(int(variant) if variant else GameVariant.HOLDEM).deck_pool
+        return Deck(seed=bytes.fromhex(seed), pool=pool)
     
+    async def get_messages(self) -> List[str]:
+        # in memory mode chat history is read once, send_chat_message keeps it up to date,
+        # in redis mode get_data of the current unit of work has just read it
+        unit = self.unit_of_work
+        fresh = settings.SESSION_STATE_MODE == "memory" or (unit is not None and unit.loaded)
+        if self.messages is None or not fresh:
+            self.messages = await self.chat.list()
+        return self.messages
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[UnitOfWork]:
+        """groups reads and saves of one action: the snapshot is read at most once
+        and written by a single pipelined commit when the action is over.
+        Nested transactions join the outer one, nothing is written on error
+
+        Yields:
+            UnitOfWork: current unit of work
+        """
+        if self.unit_of_work is not None:
+            yield self.unit_of_work
+            return
+        unit = self.unit_of_work = UnitOfWork()
+        self.events = []
+        try:
+            yield unit
+        finally:
+            self.unit_of_work = None
+        if unit.dirty or unit.commands:
+            await self.persist(flush=unit.flush, commands=unit.commands)
+        for callback in unit.callbacks:
+            result = callback()
+            if inspect.isawaitable(result):
+                await result
+
+    def on_commit(self, callback: Callable[[], Any]) -> None:
+        """calls <callback> once the running action is committed, right away outside of an action.
+        An action that runs again after a conflict registers it again, coroutine functions
+        are awaited by the committing action
+
+        Args:
+            callback (Callable[[], Any]): function without arguments
+        """
+        if self.unit_of_work is not None:
+            self.unit_of_work.callbacks.append(callback)
+            return
+        result = callback()
+        if inspect.isawaitable(result):
+            asyncio.ensure_future(result)
+
+    def record_event(self, event: events.EventType, seat: Optional[int] = None, value: float = 0.0) -> None:
+        """keeps what an action did for the event log entry of the next commit
+
+        Args:
+            event (events.EventType): event type
+            seat (Optional[int], optional): seat of the acting player, None for table events. Defaults to None.
+            value (float, optional): chips or, for STREET, the new stage. Defaults to 0.0.
+        """
+        self.events.append((event, seat, value))
+
+    def index_players(self) -> None:
+        """updates the player index of the container with players that joined or left
+        """
+        if self.container is None:
+            return
+        players = {player.id for player in self.players}
+        self.container.index_players(
+            session_id=self.id,
+            added=players - self.indexed_players,
+            removed=self.indexed_players - players
+        )
+        self.indexed_players = players
+
+    @property
+    def data(self) -> dict:
+        """session data as clients receive it, built from the current state on every access
+        """
+        return self.build_data()
+
+    def build_data(self) -> dict:
+        """session data as clients receive it
+        """
+        return {
+            "id": str(self.id),
+            "status": self.status.value,
+            "seats": [str(seat) for seat in self.seats],
+            "small_blind": self.small_blind,
+            "big_blind": self.big_blind,
+            "max_players": self.max_players,
+            "players": [player.dict for player in self.players],
+            "stage": self.stage.value,
+            "board": self.board.dict,
+            "current_player": self.current_player,
+            "dealer": self.dealer,
+            "current_bet": self.current_bet,
+            "total_bet": self.total_bet,
+            "messages": self.messages,
+            "owner": str(self.owner),
+            "main_pot": self.main_pot,
+            "side_pots": [side_pot.dict() for side_pot in self.side_pots],
+            "variant": self.variant.value,
+            "last_activity": self.last_activity
+        }
+
     # COMPLETE
-    async def save(self) -> None:
+    async def save(self, flush: bool = False) -> None:
         """accept changes in Session object data
+
+        Args:
+            flush (bool, optional): write the snapshot now even in memory mode,
+                used at hand boundaries. Defaults to False.
         """
-        self.data = {
-                "id": str(self.id),
-                "status": self.status.value,
-                "seats": [str(seat) for seat in self.seats],
-                "small_blind": self.small_blind,
-                "big_blind": self.big_blind,
-                "max_players": self.max_players,
-                "players": [player.dict for player in self.players],
-                "stage": self.stage.value,
-                "board": self.board.dict,
-                "current_player": self.current_player,
-                "dealer": self.dealer,
-                "current_bet": self.current_bet,
-                "total_bet": self.total_bet,
-                "messages": await self.chat.list(),
-                "owner": str(self.owner),
-                "main_pot": self.main_pot,
-                "side_pots": [side_pot.dict() for side_pot in self.side_pots],
-                "last_activity": datetime.now().timestamp()
-            }
-        await self.set_data(data=self.data)
+        self.last_activity = datetime.now().timestamp()
+        await self.get_messages()
+        self.index_players()
+        unit = self.unit_of_work
+        if unit is not None:
+            unit.dirty = True
+            unit.flush = unit.flush or flush
+            return
+        await self.persist(flush=flush)
+
+    async def persist(self, flush: bool = False, commands: List[Callable[[Pipeline], Any]] = ()) -> None:
+        """commits the state built by save as a new revision and writes it, <commands>
+        go in the same pipeline. In redis mode the write only happens if the stored
+        revision is still the one this object was read at
+
+        Args:
+            flush (bool, optional): skip write-behind in memory mode and write the
+                snapshot fields in "hand" SESSION_SNAPSHOTS mode, used at hand boundaries. Defaults to False.
+            commands (List[Callable[[Pipeline], Any]], optional): functions queueing extra commands. Defaults to ().
+
+        Raises:
+            StaleSessionError: another worker committed first, nothing was written
+        """
+        self._next_revision(snapshot_due=flush or settings.SESSION_SNAPSHOTS == "commit")
+        write_later = settings.SESSION_STATE_MODE == "memory" and settings.SESSION_WRITE_DELAY > 0 and not flush
+        if write_later:
+            write_behind.schedule(self.id, self.write_snapshot)
+            if not commands:
+                return
+        else:
+            write_behind.discard(self.id)
+        async with binary_r.pipeline(transaction=True) as pipe:
+            for command in commands:
+                command(pipe)
+            if write_later:
+                await pipe.execute()
+                return
+            await self._send(pipe, guarded=settings.SESSION_STATE_MODE == "redis")
+
+    async def write_snapshot(self, replace: bool = False) -> None:
+        """writes commits made since the last write
+
+        Args:
+            replace (bool, optional): the stored key is an old json blob. Defaults to False.
+        """
+        async with binary_r.pipeline(transaction=True) as pipe:
+            await self._send(pipe, guarded=False, replace=replace)
+
+    async def _send(self, pipe: Pipeline, guarded: bool, replace: bool = False) -> None:
+        """queues pending commits on <pipe> and sends it, commits made while it is
+        on the way stay pending and the taken ones are put back if it fails
+
+        Args:
+            pipe (Pipeline): pipeline of the commit
+            guarded (bool): send it with compare_and_set on the stored revision
+            replace (bool, optional): the stored key is an old json blob. Defaults to False.
+        """
+        async with self.write_lock:
+            pending, self.pending = self.pending, PendingChanges()
+            expected = self.stored_fields.get(snapshot.REVISION_FIELD, b"")
+            stored = self._queue_changes(pipe=pipe, pending=pending, replace=replace)
+            try:
+                if guarded:
+                    # another worker may have committed since get_data
+                    await compare_and_set(session_key(self.id), snapshot.REVISION_FIELD, expected, pipe)
+                else:
+                    await pipe.execute()
+            except Exception:
+                self.pending = pending.merge(self.pending)
+                raise
+            self.stored_fields, self.stored_players = stored
 
     async def handle_message(self, data, player: Player):
         if data["type"] == "take_seat":
@@ -373,6 +963,9 @@ class Session(Broadcaster):
         elif data["type"] == "new_message":
             ans = await self.send_chat_message(player_id=player.id, message=data["message"])
             await self.handle_answer(answer=ans)
+        elif data["type"] == "equity":
+            ans = await self.get_equity(player_id=player.id, samples=data.get("samples"))
+            await self.send_personal_message(player_id=player.id, data=ans)
         elif data["type"] == "typing_start":
             data = {
                 "type": "typing_start",
@@ -399,16 +992,18 @@ class Session(Broadcaster):
                 data.update(self.data)
                 data.update({"allowed_actions": answer["allowed_actions"]})
                 await self.send_all_data(data)
+                self.send_all_in_equity()
             elif answer["message"] == "ends":
                 data = {}
                 data.update(self.data)
-                data.update({"winners": answer["winners"]})
+                data.update({"winners": answer["winners"], "pots": answer["pots"]})
                 await self.send_all_data(data)
         elif answer["type"] == "chat_incoming":
             await self.send_all_data(answer)
         else:
             await self.send_all_data(answer)
 
+    @transactional
     async def take_seat(self, player_id: UUID4, seat_num: int) -> dict:
         await self.get_data()
         if self.seats[seat_num] is not None:
@@ -420,35 +1015,36 @@ class Session(Broadcaster):
             player_seat = self.seats.index(player_id)
             self.seats[player_seat] = None
         self.seats[seat_num] = player_id
+        self.record_event(events.EventType.SEAT, seat=seat_num)
         await self.save()
         return {
             "type": "success",
             "message": f"player's seat: {seat_num}"
         }
     
+    @transactional
     async def handle_all_in(self, player: Player):
         await self.get_data()
         new_side_pot = SidePot()
         bet_amount = await player._bet(player.balance)
         new_side_pot.add_bet(bet_amount, player)
         self.side_pots.append(new_side_pot)
+        self.record_event(events.EventType.BET, seat=await self._get_index_by_player(player_id=player.id), value=bet_amount)
         await self.save()
 
-    async def distribute_winnings(self) -> None:
-        winners = await self.get_winners()
+    async def distribute_winnings(self, layers: Optional[List[dict]] = None) -> None:
+        if layers is None:
+            layers = await self.resolve_showdown()
 
-        # Distribute the main pot
-        main_pot_winnings = self.main_pot / len(winners)
-        for winner in winners:
-            player = await self._get_player_by_index(index=winner)
-            player.balance += main_pot_winnings
-
-        # Distribute side pots
-        for side_pot in self.side_pots:
-            side_pot_winnings = side_pot.distribute(winners)
-            for player_id, winnings in side_pot_winnings.items():
-                player = self.get_player(player_id=player_id)
-                player.balance += winnings
+        # Distribute the main pot and side pots
+        for layer in layers:
+            if not layer["winners"]:
+                continue
+            share = layer["amount"] / len(layer["winners"])
+            for winner in layer["winners"]:
+                player = self.get_player(player_id=self.seats[winner])
+                player.balance += share
+                self.record_event(events.EventType.PAYOUT, seat=winner, value=share)
 
         # Reset pots after distribution
         self.main_pot = 0
@@ -492,6 +1088,7 @@ class Session(Broadcaster):
                 count += 1
         return count
         
+    @transactional
     async def start_game(self) -> dict:
         data = await self.get_data()
         if len(data["players"]) < 2:
@@ -504,24 +1101,25 @@ class Session(Broadcaster):
         self.current_bet = 0.0
         self.status = SessionStatus.GAME
         self.stage = SessionStage.PREFLOP
-        self.board.cards.clear()
-        
-        for _ in range(5):
-            card = self.deck.deal_card()
-            self.board.add_card(card)
-
-        for player in self.players:
-            player.hand.cards.clear()
+        self.hand_start = self.revision
+
+        self.deck = Deck(pool=self.variant.deck_pool)
+        self.hand_seed = self.deck.seed.hex()
+        board, holes = self.deck.deal_hand(players=len(self.players), hole_cards=self.variant.hole_cards)
+        self.board = Hand(board)
+        for player, hole in zip(self.players, holes):
+            player.hand = Hand(hole)
             player.status = PlayerStatus.WAITING
-            for _ in range(2):
-                card = self.deck.deal_card()
-                player.hand.add_card(card)
+            player.contributed = 0.0
+        self.record_event(events.EventType.DEAL, value=len(self.players))
 
+        await self.record_hand_seed()
         await self.save()
 
         dealer = self.get_random_player()
         self.dealer = await self._get_index_by_player(player_id=dealer.id)
         await dealer._bet(self.small_blind)
+        self.record_event(events.EventType.BLIND, seat=self.dealer, value=self.small_blind)
         self.total_bet += self.small_blind
         self.current_bet = self.small_blind
         self.main_pot += self.small_blind
@@ -530,13 +1128,14 @@ class Session(Broadcaster):
         next_player_id = self.seats[next_player_index]
         next_player = self.get_player(player_id=next_player_id)
         await next_player._bet(self.big_blind)
+        self.record_event(events.EventType.BLIND, seat=next_player_index, value=self.big_blind)
         self.total_bet += self.big_blind
         self.current_bet = self.big_blind
         self.main_pot += self.big_blind
         await self.save()
         next_player_index = await self._get_next_busy_seat(next_player.id)
         self.current_player = next_player_index
-        await self.save()
+        await self.save(flush=True)
 
         return {
             "type": "success",
@@ -563,18 +1162,23 @@ class Session(Broadcaster):
     
     async def check_if_showdown(self) -> None:
         if self.stage == SessionStage.SHOWDOWN:
-            winners = await self.get_winners()
-            await self.distribute_winnings()
+            self.record_event(events.EventType.SHOWDOWN, value=self.main_pot + sum(side_pot.amount for side_pot in self.side_pots))
+            layers = await self.resolve_showdown()
+            await self.distribute_winnings(layers=layers)
+            record = self.hand_record(layers=layers)
 
             await self.end_game()
+            self.on_commit(partial(self._archive_hand, record))
 
             return {
                 "type": "success",
                 "message": "ends",
-                "winners": winners
+                "winners": layers[0]["winners"],
+                "pots": layers
             }
         return None
     
+    @transactional
     async def bet(self, player_id: UUID4, value: float) -> dict:
         allowed = await self.check_allowed_actions()
         if "bet" not in allowed:
@@ -590,6 +1194,8 @@ class Session(Broadcaster):
                 "message": "now is not this user move"
             }
         player = self.get_player(player_id=player_id)
+        if self.variant.pot_limit:
+            value = min(value, self.get_pot_limit(player=player))
         if value >= player.balance:
             value = player.balance
             new_side_pot = SidePot()
@@ -598,10 +1204,11 @@ class Session(Broadcaster):
             self.side_pots.append(new_side_pot)
             self.total_bet += bet_amount
         else:
-            total_value = await player._bet(value)
-            self.main_pot += total_value
-            self.current_bet += total_value
-            self.total_bet += total_value
+            bet_amount = await player._bet(value)
+            self.main_pot += bet_amount
+            self.current_bet += bet_amount
+            self.total_bet += bet_amount
+        self.record_event(events.EventType.BET, seat=user_seat, value=bet_amount)
         await self.save()
         next_player_index = await self._get_next_busy_seat(player.id)
         self.current_player = next_player_index
@@ -621,6 +1228,7 @@ class Session(Broadcaster):
             "allowed_actions": await self.check_allowed_actions()
         }
     
+    @transactional
     async def call(self, player_id: UUID4) -> dict:
         allowed = await self.check_allowed_actions()
         if "call" not in allowed:
@@ -643,11 +1251,12 @@ class Session(Broadcaster):
             self.side_pots.append(new_side_pot)
             self.total_bet += call_amount
         else:
-            total_value = await player._call(self.current_bet)
-            self.main_pot += total_value
-            self.total_bet += total_value
+            call_amount = await player._call(self.current_bet)
+            self.main_pot += call_amount
+            self.total_bet += call_amount
         # delta = await player._call(bet=self.current_bet)
         # self.total_bet += delta
+        self.record_event(events.EventType.CALL, seat=user_seat, value=call_amount)
         await self.save()
         next_player_index = await self._get_next_busy_seat(player.id)
         self.current_player = next_player_index
@@ -667,6 +1276,7 @@ class Session(Broadcaster):
             "allowed_actions": await self.check_allowed_actions()
         }
     
+    @transactional
     async def raise_bet(self, player_id: UUID4, value: float) -> dict:
         allowed = await self.check_allowed_actions()
         if "raise" not in allowed:
@@ -682,6 +1292,8 @@ class Session(Broadcaster):
                 "message": "now is not this user move"
             }
         player = self.get_player(player_id=player_id)
+        if self.variant.pot_limit:
+            value = min(value, self.get_pot_limit(player=player))
         if value >= player.balance:
             value = player.balance
             new_side_pot = SidePot()
@@ -697,9 +1309,11 @@ class Session(Broadcaster):
             self.main_pot += total_value
             self.total_bet += total_value
             self.current_bet += total_value + temp_bet - self.current_bet
+            bet_amount = total_value
         # delta = await player._raise(value=value)
         # self.total_bet += delta
         # self.current_bet = player.currentbet
+        self.record_event(events.EventType.RAISE, seat=user_seat, value=bet_amount)
         await self.save()
         next_player_index = await self._get_next_busy_seat(player.id)
         self.current_player = next_player_index
@@ -719,6 +1333,21 @@ class Session(Broadcaster):
             "allowed_actions": await self.check_allowed_actions()
         }
     
+    def get_pot_limit(self, player: Player) -> float:
+        """biggest amount <player> may put in with one bet or raise in pot-limit games:
+        the call plus a raise the size of the pot after that call
+
+        Args:
+            player (Player): acting player
+
+        Returns:
+            float: chips the player may add
+        """
+        pot = self.main_pot + sum(side_pot.amount for side_pot in self.side_pots)
+        to_call = max((self.current_bet or 0.0) - player.currentbet, 0.0)
+        return to_call + pot + to_call
+
+    @transactional
     async def pass_board(self, player_id: UUID4) -> dict:
         allowed = await self.check_allowed_actions()
         if "pass" not in allowed:
@@ -735,6 +1364,7 @@ class Session(Broadcaster):
             }
         player = self.get_player(player_id=player_id)
         await player._pass()
+        self.record_event(events.EventType.FOLD, seat=user_seat)
         await self.save()
         next_player_index = await self._get_next_busy_seat(player.id)
         self.current_player = next_player_index
@@ -759,99 +1389,134 @@ class Session(Broadcaster):
             "allowed_actions": await self.check_allowed_actions()
         }
     
-    async def get_winners(self) -> List[int]:
-        best_hand = None
-        best_player = None
+    async def get_hand_keys(self) -> Dict[int, Any]:
+        """one comparable key per seat still in the hand, player hands are not changed
 
+        Returns:
+            Dict[int, Any]: seat index -> hand key, bigger key is better hand
+        """
+        seats = []
+        players = []
         for index, player_id in enumerate(self.seats):
             if player_id is None:
                 continue
             player = self.get_player(player_id=player_id)
-            if player.status == PlayerStatus.PASS:
+            if player is None or player.status == PlayerStatus.PASS or not player.hand.cards:
                 continue
-            for card in self.board.cards:
-                player.hand.add_card(card=card)
-            player_hand = player.hand
-            hand_value = player_hand.evaluate()
-            if best_hand is None or hand_value[0] > best_hand[0]:
-                best_hand = hand_value
-                best_player = index
-            elif hand_value[0] == best_hand[0]:
-                for card1, card2 in zip(hand_value[1], best_hand[1]):
-                    rank_value1 = player_hand.rank_value(card1[0])
-                    rank_value2 = player_hand.rank_value(card2[0])
-                    if rank_value1 > rank_value2:
-                        best_hand = hand_value
-                        best_player = index
-                        break
-                    elif rank_value1 < rank_value2:
-                        break
-
-        winners = [best_player]
+            seats.append(index)
+            players.append(player)
+        board = [card.index for card in self.board.cards]
+        if self.variant == GameVariant.OMAHA:
+            # exactly two hole cards and three board cards, best of 60 combinations
+            candidates = [omaha_combinations(hole=[card.index for card in player.hand.cards], board=board) for player in players]
+            if settings.HAND_EVALUATOR == "legacy":
+                return {
+                    seat: max(Hand([CARDS[index] for index in cards]).legacy_key() for cards in hand)
+                    for seat, hand in zip(seats, candidates)
+                }
+            scores = await showdown_batcher.evaluate_best(candidates=candidates)
+            return dict(zip(seats, scores))
+        if self.variant == GameVariant.SHORT_DECK:
+            # the legacy evaluator only knows standard rankings
+            scores = await short_deck_batcher.evaluate(hands=[[card.index for card in player.hand.cards] + board for player in players])
+            return dict(zip(seats, scores))
+        if settings.HAND_EVALUATOR == "legacy":
+            return {seat: player.hand.legacy_key(board=self.board) for seat, player in zip(seats, players)}
+        scores = await showdown_batcher.evaluate(hands=[[card.index for card in player.hand.cards] + board for player in players])
+        return dict(zip(seats, scores))
+
+    async def resolve_showdown(self) -> List[dict]:
+        """evaluates every hand once and finds winners of the main pot and of each side pot
+
+        Returns:
+            List[dict]: pot layers from the main pot up, {"amount": float, "winners": [seat index]}
+        """
+        keys = await self.get_hand_keys()
+        contributions = {}
         for index, player_id in enumerate(self.seats):
-            if player_id is None:
-                continue
-            player = self.get_player(player_id=player_id)
-            if index == best_player or player.status == PlayerStatus.PASS:
-                continue
-            player_hand = player.hand
-            hand_value = player_hand.evaluate()
-            if hand_value[0] == best_hand[0]:
-                is_tie = True
-                for card1, card2 in zip(hand_value[1], best_hand[1]):
-                    rank_value1 = player_hand.rank_value(card1[0])
-                    rank_value2 = player_hand.rank_value(card2[0])
-                    if rank_value1 != rank_value2:
-                        is_tie = False
-                        break
-                if is_tie:
-                    winners.append(index)
-
-        if len(winners) == 1:
-            return winners
-        else:
-            # Compare the highest cards of the tied players
-            highest_card_winners = []
-            highest_card_value = -1
-            for winner in winners:
-                player = await self._get_player_by_index(index=winner)
-                player_hand = player.hand
-                highest_card = max(player_hand.cards, key=lambda card: player_hand.rank_value(card.rank))
-                highest_card_rank_value = player_hand.rank_value(highest_card.rank)
-                if highest_card_rank_value > highest_card_value:
-                    highest_card_value = highest_card_rank_value
-                    highest_card_winners = [winner]
-                elif highest_card_rank_value == highest_card_value:
-                    highest_card_winners.append(winner)
-
-            if len(highest_card_winners) == 1:
-                return highest_card_winners
-            else:
-                # Compare the remaining cards of the tied players
-                final_winners = []
-                for winner in highest_card_winners:
-                    player = await self._get_player_by_index(index=winner)
-                    player_hand = player.hand
-                    remaining_cards = sorted(player_hand.cards, key=lambda card: player_hand.rank_value(card.rank), reverse=True)
-                    if not final_winners:
-                        final_winners.append(winner)
-                    else:
-                        current_winner_player = await self._get_player_by_index(index=final_winners[0])
-                        current_winner_hand = current_winner_player.hand
-                        current_winner_remaining_cards = sorted(current_winner_hand.cards, key=lambda card: current_winner_hand.rank_value(card.rank), reverse=True)
-                        for card1, card2 in zip(remaining_cards, current_winner_remaining_cards):
-                            rank_value1 = player_hand.rank_value(card1.rank)
-                            rank_value2 = current_winner_hand.rank_value(card2.rank)
-                            if rank_value1 > rank_value2:
-                                final_winners = [winner]
-                                break
-                            elif rank_value1 < rank_value2:
-                                break
-                        else:
-                            final_winners.append(winner)
-
-                return final_winners
-            
+            player = self.get_player(player_id=player_id) if player_id is not None else None
+            if player is not None:
+                contributions[index] = player.contributed
+        # side pots only tell where all-in chips went, the layers follow what everyone put in
+        total = self.main_pot + sum(side_pot.amount for side_pot in self.side_pots)
+        pots = build_pots(contributions=contributions, live=keys, total=total)
+        return resolve_pots(keys=keys, pots=pots)
+
+    async def get_winners(self) -> List[int]:
+        layers = await self.resolve_showdown()
+        return layers[0]["winners"]
+
+    def get_visible_board(self) -> List[Card]:
+        # the whole board is dealt on start, players see it stage by stage
+        visible = (0, 3, 4, 5, 5)[self.stage.value]
+        return self.board.cards[:visible]
+
+    async def get_equity(self, player_id: UUID4, samples: Optional[int] = None) -> dict:
+        player = self.get_player(player_id=player_id)
+        opponents = await self.get_count_active_players() - 1
+        # equity tables and simulations are built for two hole cards
+        if self.status != SessionStatus.GAME or self.variant != GameVariant.HOLDEM or player is None or player.status == PlayerStatus.PASS or opponents < 1:
+            return {
+                "type": "error",
+                "message": "equity is not available"
+            }
+        try:
+            equity = await calculate_equity(
+                hole=[card.index for card in player.hand.cards],
+                board=[card.index for card in self.get_visible_board()],
+                opponents=opponents,
+                samples=samples
+            )
+        except ValueError as e:
+            return {
+                "type": "error",
+                "message": str(e)
+            }
+        data = {"type": "equity"}
+        data.update(equity)
+        return data
+
+    def send_all_in_equity(self) -> None:
+        """once every remaining player is all-in, enumerates their exact equity in a
+        task of its own and sends it after the state broadcast. A preflop
+        enumeration takes about a second, the table goes on with its mailbox meanwhile
+        """
+        if self.status != SessionStatus.GAME or self.variant != GameVariant.HOLDEM:
+            return
+        players = [player for player in self.players if player.status not in (PlayerStatus.PASS, PlayerStatus.NOT_READY)]
+        if len(players) < 2 or any(player.status != PlayerStatus.ALL_IN for player in players):
+            return
+        if self.equity_task is not None:
+            # the result for an earlier street is outdated
+            self.equity_task.cancel()
+        # cards are taken now, the next action may change the table before the task runs
+        self.equity_task = asyncio.get_running_loop().create_task(self._send_all_in_equity(
+            player_ids=[player.id for player in players],
+            holes=[[card.index for card in player.hand.cards] for player in players],
+            board=[card.index for card in self.get_visible_board()],
+            hand_seed=self.hand_seed
+        ))
+
+    async def _send_all_in_equity(self, player_ids: List[UUID4], holes: List[List[int]], board: List[int], hand_seed: Optional[str]) -> None:
+        try:
+            equity = await calculate_exact_equity(holes=holes, board=board)
+            # sent as an action of the table, after the actions queued meanwhile
+            await self.actor.submit(self._broadcast_all_in_equity, player_ids, board, equity, hand_seed)
+        except ActorClosedError:
+            pass
+        except Exception:
+            logger.exception("all-in equity of %s failed", self.id)
+
+    async def _broadcast_all_in_equity(self, player_ids: List[UUID4], board: List[int], equity: List[dict], hand_seed: Optional[str]) -> None:
+        if self.status != SessionStatus.GAME or self.hand_seed != hand_seed:
+            # the hand ended while the runouts were counted
+            return
+        await self.send_all_data({
+            "type": "all_in_equity",
+            "board": board,
+            "all_in_equity": {str(player_id): player_equity for player_id, player_equity in zip(player_ids, equity)}
+        })
+
     async def move_next_stage(self):
         for seat in self.seats:
             if seat is not None:
@@ -862,8 +1527,10 @@ class Session(Broadcaster):
         self.current_bet = 0.0
         self.stage = SessionStage((self.stage.value + 1) % 5)
         self.current_player = self.dealer
+        self.record_event(events.EventType.STREET, value=self.stage.value)
         await self.save()
     
+    @transactional
     async def check(self, player_id: UUID4) -> dict:
         await self.get_data()
         user_seat = await self._get_index_by_player(player_id=player_id)
@@ -874,6 +1541,7 @@ class Session(Broadcaster):
             }
         player = self.get_player(player_id=player_id)
         await player._check()
+        self.record_event(events.EventType.CHECK, seat=user_seat)
         await self.save()
         next_player_index = await self._get_next_busy_seat(player.id)
         self.current_player = next_player_index
@@ -893,6 +1561,50 @@ class Session(Broadcaster):
             "allowed_actions": await self.check_allowed_actions()
         }
     
+    def hand_record(self, layers: List[dict]) -> dict:
+        """finished hand as app.utils.history.HandArchiver queues it, taken before end_game resets the table
+
+        Args:
+            layers (List[dict]): pot layers the hand was settled with
+
+        Returns:
+            dict: HandHistory fields but actions and last_revision
+        """
+        won: Dict[int, float] = {}
+        for layer in layers:
+            for winner in layer["winners"]:
+                won[winner] = won.get(winner, 0.0) + layer["amount"] / len(layer["winners"])
+        players = []
+        for seat, player_id in enumerate(self.seats):
+            player = self.get_player(player_id=player_id) if player_id is not None else None
+            if player is None or not player.hand.cards:
+                continue
+            players.append({
+                "seat": seat,
+                "id": str(player.id),
+                "hand": [card.index for card in player.hand.cards],
+                "balance": player.balance,
+                "won": won.get(seat, 0.0)
+            })
+        return {
+            "session_id": self.id,
+            "hand_seed": self.hand_seed,
+            "variant": self.variant.value,
+            "small_blind": self.small_blind,
+            "big_blind": self.big_blind,
+            "board": bytes(card.index for card in self.board.cards),
+            "players": players,
+            "pot": sum(layer["amount"] for layer in layers),
+            "first_revision": self.hand_start,
+            "ended_at": datetime.now()
+        }
+
+    async def send_state(self) -> None:
+        await self.send_all_data(self.data)
+
+    def _archive_hand(self, record: dict) -> None:
+        hand_archiver.submit({**record, "last_revision": self.revision})
+
     async def end_game(self) -> None:
         self.stage = SessionStage.PREFLOP
         self.status = SessionStatus.LOBBY
@@ -907,9 +1619,10 @@ class Session(Broadcaster):
         for player in self.players:
             player.hand = Hand()
             player.currentbet = 0.0
+            player.contributed = 0.0
             player.status = PlayerStatus.NOT_READY
 
-        await self.save()
+        await self.save(flush=True)
     
     async def send_chat_message(self, player_id: UUID4, message: str) -> None:
         player = self.get_player(player_id=player_id)
@@ -918,6 +1631,8 @@ class Session(Broadcaster):
         send_time = datetime.now()
         message_obj = Message(player_id=player.id, username=player.name, message=message, timestamp=send_time)
         await self.chat.send_message(message=message_obj)
+        if self.messages is not None:
+            self.messages.append(message_obj.__str__())
         data = {
             "type": "chat_incoming",
             "payload": message_obj.__str__()
@@ -936,12 +1651,16 @@ class Session(Broadcaster):
 class SessionsContainer:
     # COMPLETE
     def __init__(self) -> None:
-        self.sessions: List[Session] = []
+        self.sessions: Dict[UUID4, Session] = {}
+        # player id -> id of the session the player is at
+        self.player_sessions: Dict[UUID4, UUID4] = {}
+        # sessions being rebuilt from their snapshots, concurrent lookups share the load
+        self.loading: Dict[UUID4, asyncio.Future] = {}
         self.factory: SessionFactory = create_factory()
 
     # COMPLETE
     async def find_session_by_uuid(self, session_id: UUID4) -> Optional[Session]:
-        """finds session by its uuid
+        """finds session by its uuid, a stored session this worker does not hold is loaded
 
         Args:
             session_id (UUID4): sought session uuid
@@ -949,30 +1668,74 @@ class SessionsContainer:
         Returns:
             Optional[Session]: Session object with <session_id> if exists
         """
-        session = await Session.get_session_by_uuid(session_id=session_id)
+        session = self.get_session(session_id=session_id)
+        if session is not None:
+            return session
+        loading = self.loading.get(session_id)
+        if loading is None:
+            loading = self.loading[session_id] = asyncio.ensure_future(self._load_session(session_id))
+            loading.add_done_callback(lambda _: self.loading.pop(session_id, None))
+        return await asyncio.shield(loading)
+
+    async def _load_session(self, session_id: UUID4) -> Optional[Session]:
+        if not await binary_r.exists(session_key(session_id)):
+            return None
+        session = Session(uuid=session_id)
+        await session.get_data(reload=True)
+        self.add_session(session)
+        if session.players:
+            # snapshots stored before the reverse index existed
+            await binary_r.hset(
+                PLAYER_SESSIONS_KEY,
+                mapping=dict.fromkeys([str(player.id) for player in session.players], str(session_id))
+            )
         return session
     
     def get_session(self, session_id: UUID4) -> Optional[Session]:
-        for session in self.sessions:
-            if session.id == session_id:
-                return session
-        return None
+        """session held by this worker, see find_session_by_uuid for stored ones
+        """
+        return self.sessions.get(session_id)
+
+    def index_players(self, session_id: UUID4, added: Set[UUID4], removed: Set[UUID4]) -> None:
+        """updates player -> session index, called by Session.index_players
+
+        Args:
+            session_id (UUID4): session the players joined or left
+            added (Set[UUID4]): ids of players that joined
+            removed (Set[UUID4]): ids of players that left
+        """
+        for player_id in removed:
+            if self.player_sessions.get(player_id) == session_id:
+                del self.player_sessions[player_id]
+        for player_id in added:
+            self.player_sessions[player_id] = session_id
 
     # COMPLETE
-    async def create_session(self, max_players: int = None, owner: UUID4 = None) -> Session:
+    async def create_session(self, max_players: int = None, owner: UUID4 = None, variant: GameVariant = GameVariant.HOLDEM) -> Session:
         """creates session and appends it in sessions_container
 
         Args:
             max_players (int, optional): session max players. Defaults to None.
+            variant (GameVariant, optional): poker variant. Defaults to GameVariant.HOLDEM.
 
         Returns:
             Session: created Session object
         """        
-        session = await Session.create(owner=owner, max_players=max_players)
-        self.sessions.append(session)
+        session = await Session.create(owner=owner, max_players=max_players, variant=variant)
+        self.add_session(session)
 
         return session
 
+    def add_session(self, session: Session) -> None:
+        """registers Session object and indexes its players
+
+        Args:
+            session (Session): session to hold
+        """
+        self.sessions[session.id] = session
+        session.container = self
+        session.index_players()
+
     # COMPLETE
     async def remove_session_by_uuid(self, uuid: UUID4) -> bool:
         """deletes Session object and removes it from sessions_container
@@ -983,19 +1746,21 @@ class SessionsContainer:
         Returns:
             bool: True if deleted, False if not
         """
-        session = self.get_session(session_id=uuid)
+        session = self.sessions.pop(uuid, None)
         if session is None:
-            return False
-        try:
-            self.sessions.remove(session)
-        except ValueError:
-            return False
-        await Session.delete(session_id=uuid)
+            # not loaded since the worker started, only the snapshot is left
+            return await Session.delete(session_id=uuid)
+        self.index_players(session_id=uuid, added=set(), removed=session.indexed_players)
+        session.container = None
+        # actions already queued run first
+        await session.actor.submit(Session.delete, session_id=uuid)
+        session.actor.close()
         return True
 
     # COMPLETE
     async def find_user_session(self, uuid: UUID4) -> Optional[Session]:
-        """finds user's current session
+        """finds user's current session, through the stored reverse index when
+        this worker does not hold it
 
         Args:
             uuid (UUID4): user uuid
@@ -1003,11 +1768,16 @@ class SessionsContainer:
         Returns:
             Optional[Session]: Session object that user playing in
         """
-        for session in self.sessions:
-            for player in session.players:
-                if player.id == uuid:
-                    return session
-        return None
+        session_id = self.player_sessions.get(uuid)
+        if session_id is not None:
+            return self.sessions.get(session_id)
+        stored = await binary_r.hget(PLAYER_SESSIONS_KEY, str(uuid))
+        if stored is None:
+            return None
+        session = await self.find_session_by_uuid(session_id=UUID(stored.decode()))
+        if session is None or session.get_player(player_id=uuid) is None:
+            return None
+        return session
     
     # COMPLETE
     async def get_session_by_uuid(self, uuid: UUID4) -> Optional[Session]:
@@ -1019,28 +1789,30 @@ class SessionsContainer:
         Returns:
             Optional[Session]: Session object if exists
         """        
-        return await Session.get_session_by_uuid(session_id=uuid)
+        return await self.find_session_by_uuid(session_id=uuid)
     
     async def get_session_by_user_id(self, uuid: UUID4) -> Optional[Session]:
         return await self.find_user_session(uuid=uuid)
     
     # COMPLETE
-    async def add_user(self, user_id: UUID4, session_id: UUID4) -> bool:
+    async def add_user(self, user_id: UUID4, session_id: UUID4, name: Optional[str] = None) -> bool:
         """adds user uuid into Session object with <session_id> uuid
 
         Args:
             user_id (UUID4): user uuid
             session_id (UUID4): Session object uuid
+            name (Optional[str], optional): player name. Defaults to the user uuid.
 
         Returns:
             bool: True if added successfully, False if not
         """        
         if await self.find_user_session(uuid=user_id) is not None:
             return False
-        if await self.get_session_by_uuid(uuid=session_id) is None:
+        session = await self.find_session_by_uuid(session_id=session_id)
+        if session is None:
             return False
-        player = Player(uuid=user_id)
-        return await Session.add_player(player=player, session_id=session_id)
+        player = Player(uuid=user_id, name=name or str(user_id))
+        return await session.actor.submit(session.add_player, player=player)
     
     # COMPLETE
     async def remove_player(self, user_id: UUID4) -> bool:
@@ -1055,21 +1827,22 @@ class SessionsContainer:
         user_session = await self.find_user_session(uuid=user_id)
         if user_session is None:
             return False
-        return await Session.remove_player(user_id=user_id, session_id=user_session.id)
+        return await user_session.actor.submit(user_session.remove_player, user_id=user_id)
     
 
 class SessionFactory(AbstractSessionFactory):
-    async def create_session(self, owner: UUID4, max_players: int = None) -> Session:
+    async def create_session(self, owner: UUID4, max_players: int = None, variant: GameVariant = GameVariant.HOLDEM) -> Session:
         """create concrete session
 
         Args:
             owner (UUID4): new game owner uuid
             max_players (int, optional): max game players count. Defaults to None.
+            variant (GameVariant, optional): poker variant. Defaults to GameVariant.HOLDEM.
 
         Returns:
             Session: created Session object 
         """        
-        return await Session.create(owner=owner, max_players=max_players)
+        return await Session.create(owner=owner, max_players=max_players, variant=variant)
     
 
 def create_factory() -> SessionFactory:
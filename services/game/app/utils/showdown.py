@@ -0,0 +1,137 @@
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.evaluator import Evaluator, evaluator, short_deck_evaluator
+from app import settings
+
+
+class ShowdownBatcher:
+    """collects showdown hands of all tables reaching showdown in the same
+    event loop tick and scores them with a single Evaluator.evaluate_batch call
+    """
+
+    def __init__(self, evaluator: Evaluator) -> None:
+        self.evaluator = evaluator
+        self.pending: List[Tuple[List[List[List[int]]], asyncio.Future]] = []
+
+    async def evaluate(self, hands: List[List[int]]) -> List[int]:
+        """scores hands of one table
+
+        Args:
+            hands (List[List[int]]): card indices of every hand (hole and board cards)
+
+        Returns:
+            List[int]: hand strengths in the same order
+        """
+        return await self.evaluate_best(candidates=[[hand] for hand in hands])
+
+    async def evaluate_best(self, candidates: List[List[List[int]]]) -> List[int]:
+        """scores hands that are the best of several card sets, like Omaha
+
+        Args:
+            candidates (List[List[List[int]]]): card sets allowed for every hand
+
+        Returns:
+            List[int]: strength of the best card set of each hand
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self.pending:
+            loop.call_soon(self.flush)
+        self.pending.append((candidates, future))
+        return await future
+
+    def _evaluate_rows(self, rows: List[List[int]]) -> List[int]:
+        # numpy call overhead only pays off for bigger batches
+        if len(rows) < settings.SHOWDOWN_BATCH_MIN_ROWS:
+            return [self.evaluator.evaluate(row) for row in rows]
+        return self.evaluator.evaluate_batch(np.array(rows, dtype=np.int8)).tolist()
+
+    def flush(self) -> None:
+        # results are handed out by position, hands of cancelled waiters must not take any
+        pending = [(hands, future) for hands, future in self.pending if not future.cancelled()]
+        self.pending = []
+        # hands of different size can not share one array
+        groups = {}
+        for candidates, future in pending:
+            for hand in candidates:
+                for cards in hand:
+                    groups.setdefault(len(cards), []).append(cards)
+        try:
+            strengths = {
+                size: iter(self._evaluate_rows(rows))
+                for size, rows in groups.items()
+            }
+        except Exception as exc:
+            for candidates, future in pending:
+                if not future.cancelled():
+                    future.set_exception(exc)
+            return
+        for candidates, future in pending:
+            result = [max(next(strengths[len(cards)]) for cards in hand) for hand in candidates]
+            if not future.cancelled():
+                future.set_result(result)
+
+
+def build_pots(contributions: Dict[int, float], live: Iterable[int], total: Optional[float] = None) -> List[Tuple[float, List[int]]]:
+    """splits the chips every seat put in during the hand into the main pot and side pots.
+    Each all-in amount of a live seat closes a layer, a layer is contested by the live
+    seats that put in at least its level
+
+    Args:
+        contributions (Dict[int, float]): seat index -> chips put in, folded seats included
+        live (Iterable[int]): seats still in the hand
+        total (Optional[float], optional): chips in the pot, the part nobody at the table
+            put in (players that left) goes to the main pot. Defaults to None.
+
+    Returns:
+        List[Tuple[float, List[int]]]: amount and eligible seats of each pot, main pot first
+    """
+    live = [seat for seat in live if seat in contributions]
+    levels = sorted({contributions[seat] for seat in live if contributions[seat] > 0})
+    pots = []
+    previous = 0.0
+    for level in levels:
+        amount = sum(min(put, level) - min(put, previous) for put in contributions.values())
+        pots.append((amount, [seat for seat in live if contributions[seat] >= level]))
+        previous = level
+    # folded bets above the last live level go to the top pot, chips of players
+    # that left the table to the main pot
+    over = sum(max(put - previous, 0.0) for put in contributions.values())
+    missing = max(total - sum(contributions.values()), 0.0) if total is not None else 0.0
+    if not pots:
+        return [(over + missing, live)] if over + missing > 0 else []
+    if over > 0:
+        pots[-1] = (pots[-1][0] + over, pots[-1][1])
+    if missing > 1e-9:
+        pots[0] = (pots[0][0] + missing, pots[0][1])
+    return pots
+
+
+def resolve_pots(keys: Dict[int, Any], pots: List[Tuple[float, Iterable[int]]]) -> List[dict]:
+    """finds winners of every pot layer in one pass over precomputed hand keys
+
+    Args:
+        keys (Dict[int, Any]): seat index -> comparable hand key of every player still in the hand
+        pots (List[Tuple[float, Iterable[int]]]): amount and eligible seats of each pot, main pot first
+
+    Returns:
+        List[dict]: {"amount": float, "winners": [seat index]} for each pot
+    """
+    layers = []
+    for amount, eligible in pots:
+        contenders = [seat for seat in eligible if seat in keys]
+        if contenders:
+            best = max(keys[seat] for seat in contenders)
+            winners = [seat for seat in contenders if keys[seat] == best]
+        else:
+            # nobody eligible is left in the hand, the pot goes with the previous layer
+            winners = layers[-1]["winners"] if layers else []
+        layers.append({"amount": amount, "winners": winners})
+    return layers
+
+
+showdown_batcher = ShowdownBatcher(evaluator=evaluator)
+short_deck_batcher = ShowdownBatcher(evaluator=short_deck_evaluator)
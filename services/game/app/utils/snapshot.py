@@ -0,0 +1,250 @@
+import json
+import struct
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.utils.evaluator import card_index
+
+
+# session and player hashes store one binary value per field, the session hash
+# carries the schema version in VERSION_FIELD. Hashes without it hold json values
+# (version 1), they are migrated when read
+VERSION = 2
+VERSION_FIELD = "v"
+# commit counter of the session, see app.utils.persistence.compare_and_set
+REVISION_FIELD = "revision"
+# revision the other fields were written at, commits after it are only in the
+# event log of the table, see app.utils.events
+SNAPSHOT_FIELD = "snapshot"
+HEADER = struct.Struct("<H")
+
+NO_UUID = bytes(16)
+
+_U8 = struct.Struct("<B")
+_I16 = struct.Struct("<h")
+_F64 = struct.Struct("<d")
+_U64 = struct.Struct("<Q")
+_POT = struct.Struct("<dB")
+
+Codec = Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]
+
+
+def _uuid_bytes(value: Optional[UUID]) -> bytes:
+    if value is None:
+        return NO_UUID
+    if not isinstance(value, UUID):
+        value = UUID(str(value))
+    return value.bytes
+
+
+def _bytes_uuid(data: bytes) -> Optional[UUID]:
+    return UUID(bytes=data) if data != NO_UUID else None
+
+
+def _encode_uuids(values: List[Optional[UUID]]) -> bytes:
+    return b"".join(_uuid_bytes(value) for value in values)
+
+
+def _decode_uuids(data: bytes) -> List[Optional[UUID]]:
+    return [_bytes_uuid(data[start:start + 16]) for start in range(0, len(data), 16)]
+
+
+def _encode_number(value: Optional[float]) -> bytes:
+    return _F64.pack(value) if value is not None else b""
+
+
+def _decode_number(data: bytes) -> Optional[float]:
+    return _F64.unpack(data)[0] if data else None
+
+
+def _encode_index(value: Optional[int]) -> bytes:
+    return _I16.pack(-1 if value is None else value)
+
+
+def _decode_index(data: bytes) -> Optional[int]:
+    value = _I16.unpack(data)[0]
+    return None if value == -1 else value
+
+
+def _encode_side_pots(pots: List[Tuple[float, List[UUID]]]) -> bytes:
+    return b"".join(_POT.pack(amount, len(players)) + _encode_uuids(players) for amount, players in pots)
+
+
+def _decode_side_pots(data: bytes) -> List[Tuple[float, List[UUID]]]:
+    pots = []
+    position = 0
+    while position < len(data):
+        amount, count = _POT.unpack_from(data, position)
+        position += _POT.size
+        pots.append((amount, _decode_uuids(data[position:position + 16 * count])))
+        position += 16 * count
+    return pots
+
+
+UUID_CODEC: Codec = (_uuid_bytes, _bytes_uuid)
+UUIDS_CODEC: Codec = (_encode_uuids, _decode_uuids)
+SMALL_INT_CODEC: Codec = (_U8.pack, lambda data: _U8.unpack(data)[0])
+INDEX_CODEC: Codec = (_encode_index, _decode_index)
+NUMBER_CODEC: Codec = (_encode_number, _decode_number)
+CARDS_CODEC: Codec = (bytes, list)
+TEXT_CODEC: Codec = (str.encode, bytes.decode)
+SIDE_POTS_CODEC: Codec = (_encode_side_pots, _decode_side_pots)
+REVISION_CODEC: Codec = (_U64.pack, lambda data: _U64.unpack(data)[0])
+
+SESSION_SCHEMA: Dict[str, Codec] = {
+    "id": UUID_CODEC,
+    "status": SMALL_INT_CODEC,
+    "seats": UUIDS_CODEC,
+    "small_blind": NUMBER_CODEC,
+    "big_blind": NUMBER_CODEC,
+    "max_players": SMALL_INT_CODEC,
+    "stage": SMALL_INT_CODEC,
+    "board": CARDS_CODEC,
+    "current_player": INDEX_CODEC,
+    "dealer": INDEX_CODEC,
+    "current_bet": NUMBER_CODEC,
+    "total_bet": NUMBER_CODEC,
+    "owner": UUID_CODEC,
+    "main_pot": NUMBER_CODEC,
+    "side_pots": SIDE_POTS_CODEC,
+    "variant": SMALL_INT_CODEC,
+    "last_activity": NUMBER_CODEC,
+    "players": UUIDS_CODEC,
+    REVISION_FIELD: REVISION_CODEC,
+    "hand_start": REVISION_CODEC
+}
+
+PLAYER_SCHEMA: Dict[str, Codec] = {
+    "id": UUID_CODEC,
+    "name": TEXT_CODEC,
+    "balance": NUMBER_CODEC,
+    "hand": CARDS_CODEC,
+    "currentbet": NUMBER_CODEC,
+    "status": SMALL_INT_CODEC,
+    "contributed": NUMBER_CODEC
+}
+
+
+def encode(schema: Dict[str, Codec], state: dict) -> Dict[str, bytes]:
+    """encodes typed state as hash fields
+
+    Args:
+        schema (Dict[str, Codec]): SESSION_SCHEMA or PLAYER_SCHEMA
+        state (dict): field name -> value
+
+    Returns:
+        Dict[str, bytes]: field name -> binary value
+    """
+    return {name: schema[name][0](value) for name, value in state.items()}
+
+
+def decode(schema: Dict[str, Codec], fields: Dict[bytes, bytes]) -> dict:
+    """decodes hash fields read with a binary connection, unknown fields are skipped
+
+    Args:
+        schema (Dict[str, Codec]): SESSION_SCHEMA or PLAYER_SCHEMA
+        fields (Dict[bytes, bytes]): HGETALL result
+
+    Returns:
+        dict: field name -> value
+    """
+    state = {}
+    for name, value in fields.items():
+        codec = schema.get(name.decode())
+        if codec is not None:
+            state[name.decode()] = codec[1](value)
+    return state
+
+
+def header_version(header: Optional[bytes]) -> int:
+    return HEADER.unpack(header)[0] if header is not None else 1
+
+
+def version(fields: Dict[bytes, bytes]) -> int:
+    return header_version(fields.get(VERSION_FIELD.encode()))
+
+
+def revisions(fields: Dict[bytes, bytes]) -> Tuple[int, int]:
+    """revision the snapshot fields were written at and revision of the last commit
+
+    Args:
+        fields (Dict[bytes, bytes]): HGETALL result of a session hash
+
+    Returns:
+        Tuple[int, int]: both revisions, equal when the hash is up to date
+    """
+    revision = fields.get(REVISION_FIELD.encode())
+    written = fields.get(SNAPSHOT_FIELD.encode(), revision)
+    decode = REVISION_CODEC[1]
+    return (decode(written) if written else 0), (decode(revision) if revision else 0)
+
+
+def decode_value(schema: Dict[str, Codec], name: str, value: Optional[bytes], schema_version: int) -> Any:
+    """decodes one field read with HGET, in any schema version
+
+    Args:
+        schema (Dict[str, Codec]): SESSION_SCHEMA or PLAYER_SCHEMA
+        name (str): field name
+        value (Optional[bytes]): stored value
+        schema_version (int): version of the session hash
+
+    Returns:
+        Any: decoded value, None if the field is not stored
+    """
+    if value is None:
+        return None
+    if schema_version == 1:
+        return (session_from_json if schema is SESSION_SCHEMA else player_from_json)({name: json.loads(value)}).get(name)
+    return schema[name][1](value)
+
+
+def _json_uuid(value: Any) -> Optional[UUID]:
+    return UUID(str(value)) if value is not None and value != "None" else None
+
+
+def _json_cards(hand: dict) -> List[int]:
+    return sorted((card_index(card["rank"], card["suit"]) for card in hand.get("cards", [])), key=lambda card: card >> 2)
+
+
+def session_from_json(data: dict) -> dict:
+    """typed session state of a version 1 snapshot, a json blob or decoded json hash fields
+
+    Args:
+        data (dict): json values, players as ids or as player dicts
+
+    Returns:
+        dict: state in SESSION_SCHEMA types, missing fields are left out
+    """
+    converters = {
+        "id": _json_uuid,
+        "seats": lambda seats: [_json_uuid(seat) for seat in seats],
+        "board": _json_cards,
+        "owner": _json_uuid,
+        "side_pots": lambda pots: [
+            (pot.get("amount", 0), [_json_uuid(player) for player in pot.get("eligible_players", [])])
+            for pot in pots
+        ],
+        "players": lambda players: [_json_uuid(player["id"] if isinstance(player, dict) else player) for player in players]
+    }
+    return {
+        name: converters.get(name, lambda value: value)(value)
+        for name, value in data.items()
+        if name in SESSION_SCHEMA
+    }
+
+
+def player_from_json(data: dict) -> dict:
+    """typed player state of a version 1 player dict
+
+    Args:
+        data (dict): json values
+
+    Returns:
+        dict: state in PLAYER_SCHEMA types
+    """
+    converters = {"id": _json_uuid, "hand": _json_cards}
+    return {
+        name: converters.get(name, lambda value: value)(value)
+        for name, value in data.items()
+        if name in PLAYER_SCHEMA
+    }
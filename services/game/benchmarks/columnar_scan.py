@@ -0,0 +1,124 @@
+"""scan of a columnar hand export against decoding archived rows
+
+    python -m benchmarks.columnar_scan [--hands 1000000] [--chunk 1000000] [--rows 100000]
+
+Writes <hands> synthetic six handed hands with 12 actions each to a temporary
+export directory, maps it with HandColumns and computes an action type
+histogram, the total pot per variant and the chips won per seat, chunk by
+chunk. The baseline decodes <rows> hand_histories rows the way a query result
+arrives (players JSON, packed actions) and computes the same. Prints JSON with
+bytes per hand on disk and hands scanned per second of both.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.utils import columnar, events
+
+
+def synthetic(hands: int, seats: int, actions: int, seed: int = 0) -> tuple:
+    generator = np.random.default_rng(seed)
+    players, moves = hands * seats, hands * actions
+    columns = {
+        "hand_id": np.arange(1, hands + 1),
+        "session_id": generator.integers(0, 256, (hands, 16), dtype=np.uint8),
+        "variant": generator.integers(1, 4, hands),
+        "small_blind": np.full(hands, 10.0),
+        "big_blind": np.full(hands, 20.0),
+        "pot": generator.integers(30, 2000, hands).astype(float),
+        "ended_at": np.arange(hands) * 1_000_000,
+        "board": generator.integers(0, 52, (hands, columnar.BOARD_CARDS), dtype=np.uint8),
+        "player_seat": np.tile(np.arange(seats), hands),
+        "player_id": generator.integers(0, 256, (players, 16), dtype=np.uint8),
+        "player_hand": generator.integers(0, 52, (players, columnar.HOLE_CARDS), dtype=np.uint8),
+        "player_balance": np.full(players, 1000.0),
+        "player_won": generator.integers(0, 200, players).astype(float),
+        "action_type": generator.integers(1, 11, moves),
+        "action_seat": generator.integers(0, seats, moves),
+        "action_amount": generator.integers(0, 100, moves).astype(float)
+    }
+    return columns, np.full(hands, seats), np.full(hands, actions)
+
+
+def scan(hands: columnar.HandColumns, chunk_size: int) -> dict:
+    histogram = np.zeros(len(events.EventType) + 1, dtype=np.int64)
+    pots = np.zeros(4)
+    won = np.zeros(256)
+    for chunk in hands.chunks(chunk_size):
+        histogram += np.bincount(chunk["action_type"], minlength=len(histogram))
+        pots += np.bincount(chunk["variant"], weights=chunk["pot"], minlength=4)
+        won += np.bincount(chunk["player_seat"], weights=chunk["player_won"], minlength=256)
+    return {"histogram": histogram, "pots": pots, "won": won}
+
+
+def rows_of(hands: columnar.HandColumns, count: int) -> list:
+    players_offsets, actions_offsets = hands["players_offsets"], hands["actions_offsets"]
+    rows = []
+    for index in range(count):
+        seats = range(players_offsets[index], players_offsets[index + 1])
+        moves = range(actions_offsets[index], actions_offsets[index + 1])
+        rows.append({
+            "variant": int(hands["variant"][index]),
+            "pot": float(hands["pot"][index]),
+            "players": json.dumps([
+                {"seat": int(hands["player_seat"][seat]), "hand": hands["player_hand"][seat].tolist(), "won": float(hands["player_won"][seat])}
+                for seat in seats
+            ]),
+            "actions": b"".join(
+                events.ACTION.pack(int(hands["action_type"][move]), int(hands["action_seat"][move]), float(hands["action_amount"][move]))
+                for move in moves
+            )
+        })
+    return rows
+
+
+def decode(rows: list) -> dict:
+    histogram = [0] * (len(events.EventType) + 1)
+    pots = [0.0] * 4
+    won = [0.0] * 256
+    for row in rows:
+        for event, seat, value in events.ACTION.iter_unpack(row["actions"]):
+            histogram[event] += 1
+        pots[row["variant"]] += row["pot"]
+        for player in json.loads(row["players"]):
+            won[player["seat"]] += player["won"]
+    return {"histogram": histogram, "pots": pots, "won": won}
+
+
+def main(arguments: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        writer = columnar.ColumnWriter(directory)
+        for start in range(0, arguments.hands, arguments.chunk):
+            writer.append(*synthetic(min(arguments.chunk, arguments.hands - start), 6, 12, seed=start))
+        writer.close()
+        size = sum(entry.stat().st_size for entry in os.scandir(directory))
+        hands = columnar.HandColumns(directory)
+        started = time.perf_counter()
+        scanned = scan(hands, arguments.chunk)
+        scan_seconds = time.perf_counter() - started
+        count = min(arguments.rows, arguments.hands)
+        rows = rows_of(hands, count)
+        started = time.perf_counter()
+        decoded = decode(rows)
+        decode_seconds = time.perf_counter() - started
+        decoded_actions = hands["action_type"][:hands["actions_offsets"][count]]
+        assert np.array_equal(np.bincount(decoded_actions, minlength=len(decoded["histogram"])), decoded["histogram"])
+    return {
+        "hands": arguments.hands,
+        "bytes_per_hand": size / arguments.hands,
+        "columnar_hands_per_second": arguments.hands / scan_seconds,
+        "decoded_rows_per_second": count / decode_seconds,
+        "actions": int(scanned["histogram"].sum())
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hands", type=int, default=1_000_000)
+    parser.add_argument("--chunk", type=int, default=1_000_000)
+    parser.add_argument("--rows", type=int, default=100_000)
+    print(json.dumps(main(parser.parse_args()), indent=2))
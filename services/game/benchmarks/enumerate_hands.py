@@ -0,0 +1,101 @@
+"""exhaustive enumeration of all 133,784,560 seven-card hands
+
+    python -m benchmarks.enumerate_hands [--workers 1 2 4] [--output results.json]
+
+Every hand goes through Evaluator.evaluate_batch in a multiprocessing pool,
+one task per pair of lowest cards. The category histogram is checked against
+the reference counts and throughput is reported for each worker count.
+Exit code is 1 when any histogram differs from the reference.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from itertools import combinations
+from math import comb
+from multiprocessing import Pool
+from typing import List, Tuple
+
+import numpy as np
+
+from app.utils.evaluator import evaluator, category, CATEGORY_NAMES
+
+
+REFERENCE = {
+    "high_card": 23294460,
+    "one_pair": 58627800,
+    "two_pair": 31433400,
+    "three_of_a_kind": 6461620,
+    "straight": 6180020,
+    "flush": 4047644,
+    "full_house": 3473184,
+    "four_of_a_kind": 224848,
+    "straight_flush": 37260,
+    "royal_flush": 4324
+}
+SLICE = 1 << 18
+
+_rests: np.ndarray = None
+
+
+def _init_worker() -> None:
+    global _rests
+    evaluator.prepare()
+    # 5-card combinations of range(50) ordered by their highest card: the ones
+    # drawn from range(m) are exactly the first comb(m, 5) rows
+    rests = np.fromiter((card for rest in combinations(range(50), 5) for card in rest), dtype=np.int8).reshape(-1, 5)
+    _rests = rests[np.argsort(rests[:, 4], kind="stable")]
+
+
+def count_task(task: Tuple[int, int]) -> List[int]:
+    """category histogram of all hands whose two lowest cards are <task>
+    """
+    first, second = task
+    rests = _rests[:comb(51 - second, 5)] + np.int8(second + 1)
+    histogram = np.zeros(len(CATEGORY_NAMES), dtype=np.int64)
+    for start in range(0, len(rests), SLICE):
+        part = rests[start:start + SLICE]
+        hands = np.empty((len(part), 7), dtype=np.int8)
+        hands[:, 0] = first
+        hands[:, 1] = second
+        hands[:, 2:] = part
+        histogram += np.bincount(category(evaluator.evaluate_batch(hands)), minlength=len(CATEGORY_NAMES))
+    return histogram.tolist()
+
+
+def enumerate_hands(workers: int) -> dict:
+    tasks = [(first, second) for first in range(52) for second in range(first + 1, 52) if 51 - second >= 5]
+    # biggest tasks first keeps the pool busy until the end
+    tasks.sort(key=lambda task: -comb(51 - task[1], 5))
+    histogram = np.zeros(len(CATEGORY_NAMES), dtype=np.int64)
+    started = time.perf_counter()
+    with Pool(processes=workers, initializer=_init_worker) as pool:
+        for part in pool.imap_unordered(count_task, tasks):
+            histogram += part
+    elapsed = time.perf_counter() - started
+    hands = int(histogram.sum())
+    counts = dict(zip(CATEGORY_NAMES, histogram.tolist()))
+    return {
+        "workers": workers,
+        "hands": hands,
+        "seconds": elapsed,
+        "hands_per_second": hands / elapsed,
+        "histogram": counts,
+        "matches_reference": counts == REFERENCE
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[os.cpu_count() or 1])
+    parser.add_argument("--output")
+    arguments = parser.parse_args()
+
+    runs = [enumerate_hands(workers=workers) for workers in arguments.workers]
+    report = {"reference": REFERENCE, "runs": runs}
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=2)
+    print(json.dumps(report, indent=2))
+    sys.exit(int(not all(run["matches_reference"] for run in runs)))
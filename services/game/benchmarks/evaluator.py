@@ -0,0 +1,199 @@
+"""hand evaluator benchmark and differential check
+
+    python -m benchmarks.evaluator bench [--hands 200000] [--output results.json]
+    python -m benchmarks.evaluator compare base.json new.json
+    python -m benchmarks.evaluator diff [--hands 2000000] [--legacy-hands 20000]
+
+bench measures hands per second of every evaluator for 5, 6 and 7 cards on
+random hands and on tie-heavy hands (a straight or flush board most players
+share), and writes JSON that compare can put side by side between commits.
+
+diff scores the same random hands with every evaluator and counts hands whose
+category differs and neighbour pairs whose ordering differs (better, equal,
+worse). Exit code is 1 when lookup and batch disagree.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from app.utils.player import CARDS, Hand
+from app.utils.evaluator import evaluator, category, CATEGORY_NAMES
+
+
+SIZES = (5, 6, 7)
+DISTRIBUTIONS = ("random", "ties")
+EVALUATORS = ("legacy", "lookup", "batch")
+# legacy needs about a millisecond per 7-card hand
+LEGACY_SHARE = 0.01
+
+
+def random_hands(rng: np.random.Generator, count: int, size: int) -> np.ndarray:
+    return np.argsort(rng.random((count, 52)), axis=1)[:, :size].astype(np.int8)
+
+
+def tie_heavy_hands(rng: np.random.Generator, count: int, size: int) -> np.ndarray:
+    """hands on a board that is a straight or a flush by itself, hole cards rarely improve it
+    """
+    hands = np.empty((count, size), dtype=np.int8)
+    for row in range(count):
+        if rng.random() < 0.5:
+            low = int(rng.integers(0, 9))
+            board = [(low + i) * 4 + int(rng.integers(0, 4)) for i in range(5)]
+        else:
+            suit = int(rng.integers(0, 4))
+            board = [rank * 4 + suit for rank in rng.choice(13, size=5, replace=False)]
+        rest = [card for card in rng.permutation(52).tolist() if card not in board]
+        hands[row] = (board + rest)[:size]
+    return hands
+
+
+def legacy_keys(hands: np.ndarray) -> List[tuple]:
+    return [Hand([CARDS[card] for card in row]).legacy_key() for row in hands.tolist()]
+
+
+def lookup_keys(hands: np.ndarray) -> List[int]:
+    return [evaluator.evaluate(row) for row in hands.tolist()]
+
+
+def batch_keys(hands: np.ndarray) -> List[int]:
+    return evaluator.evaluate_batch(hands).tolist()
+
+
+KEY_FUNCTIONS: Dict[str, Callable[[np.ndarray], list]] = {
+    "legacy": legacy_keys,
+    "lookup": lookup_keys,
+    "batch": batch_keys
+}
+
+
+def key_category(name: str, key) -> int:
+    return key[0] if name == "legacy" else category(key)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def bench(arguments: argparse.Namespace) -> dict:
+    rng = np.random.default_rng(arguments.seed)
+    evaluator.prepare()
+    results = {}
+    for name in arguments.evaluators:
+        results[name] = {}
+        for size in SIZES:
+            results[name][str(size)] = {}
+            for distribution in DISTRIBUTIONS:
+                count = arguments.hands if name != "legacy" else max(100, int(arguments.hands * LEGACY_SHARE))
+                make = random_hands if distribution == "random" else tie_heavy_hands
+                hands = make(rng, count, size)
+                started = time.perf_counter()
+                KEY_FUNCTIONS[name](hands)
+                elapsed = time.perf_counter() - started
+                results[name][str(size)][distribution] = count / elapsed
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "hands": arguments.hands,
+            "seed": arguments.seed
+        },
+        "hands_per_second": results
+    }
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=2)
+    return report
+
+
+def compare(arguments: argparse.Namespace) -> dict:
+    with open(arguments.base) as file:
+        base = json.load(file)["hands_per_second"]
+    with open(arguments.new) as file:
+        new = json.load(file)["hands_per_second"]
+    rows = {}
+    for name, sizes in new.items():
+        for size, distributions in sizes.items():
+            for distribution, value in distributions.items():
+                before = base.get(name, {}).get(size, {}).get(distribution)
+                rows[f"{name}/{size}/{distribution}"] = {
+                    "base": before,
+                    "new": value,
+                    "speedup": value / before if before else None
+                }
+    return rows
+
+
+def ordering(keys: list) -> np.ndarray:
+    # -1, 0, 1 for each pair of neighbour hands
+    return np.array([(a > b) - (a < b) for a, b in zip(keys, keys[1:])], dtype=np.int8)
+
+
+def diff(arguments: argparse.Namespace) -> dict:
+    rng = np.random.default_rng(arguments.seed)
+    evaluator.prepare()
+    report = {}
+    for size in arguments.sizes:
+        hands = random_hands(rng, arguments.hands, size)
+        keys = {name: KEY_FUNCTIONS[name](hands) for name in ("lookup", "batch")}
+        keys["legacy"] = KEY_FUNCTIONS["legacy"](hands[:arguments.legacy_hands])
+        report[str(size)] = {}
+        for first, second in (("lookup", "batch"), ("lookup", "legacy")):
+            count = min(len(keys[first]), len(keys[second]))
+            first_keys, second_keys = keys[first][:count], keys[second][:count]
+            categories = [
+                index for index in range(count)
+                if key_category(first, first_keys[index]) != key_category(second, second_keys[index])
+            ]
+            orders = np.flatnonzero(ordering(first_keys) != ordering(second_keys))
+            report[str(size)][f"{first}:{second}"] = {
+                "hands": count,
+                "category_mismatches": len(categories),
+                "ordering_mismatches": int(len(orders)),
+                "examples": [
+                    {
+                        "cards": [repr(CARDS[card]) for card in hands[index].tolist()],
+                        first: CATEGORY_NAMES[key_category(first, first_keys[index])],
+                        second: CATEGORY_NAMES[key_category(second, second_keys[index])]
+                    }
+                    for index in categories[:arguments.examples]
+                ]
+            }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bench_parser = commands.add_parser("bench")
+    bench_parser.add_argument("--hands", type=int, default=200000)
+    bench_parser.add_argument("--evaluators", nargs="+", default=list(EVALUATORS), choices=EVALUATORS)
+    bench_parser.add_argument("--seed", type=int, default=0)
+    bench_parser.add_argument("--output")
+
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+
+    diff_parser = commands.add_parser("diff")
+    diff_parser.add_argument("--hands", type=int, default=2000000)
+    diff_parser.add_argument("--legacy-hands", type=int, default=20000)
+    diff_parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    diff_parser.add_argument("--examples", type=int, default=5)
+    diff_parser.add_argument("--seed", type=int, default=0)
+
+    arguments = parser.parse_args()
+    result = {"bench": bench, "compare": compare, "diff": diff}[arguments.command](arguments)
+    print(json.dumps(result, indent=2))
+    if arguments.command == "diff":
+        sys.exit(int(any(size["lookup:batch"]["hands"] and (size["lookup:batch"]["category_mismatches"] or size["lookup:batch"]["ordering_mismatches"]) for size in result.values())))
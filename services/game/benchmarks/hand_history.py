@@ -0,0 +1,118 @@
+"""hand history archival under a burst of finished hands
+
+    python -m benchmarks.hand_history [--hands 20000] [--tables 500] [--actions 12] [--batch-size 500]
+
+Writes the event log of <tables> tables, <hands> / <tables> hands each with
+<actions> commits, then submits all hands at once the way the showdowns of a
+busy node do and lets the archiver copy them to hand_histories. Prints JSON
+with the time one submit takes on the action path, the longest stall of the
+event loop while batches are written, hands written per second and the
+average batch time.
+Needs a running Redis and Postgres with the hand_histories migration applied,
+the written rows and event logs are deleted at the end.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import List
+from uuid import UUID, uuid4
+
+from tortoise import Tortoise
+
+from app.db import TORTOISE_ORM
+from app.models import HandHistory
+from app.utils.history import HandArchiver
+from app.utils.redis import binary_r
+from app.utils import events
+
+
+def microseconds(values: List[float]) -> dict:
+    ordered = sorted(values)
+    return {
+        "p50": ordered[len(ordered) // 2] * 1e6,
+        "p99": ordered[int(0.99 * (len(ordered) - 1))] * 1e6,
+        "max": ordered[-1] * 1e6
+    }
+
+
+async def write_logs(tables: List[UUID], hands: int, actions: int) -> List[dict]:
+    records = []
+    async with binary_r.pipeline(transaction=False) as pipe:
+        for index in range(hands):
+            session_id = tables[index % len(tables)]
+            first = index // len(tables) * actions
+            for revision in range(first + 1, first + actions + 1):
+                entry = events.encode_entry([(events.EventType.CALL, revision % 6, 20.0)], {}, {})
+                events.queue_append(pipe, session_id, revision, entry)
+            records.append({
+                "session_id": session_id,
+                "hand_seed": None,
+                "variant": 1,
+                "small_blind": 10.0,
+                "big_blind": 20.0,
+                "board": bytes(range(5)),
+                "players": [{"seat": seat, "id": str(uuid4()), "hand": [10 + seat, 20 + seat], "balance": 1000.0, "won": 0.0} for seat in range(6)],
+                "pot": 120.0,
+                "first_revision": first,
+                "last_revision": first + actions,
+                "ended_at": datetime.now()
+            })
+        await pipe.execute()
+    return records
+
+
+async def main(arguments: argparse.Namespace) -> dict:
+    await Tortoise.init(config=TORTOISE_ORM)
+    tables = [uuid4() for _ in range(arguments.tables)]
+    archiver = HandArchiver(batch_size=arguments.batch_size, interval=0.1, max_queued=arguments.hands)
+    stall = 0.0
+    running = True
+
+    async def watch_loop() -> None:
+        nonlocal stall
+        while running:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, time.perf_counter() - started - 0.001)
+
+    try:
+        records = await write_logs(tables, arguments.hands, arguments.actions)
+        archiver.start()
+        watcher = asyncio.get_running_loop().create_task(watch_loop())
+        submits = []
+        started = time.perf_counter()
+        for record in records:
+            submitted = time.perf_counter()
+            archiver.submit(record)
+            submits.append(time.perf_counter() - submitted)
+        while archiver.stats.written < len(records) and archiver.stats.failed == 0:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        running = False
+        await watcher
+        await archiver.stop()
+        stats = archiver.stats.dict()
+    finally:
+        await HandHistory.filter(session_id__in=tables).delete()
+        await binary_r.delete(*[events.events_key(session_id) for session_id in tables])
+        await Tortoise.close_connections()
+    return {
+        "hands": arguments.hands,
+        "submit_us": microseconds(submits),
+        "max_loop_stall_ms": stall * 1e3,
+        "hands_per_second": stats["written"] / elapsed,
+        "batches": stats["batches"],
+        "batch_ms": stats["batch_ms"],
+        "failed": stats["failed"]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hands", type=int, default=20000)
+    parser.add_argument("--tables", type=int, default=500)
+    parser.add_argument("--actions", type=int, default=12)
+    parser.add_argument("--batch-size", type=int, default=500)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,121 @@
+"""stress test of concurrent session commits
+
+    python -m benchmarks.session_conflicts [--workers 4] [--players 16] [--retries 3]
+
+Starts <workers> processes acting on the same session the way game workers
+behind the gateway do, each with its own Session object. Every worker adds
+and seats <players> players of its own, waits for the others, then removes
+every second of them. An action rejected after all retries is sent again, as
+a client would. Without compare-and-set commits concurrent actions overwrite
+each other and players or seats go missing. Prints JSON with the summed
+commit counters of all workers, the conflict rate and the players and seats
+that differ from the expected ones. Exit code is 1 when any update was lost.
+Needs a running Redis.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+from multiprocessing.synchronize import Barrier
+from typing import Awaitable, Callable
+from uuid import UUID
+
+from app.utils.sessions import Session
+from app.utils.player import Player
+from app.utils.persistence import StaleSessionError, commit_stats
+from app import settings
+
+
+def player_id(worker: int, index: int) -> UUID:
+    # ids the parent can recompute to build the expected table
+    return UUID(int=(worker + 1) << 32 | index)
+
+
+async def until_committed(action: Callable[[], Awaitable]) -> None:
+    while True:
+        try:
+            return await action()
+        except StaleSessionError:
+            continue
+
+
+async def act(session_id: UUID, worker: int, players: int, barrier: Barrier) -> dict:
+    session = Session(uuid=session_id)
+    await session.get_data()
+    for index in range(players):
+        player = Player(uuid=player_id(worker, index), name=f"player {worker}:{index}")
+        await until_committed(lambda: session.add_player(player))
+        await until_committed(lambda: session.take_seat(player_id=player.id, seat_num=worker * players + index))
+    # removing players needs the others seated, see Session._get_next_busy_seat
+    await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+    for index in range(0, players, 2):
+        await until_committed(lambda: session.remove_player(player_id(worker, index)))
+    return commit_stats.dict()
+
+
+def work(session_id: UUID, worker: int, players: int, retries: int, barrier: Barrier, results: multiprocessing.Queue) -> None:
+    settings.SESSION_STATE_MODE = "redis"
+    settings.SESSION_COMMIT_RETRIES = retries
+    results.put(asyncio.run(act(session_id, worker, players, barrier)))
+
+
+async def check(session_id: UUID, workers: int, players: int) -> dict:
+    session = Session(uuid=session_id)
+    await session.get_data()
+    await Session.delete(session_id=session_id)
+    kept = {
+        player_id(worker, index): worker * players + index
+        for worker in range(workers) for index in range(1, players, 2)
+    }
+    stored = {player.id for player in session.players}
+    seated = {seat: player for seat, player in enumerate(session.seats) if player is not None}
+    return {
+        "missing_players": len(kept.keys() - stored),
+        "extra_players": len(stored - kept.keys()),
+        "wrong_seats": sum(seated.get(seat) != player for player, seat in kept.items()) + len(seated.keys() - set(kept.values()))
+    }
+
+
+async def main(arguments: argparse.Namespace) -> dict:
+    seats = arguments.workers * arguments.players
+    if seats > 255:
+        raise ValueError("workers * players must not exceed 255 seats")
+    settings.SESSION_STATE_MODE = "redis"
+    session = await Session.create(max_players=seats)
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(arguments.workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=work, args=(session.id, worker, arguments.players, arguments.retries, barrier, results))
+        for worker in range(arguments.workers)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    loop = asyncio.get_running_loop()
+    stats = [await loop.run_in_executor(None, results.get) for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+    totals = {name: sum(worker[name] for worker in stats) for name in ("commits", "conflicts", "retries", "rejected")}
+    attempts = totals["commits"] + totals["conflicts"]
+    return {
+        "workers": arguments.workers,
+        "players_per_worker": arguments.players,
+        "seconds": elapsed,
+        **totals,
+        "conflict_rate": totals["conflicts"] / attempts if attempts else 0.0,
+        **await check(session.id, arguments.workers, arguments.players)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--players", type=int, default=16)
+    parser.add_argument("--retries", type=int, default=settings.SESSION_COMMIT_RETRIES)
+    report = asyncio.run(main(parser.parse_args()))
+    print(json.dumps(report, indent=2))
+    sys.exit(int(any(report[name] for name in ("missing_players", "extra_players", "wrong_seats"))))
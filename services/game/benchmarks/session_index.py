@@ -0,0 +1,81 @@
+"""SessionsContainer lookups as the number of live tables grows
+
+    python -m benchmarks.session_index [--tables 500 5000 50000] [--players 4] [--lookups 20000]
+
+Fills a container with in-memory sessions of <players> players each (no
+Redis is touched) and times get_session and find_user_session for random
+ids, next to the linear scans the container used before its indexes.
+Prints JSON with microseconds per lookup for every table count.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Callable, List, Optional
+from uuid import UUID, uuid4
+
+from app.utils.sessions import Session, SessionsContainer
+from app.utils.player import Player
+
+
+def scan_session(sessions: List[Session], session_id: UUID) -> Optional[Session]:
+    for session in sessions:
+        if session.id == session_id:
+            return session
+    return None
+
+
+def scan_user_session(sessions: List[Session], user_id: UUID) -> Optional[Session]:
+    for session in sessions:
+        for player in session.players:
+            if player.id == user_id:
+                return session
+    return None
+
+
+def fill(tables: int, players: int) -> SessionsContainer:
+    container = SessionsContainer()
+    for _ in range(tables):
+        session = Session(max_players=players)
+        session.players.extend(Player(uuid=uuid4(), name="player") for _ in range(players))
+        container.add_session(session)
+    return container
+
+
+def measure(lookup: Callable[[UUID], object], ids: List[UUID]) -> float:
+    started = time.perf_counter()
+    for value in ids:
+        lookup(value)
+    return (time.perf_counter() - started) / len(ids) * 1e6
+
+
+async def main(arguments: argparse.Namespace) -> dict:
+    rng = random.Random(arguments.seed)
+    results = {}
+    for tables in arguments.tables:
+        container = fill(tables, arguments.players)
+        sessions = list(container.sessions.values())
+        session_ids = [rng.choice(sessions).id for _ in range(arguments.lookups)]
+        user_ids = [rng.choice(rng.choice(sessions).players).id for _ in range(arguments.lookups)]
+        # scans are slow, a share of the lookups is enough
+        scanned = max(10, arguments.lookups * 500 // tables)
+        started = time.perf_counter()
+        for user_id in user_ids:
+            await container.find_user_session(uuid=user_id)
+        results[tables] = {
+            "get_session_us": measure(container.get_session, session_ids),
+            "find_user_session_us": (time.perf_counter() - started) / len(user_ids) * 1e6,
+            "scan_session_us": measure(lambda value: scan_session(sessions, value), session_ids[:scanned]),
+            "scan_user_session_us": measure(lambda value: scan_user_session(sessions, value), user_ids[:scanned])
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, nargs="+", default=[500, 5000, 50000])
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
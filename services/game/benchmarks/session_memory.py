@@ -0,0 +1,109 @@
+"""resident memory of in-memory tables
+
+    python -m benchmarks.session_memory [--tables 2000] [--players 6] [--messages 20]
+
+Builds <tables> idle tables (lobby, <players> seated players, no hand) and
+<tables> active ones (flop of a dealt hand with bets, a side pot and the
+deck), each left the way a written commit leaves it: committed and stored
+snapshot fields, an empty mailbox and <messages> chat lines. No Redis is
+touched. Prints JSON with bytes allocated per idle and per active table,
+measured with tracemalloc, and the bytes of the Session, Player, Hand and
+SidePot objects themselves.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import sys
+import tracemalloc
+from typing import Callable, List
+from uuid import uuid4
+
+from app.utils.sessions import GameVariant, Session, SessionStage, SessionStatus, SidePot
+from app.utils.persistence import PendingChanges
+from app.utils.player import Deck, Hand, Player, PlayerStatus
+from app.utils.redis import binary_r
+
+
+def committed(session: Session) -> Session:
+    """commits the state and keeps what writing it leaves on the object
+    """
+    session._next_revision(snapshot_due=True)
+    pending, session.pending = session.pending, PendingChanges()
+    session.stored_fields, session.stored_players = session._queue_changes(binary_r.pipeline(), pending)
+    return session
+
+
+def seated(players: int, messages: int) -> Session:
+    session = Session(max_players=players, variant=GameVariant.HOLDEM)
+    for seat in range(players):
+        player = Player(uuid=uuid4(), name=f"player {seat}")
+        session.players.append(player)
+        session.seats[seat] = player.id
+    session.messages = [f"2026-10-18 12:00:00::{uuid4()}::player 0::good luck" for _ in range(messages)]
+    return session
+
+
+def idle_table(players: int, messages: int) -> Session:
+    return committed(seated(players, messages))
+
+
+def active_table(players: int, messages: int) -> Session:
+    session = seated(players, messages)
+    session.status = SessionStatus.GAME
+    session.stage = SessionStage.FLOP
+    session.deck = Deck()
+    board, holes = session.deck.deal_hand(players=players)
+    session.board = Hand(board)
+    for player, hole in zip(session.players, holes):
+        player.hand = Hand(hole)
+        player.currentbet = 20.0
+        player.balance -= 20.0
+        player.status = PlayerStatus.CALL
+    side_pot = SidePot()
+    for player in session.players[:2]:
+        side_pot.add_bet(20.0, player)
+    session.side_pots = [side_pot]
+    session.dealer, session.current_player = 0, 1
+    session.current_bet, session.total_bet, session.main_pot = 20.0, 20.0 * players, 20.0 * players
+    return committed(session)
+
+
+def object_size(value: object) -> int:
+    return sys.getsizeof(value) + (sys.getsizeof(value.__dict__) if hasattr(value, "__dict__") else 0)
+
+
+def allocated(build: Callable[[], Session], tables: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions: List[Session] = [build() for _ in range(tables)]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del sessions
+    return size / tables
+
+
+async def main(arguments: argparse.Namespace) -> dict:
+    session = active_table(arguments.players, arguments.messages)
+    return {
+        "tables": arguments.tables,
+        "players": arguments.players,
+        "bytes_per_idle_table": allocated(lambda: idle_table(arguments.players, arguments.messages), arguments.tables),
+        "bytes_per_active_table": allocated(lambda: active_table(arguments.players, arguments.messages), arguments.tables),
+        "object_bytes": {
+            "session": object_size(session),
+            "player": object_size(session.players[0]),
+            "hand": object_size(session.board),
+            "side_pot": object_size(session.side_pots[0])
+        }
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=2000)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--messages", type=int, default=20)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
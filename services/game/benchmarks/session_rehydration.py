@@ -0,0 +1,100 @@
+"""worker restart and lazy rehydration of stored sessions
+
+    python -m benchmarks.session_rehydration [--tables 2000] [--players 4] [--lookups 200]
+
+Stores <tables> sessions of <players> seated players, then starts a fresh
+SessionsContainer the way a restarted worker does. Prints JSON with the
+time the container takes to start, and milliseconds and Redis round trips
+per lookup of a player's table: the first one, which rebuilds the table
+from Redis, and the next ones served from memory.
+Needs a running Redis, the stored sessions are deleted at the end.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import List, Tuple
+from uuid import UUID, uuid4
+
+from app.utils.sessions import Session, SessionsContainer
+from app.utils.player import Player
+from app.utils.persistence import write_behind
+from app.utils.redis import binary_r
+from app import settings
+
+from benchmarks.session_round_trips import RoundTrips
+
+
+def milliseconds(values: List[float]) -> dict:
+    ordered = sorted(values)
+    return {
+        "p50": ordered[len(ordered) // 2] * 1e3,
+        "p99": ordered[int(0.99 * (len(ordered) - 1))] * 1e3
+    }
+
+
+async def store(tables: int, players: int) -> List[Session]:
+    sessions = []
+    for _ in range(tables):
+        session = await Session.create(max_players=players)
+        for seat in range(players):
+            player = Player(uuid=uuid4(), name=f"player {seat}")
+            await session.add_player(player)
+            await session.take_seat(player_id=player.id, seat_num=seat)
+        sessions.append(session)
+    await write_behind.flush_all()
+    return sessions
+
+
+counter = RoundTrips()
+
+
+async def lookup(container: SessionsContainer, user_id: UUID, session_id: UUID) -> Tuple[float, int]:
+    round_trips = counter.round_trips
+    started = time.perf_counter()
+    session = await container.find_user_session(uuid=user_id)
+    elapsed = time.perf_counter() - started
+    if session is None or session.id != session_id:
+        raise RuntimeError(f"player {user_id} did not land on table {session_id}")
+    return elapsed, counter.round_trips - round_trips
+
+
+def summary(lookups: List[Tuple[float, int]]) -> dict:
+    return {
+        "ms": milliseconds([elapsed for elapsed, round_trips in lookups]),
+        "round_trips": sum(round_trips for elapsed, round_trips in lookups) / len(lookups)
+    }
+
+
+async def main(arguments: argparse.Namespace) -> dict:
+    settings.SESSION_STATE_MODE = arguments.mode
+    counter.attach(binary_r)
+    rng = random.Random(arguments.seed)
+    sessions = await store(arguments.tables, arguments.players)
+    try:
+        started = time.perf_counter()
+        container = SessionsContainer()
+        startup = time.perf_counter() - started
+        sampled = rng.sample(sessions, min(arguments.lookups, len(sessions)))
+        cold = [await lookup(container, rng.choice(session.players).id, session.id) for session in sampled]
+        warm = [await lookup(container, rng.choice(session.players).id, session.id) for session in sampled]
+    finally:
+        for session in sessions:
+            await Session.delete(session_id=session.id)
+    return {
+        "tables": arguments.tables,
+        "startup_ms": startup * 1e3,
+        "first_lookup": summary(cold),
+        "next_lookups": summary(warm)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=2000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--mode", default="redis", choices=["redis", "memory"])
+    parser.add_argument("--seed", type=int, default=0)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,172 @@
+"""redis round trips and bytes written per player action
+
+    python -m benchmarks.session_round_trips [--hands 20] [--players 4] [--messages 20] [--modes redis memory]
+                                             [--snapshots commit hand]
+
+Seats the players, posts chat messages and plays scripted hands against the
+configured Redis: every player checks when possible and calls otherwise
+until the showdown. Prints JSON with the average
+number of round trips (a pipeline counts once) and of bytes written
+(arguments of commands that change data) by each action type for every
+session state mode and SESSION_SNAPSHOTS mode.
+Needs a running Redis.
+"""
+import argparse
+import asyncio
+import json
+from collections import defaultdict
+from typing import Optional
+from uuid import uuid4
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from app.utils.redis import r, binary_r
+from app.utils.sessions import Session, SessionStatus
+from app.utils.player import Player
+from app.utils.persistence import write_behind
+from app import settings
+
+
+# a hand that does not reach showdown after this many actions is a bug
+MAX_ACTIONS = 200
+
+
+READ_COMMANDS = {
+    "GET", "MGET", "HGET", "HMGET", "HGETALL", "HLEN", "LRANGE", "LLEN", "SMEMBERS", "ZRANGE",
+    "ZREVRANGE", "ZRANGEBYSCORE", "ZCARD", "XRANGE", "XREAD", "KEYS", "SCAN", "EXISTS", "TYPE",
+    "PING", "WATCH", "UNWATCH", "MULTI", "EXEC"
+}
+
+
+def written_size(args: tuple) -> int:
+    # arguments of commands that change data, reads do not count
+    if str(args[0]).upper() in READ_COMMANDS:
+        return 0
+    return sum(len(arg) if isinstance(arg, bytes) else len(str(arg).encode()) for arg in args)
+
+
+class RoundTrips:
+    """counts network round trips of the redis clients it is attached to, a
+    pipeline is one trip, and bytes of arguments of writing commands
+    """
+
+    def __init__(self) -> None:
+        self.round_trips = 0
+        self.bytes_written = 0
+
+    def add(self, *commands: tuple) -> None:
+        self.round_trips += 1
+        self.bytes_written += sum(written_size(args) for args in commands)
+
+    def attach(self, client: Redis) -> None:
+        """counts what <client> sends from now on, the app keeps using it as is
+
+        Args:
+            client (Redis): shared client, like app.utils.redis.binary_r
+        """
+        execute_command = client.execute_command
+
+        async def counted(*args, **options):
+            self.add(args)
+            return await execute_command(*args, **options)
+
+        def pipeline(transaction: bool = True, shard_hint: Optional[str] = None) -> CountingPipeline:
+            return CountingPipeline(self, client.connection_pool, client.response_callbacks, transaction, shard_hint)
+
+        client.execute_command = counted
+        client.pipeline = pipeline
+
+
+class CountingPipeline(Pipeline):
+    def __init__(self, counter: RoundTrips, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.counter = counter
+
+    async def immediate_execute_command(self, *args, **options):
+        # WATCH and reads while watching go to the server one by one
+        self.counter.add(args)
+        return await super().immediate_execute_command(*args, **options)
+
+    async def execute(self, raise_on_error: bool = True):
+        if self.command_stack:
+            self.counter.add(*(args for args, options in self.command_stack))
+        return await super().execute(raise_on_error=raise_on_error)
+
+
+counter = RoundTrips()
+
+
+def counters() -> tuple:
+    return counter.round_trips, counter.bytes_written
+
+
+def record(costs: dict, action: str, before: tuple) -> None:
+    costs[action].append(tuple(now - then for now, then in zip(counters(), before)))
+
+
+async def play_hand(session: Session, costs: dict) -> None:
+    before = counters()
+    await session.start_game()
+    record(costs, "start", before)
+    for _ in range(MAX_ACTIONS):
+        if session.status != SessionStatus.GAME:
+            return
+        player = session.get_player(session.seats[session.current_player])
+        allowed = await session.check_allowed_actions()
+        before = counters()
+        if "check" in allowed:
+            await session.check(player_id=player.id)
+            record(costs, "check", before)
+        else:
+            await session.call(player_id=player.id)
+            record(costs, "call", before)
+    raise RuntimeError("hand did not finish")
+
+
+async def run(mode: str, snapshots: str, hands: int, players: int, messages: int) -> dict:
+    settings.SESSION_STATE_MODE = mode
+    settings.SESSION_SNAPSHOTS = snapshots
+    session = await Session.create(max_players=players)
+    for seat in range(players):
+        player = Player(uuid=uuid4(), name=f"player {seat}")
+        await session.add_player(player)
+        await session.take_seat(player_id=player.id, seat_num=seat)
+    for index in range(messages):
+        player = session.players[index % players]
+        await session.send_chat_message(player_id=player.id, message=f"message {index} from {player.name}")
+    costs = defaultdict(list)
+    try:
+        for _ in range(hands):
+            await play_hand(session, costs)
+        await write_behind.flush_all()
+    finally:
+        await Session.delete(session_id=session.id)
+        await r.delete(f"message:{session.id}")
+    return {
+        action: {
+            "round_trips": sum(trips for trips, written in values) / len(values),
+            "bytes_written": sum(written for trips, written in values) / len(values)
+        }
+        for action, values in costs.items()
+    }
+
+
+async def main(arguments: argparse.Namespace) -> dict:
+    counter.attach(r)
+    counter.attach(binary_r)
+    return {
+        f"{mode}/{snapshots}": await run(mode, snapshots, arguments.hands, arguments.players, arguments.messages)
+        for mode in arguments.modes
+        for snapshots in arguments.snapshots
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hands", type=int, default=20)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--modes", nargs="+", default=["redis", "memory"], choices=["redis", "memory"])
+    parser.add_argument("--snapshots", nargs="+", default=["commit", "hand"], choices=["commit", "hand"])
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,67 @@
+"""showdown cost per table size
+
+    python -m benchmarks.showdown [--tables 200] [--max-players 9] [--evaluators lookup legacy]
+
+Sessions are built in memory, resolve_showdown touches neither Redis nor
+websockets. Prints JSON with microseconds per table for each evaluator and
+table size, resolving one table at a time and all tables in the same tick.
+"""
+import argparse
+import asyncio
+import json
+import time
+from uuid import uuid4
+
+from app.utils.player import Deck, Hand, Player, PlayerStatus
+from app.utils.sessions import Session
+from app.utils.evaluator import evaluator
+from app import settings
+
+
+def make_table(players: int) -> Session:
+    deck = Deck()
+    board, holes = deck.deal_hand(players=players)
+    session = Session(max_players=players, players=[], seats=[None] * players, board=Hand(board), side_pots=[])
+    session.players = []
+    for seat, hole in enumerate(holes):
+        player = Player(uuid=uuid4(), name=f"player {seat}")
+        player.hand = Hand(hole)
+        player.status = PlayerStatus.CALL
+        session.players.append(player)
+        session.seats[seat] = player.id
+    session.main_pot = 100.0 * players
+    return session
+
+
+async def measure(tables: list, together: bool) -> float:
+    started = time.perf_counter()
+    if together:
+        await asyncio.gather(*[table.resolve_showdown() for table in tables])
+    else:
+        for table in tables:
+            await table.resolve_showdown()
+    return (time.perf_counter() - started) / len(tables) * 1e6
+
+
+async def main(arguments: argparse.Namespace) -> dict:
+    evaluator.prepare()
+    results = {}
+    for name in arguments.evaluators:
+        settings.HAND_EVALUATOR = name
+        results[name] = {}
+        for players in range(2, arguments.max_players + 1):
+            tables = [make_table(players) for _ in range(arguments.tables)]
+            await measure(tables[:10], together=False)
+            results[name][players] = {
+                "sequential_us_per_table": await measure(tables, together=False),
+                "same_tick_us_per_table": await measure(tables, together=True)
+            }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--max-players", type=int, default=9)
+    parser.add_argument("--evaluators", nargs="+", default=["lookup", "legacy"])
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,86 @@
+"""table actor throughput and serialization on one event loop
+
+    python -m benchmarks.table_actors [--tables 5000] [--clients 4] [--actions 20]
+
+Every table gets <clients> concurrent senders, each sending <actions>
+actions. An action reads a counter of its table, gives the loop away and
+writes the counter back, the way Session actions span their awaits. Through
+the table actors every increment survives; calling the same actions
+directly loses updates. Prints JSON with actions per second, lost updates,
+mailbox depth and latency percentiles of both ways.
+Needs no Redis.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from app.utils.actor import TableActor, ActorStats
+from app.utils import actor
+
+
+class Table:
+    def __init__(self, name: int) -> None:
+        self.counter = 0
+        self.actor = TableActor(name=name)
+
+    async def increment(self) -> None:
+        counter = self.counter
+        await asyncio.sleep(0)
+        self.counter = counter + 1
+
+
+async def send(table: Table, actions: int, through_actor: bool) -> None:
+    for _ in range(actions):
+        if through_actor:
+            await table.actor.submit(table.increment)
+        else:
+            await table.increment()
+
+
+async def run(tables: int, clients: int, actions: int, through_actor: bool) -> dict:
+    actor.actor_stats = ActorStats()
+    running = [Table(name=index) for index in range(tables)]
+    depth = 0
+
+    async def sample_depth() -> None:
+        nonlocal depth
+        while True:
+            depth = max(depth, actor.actor_stats.dict()["max_queue_depth"])
+            await asyncio.sleep(0.01)
+
+    sampler = asyncio.get_running_loop().create_task(sample_depth())
+    started = time.perf_counter()
+    await asyncio.gather(*[send(table, actions, through_actor) for table in running for _ in range(clients)])
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+    stats = actor.actor_stats.dict()
+    for table in running:
+        table.actor.close()
+    expected = clients * actions
+    return {
+        "actions_per_second": tables * expected / elapsed,
+        "lost_updates": sum(expected - table.counter for table in running),
+        "max_queue_depth": depth,
+        "wait_ms": stats["wait_ms"],
+        "processing_ms": stats["processing_ms"]
+    }
+
+
+async def main(arguments: argparse.Namespace) -> dict:
+    return {
+        "tables": arguments.tables,
+        "actor": await run(arguments.tables, arguments.clients, arguments.actions, through_actor=True),
+        "direct": await run(arguments.tables, arguments.clients, arguments.actions, through_actor=False)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--actions", type=int, default=20)
+    report = asyncio.run(main(parser.parse_args()))
+    print(json.dumps(report, indent=2))
+    sys.exit(int(report["actor"]["lost_updates"] > 0))
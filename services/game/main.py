@@ -10,6 +10,12 @@ from app.db import init
 from app import settings
 from app.routes import router as game_router
 from app.utils.sessions import provider
+from app.utils.evaluator import evaluator, short_deck_evaluator
+from app.utils.equity import shutdown_executor
+from app.utils.preflop import load_table
+from app.utils.deck import deck_pool
+from app.utils.persistence import write_behind
+from app.utils.history import hand_archiver
 
 
 def init_middlewares(app: FastAPI):
@@ -34,9 +40,17 @@ main_app_lifespan = app.router.lifespan_context
 @asynccontextmanager
 async def lifespan_wrapper(app):
     asyncio.create_task(provider())
+    evaluator.prepare()
+    short_deck_evaluator.prepare()
+    load_table()
+    deck_pool.fill()
     await init(app)
     async with main_app_lifespan(app) as maybe_state:
+        hand_archiver.start()
         yield maybe_state
+        await write_behind.flush_all()
+        await hand_archiver.stop()
+    shutdown_executor()
 app.router.lifespan_context = lifespan_wrapper
 
 init_middlewares(app)
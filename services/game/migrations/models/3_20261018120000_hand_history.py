@@ -0,0 +1,27 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "hand_histories" (
+    "id" BIGSERIAL NOT NULL PRIMARY KEY,
+    "session_id" UUID NOT NULL,
+    "hand_seed" VARCHAR(64),
+    "variant" SMALLINT NOT NULL,
+    "small_blind" DOUBLE PRECISION NOT NULL,
+    "big_blind" DOUBLE PRECISION NOT NULL,
+    "board" BYTEA NOT NULL,
+    "players" JSONB NOT NULL,
+    "actions" BYTEA NOT NULL,
+    "pot" DOUBLE PRECISION NOT NULL,
+    "first_revision" BIGINT NOT NULL,
+    "last_revision" BIGINT NOT NULL,
+    "ended_at" TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS "idx_hand_histor_session_1593ed" ON "hand_histories" ("session_id");
+CREATE INDEX IF NOT EXISTS "idx_hand_histor_ended_a_3e1c42" ON "hand_histories" ("ended_at");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "hand_histories";"""
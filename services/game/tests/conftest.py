@@ -0,0 +1,26 @@
+import os
+
+# app.settings reads the connection settings at import
+os.environ.setdefault("REDIS_HOST", "localhost")
+os.environ.setdefault("REDIS_PORT", "6379")
+
+import fakeredis
+import pytest
+
+from app.utils.redis import binary_r, r
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+def redis_server(monkeypatch) -> fakeredis.FakeServer:
+    """points the shared redis clients at a fresh in-process server
+    """
+    server = fakeredis.FakeServer()
+    for client, decode_responses in ((r, True), (binary_r, False)):
+        fake = fakeredis.FakeAsyncRedis(server=server, decode_responses=decode_responses)
+        monkeypatch.setattr(client, "connection_pool", fake.connection_pool)
+    return server
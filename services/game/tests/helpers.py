@@ -0,0 +1,40 @@
+from typing import List
+from uuid import uuid4
+
+from app.utils.evaluator import card_index
+from app.utils.player import CARDS, Card, Hand, Player, PlayerStatus
+from app.utils.sessions import GameVariant, Session, SessionStage, SessionStatus
+
+
+RANK_NAMES = {"j": "jack", "q": "queen", "k": "king", "a": "ace"}
+SUIT_NAMES = {"h": "hearts", "d": "diamonds", "c": "clubs", "s": "spades"}
+
+
+def indices(*names: str) -> List[int]:
+    """card indices by short names like "Ah", "10d" or "3c"
+    """
+    return [card_index(RANK_NAMES.get(name[:-1].lower(), name[:-1]), SUIT_NAMES[name[-1]]) for name in names]
+
+
+def cards(*names: str) -> List[Card]:
+    return [CARDS[index] for index in indices(*names)]
+
+
+def dealt_player(name: str, hole: List[str], status: PlayerStatus = PlayerStatus.CALL, contributed: float = 0.0) -> Player:
+    player = Player(uuid=uuid4(), name=name)
+    player.hand = Hand(cards(*hole))
+    player.status = status
+    player.contributed = contributed
+    return player
+
+
+def table(*players: Player, board: List[str], stage: SessionStage = SessionStage.SHOWDOWN) -> Session:
+    """hold'em table in game with <players> seated in order and the whole board dealt
+    """
+    session = Session(max_players=len(players), variant=GameVariant.HOLDEM)
+    session.status, session.stage = SessionStatus.GAME, stage
+    session.board = Hand(cards(*board))
+    for seat, player in enumerate(players):
+        session.players.append(player)
+        session.seats[seat] = player.id
+    return session
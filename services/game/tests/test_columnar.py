@@ -0,0 +1,52 @@
+import json
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import numpy as np
+
+from app.export import batch_columns
+from app.utils import columnar, events
+
+
+DEAL, BET = events.EventType.DEAL.value, events.EventType.BET.value
+
+
+def row(hand_id: int, board: list, players: list, actions: list) -> dict:
+    return {
+        "id": hand_id,
+        "session_id": uuid4(),
+        "variant": 1,
+        "small_blind": 10.0,
+        "big_blind": 20.0,
+        "board": bytes(board),
+        "players": json.dumps(players),
+        "actions": b"".join(events.ACTION.pack(*action) for action in actions),
+        "pot": 60.0,
+        "ended_at": datetime(2026, 10, 18, tzinfo=timezone.utc)
+    }
+
+
+def dealt(seat: int, hand: list, won: float) -> dict:
+    return {"seat": seat, "id": str(uuid4()), "hand": hand, "balance": 1000.0 + won, "won": won}
+
+
+def test_export_round_trip(tmp_path):
+    rows = [
+        row(1, [0, 1, 2, 3, 4], [dealt(0, [5, 6], 30.0), dealt(1, [7, 8], -30.0)], [(DEAL, events.NO_SEAT, 0.0), (BET, 0, 20.0)]),
+        # a stored board shorter than five cards is padded
+        row(2, [9, 10, 11], [dealt(0, [12, 13, 14, 15], 0.0)], [])
+    ]
+    writer = columnar.ColumnWriter(str(tmp_path))
+    writer.append(*batch_columns(rows))
+    writer.close()
+
+    hands = columnar.HandColumns(str(tmp_path))
+    chunk = next(hands.chunks(size=10))
+
+    assert len(hands) == 2
+    assert chunk["board"].tolist() == [[0, 1, 2, 3, 4], [9, 10, 11, columnar.NO_CARD, columnar.NO_CARD]]
+    assert chunk["players_offsets"].tolist() == [0, 2, 3]
+    assert chunk["player_hand"].tolist() == [[5, 6, 255, 255], [7, 8, 255, 255], [12, 13, 14, 15]]
+    assert chunk["actions_offsets"].tolist() == [0, 2, 2]
+    assert chunk["action_type"].tolist() == [DEAL, BET]
+    assert np.allclose(chunk["player_won"], [30.0, -30.0, 0.0])
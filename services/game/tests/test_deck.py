@@ -0,0 +1,59 @@
+from uuid import uuid4
+
+import pytest
+
+from app import settings
+from app.utils.deck import SHORT_DECK_CARDS, STANDARD_CARDS, short_deck_pool, shuffle
+from app.utils.evaluator import RANK_INDEX
+from app.utils.player import Deck, Hand, Player
+from app.utils.redis import r
+from app.utils.sessions import GameVariant, Session
+
+
+def test_shuffle_is_a_permutation_fixed_by_the_seed():
+    order = shuffle(b"hand seed", STANDARD_CARDS)
+
+    assert sorted(order) == sorted(STANDARD_CARDS)
+    assert order == shuffle(b"hand seed", STANDARD_CARDS)
+    assert order != shuffle(b"other seed", STANDARD_CARDS)
+
+
+def test_seed_replays_the_deal():
+    dealt = Deck()
+    board, holes = dealt.deal_hand(players=3)
+
+    replayed = Deck(seed=dealt.seed)
+
+    assert replayed.deal_hand(players=3) == (board, holes)
+    assert len({card.index for hole in holes for card in hole} | {card.index for card in board}) == 11
+
+
+def test_short_deck_starts_at_six():
+    deck = Deck(pool=short_deck_pool)
+
+    assert len(deck.cards) == len(SHORT_DECK_CARDS) == 36
+    assert min(card.rank for card in deck.cards) == RANK_INDEX["6"]
+
+
+@pytest.mark.parametrize("variant", [GameVariant.HOLDEM, GameVariant.SHORT_DECK])
+@pytest.mark.anyio
+async def test_recorded_seed_replays_the_deal_of_its_variant(redis_server, monkeypatch, variant):
+    monkeypatch.setattr(settings, "SESSION_STATE_MODE", "redis")
+    session = await Session.create(max_players=2, variant=variant)
+    for seat in range(2):
+        player = Player(uuid=uuid4(), name=f"player {seat}")
+        await session.add_player(player)
+        await session.take_seat(player_id=player.id, seat_num=seat)
+    await session.start_game()
+
+    entry, = await r.lrange(f"seeds:{session.id}", 0, -1)
+    board, holes = Session.replay_deck(entry).deal_hand(players=2)
+
+    assert Hand(board).cards == session.board.cards
+    assert [Hand(hole).cards for hole in holes] == [player.hand.cards for player in session.players]
+
+
+def test_seed_entries_without_a_variant_replay_as_holdem():
+    seed = bytes(range(16))
+
+    assert Session.replay_deck(seed.hex()).order == Deck(seed=seed).order
@@ -0,0 +1,82 @@
+import asyncio
+import json
+from typing import List
+
+import pytest
+
+from app.utils import sessions
+from app.utils.equity import calculate_equity, simulate_equity
+from app.utils.player import PlayerStatus
+from app.utils.sessions import SessionStage
+
+from helpers import dealt_player, indices, table
+
+
+@pytest.mark.parametrize("samples", [0, -5, 2.5, "1000", True])
+@pytest.mark.anyio
+async def test_rejects_samples_that_are_not_positive_integers(samples):
+    with pytest.raises(ValueError):
+        await calculate_equity(hole=indices("Ah", "Ad"), board=indices("Kd", "9h", "7s"), opponents=1, samples=samples)
+
+
+def test_simulation_needs_a_sample():
+    with pytest.raises(ValueError):
+        simulate_equity(hole=indices("Ah", "Ad"), board=[], opponents=1, samples=0, time_budget=1.0, confidence_half_width=0.01)
+
+
+def test_simulation_counts_runouts():
+    result = simulate_equity(
+        hole=indices("Ah", "Ad"),
+        board=indices("Kd", "9h", "7s"),
+        opponents=1,
+        samples=100,
+        time_budget=10.0,
+        confidence_half_width=0.0,
+        seed=1
+    )
+    assert result["samples"] == 100
+    assert 0.5 < result["equity"] <= 1.0
+
+
+@pytest.mark.anyio
+async def test_table_answers_bad_samples_with_an_error():
+    hero = dealt_player("hero", ["Ah", "Ad"])
+    villain = dealt_player("villain", ["3c", "4d"])
+    session = table(hero, villain, board=["Kd", "9h", "7s", "2c", "Jd"], stage=SessionStage.FLOP)
+
+    answer = await session.get_equity(player_id=hero.id, samples=0)
+
+    assert answer == {"type": "error", "message": "samples must be a positive integer"}
+
+
+class Socket:
+    def __init__(self) -> None:
+        self.received: List[dict] = []
+
+    async def send_json(self, data: str) -> None:
+        self.received.append(json.loads(data))
+
+
+@pytest.mark.anyio
+async def test_all_in_equity_follows_the_state_broadcast(monkeypatch):
+    released = asyncio.Event()
+
+    async def enumerate_slowly(holes: List[List[int]], board: List[int]) -> List[dict]:
+        await released.wait()
+        return [{"win": 0.8, "tie": 0.0, "equity": 0.8}, {"win": 0.2, "tie": 0.0, "equity": 0.2}]
+
+    monkeypatch.setattr(sessions, "calculate_exact_equity", enumerate_slowly)
+    hero = dealt_player("hero", ["Ah", "Ad"], status=PlayerStatus.ALL_IN)
+    villain = dealt_player("villain", ["7c", "2d"], status=PlayerStatus.ALL_IN)
+    hero.websocket = Socket()
+    session = table(hero, villain, board=["Kd", "9h", "7s", "2c", "Jd"], stage=SessionStage.PREFLOP)
+
+    # the state goes out while the runouts are still being counted
+    await session.handle_answer({"type": "success", "message": "call", "allowed_actions": []})
+    assert [message.get("type") for message in hero.websocket.received] == [None]
+
+    released.set()
+    await session.equity_task
+    equity = hero.websocket.received[-1]
+    assert equity["type"] == "all_in_equity" and equity["board"] == []
+    assert equity["all_in_equity"][str(hero.id)]["equity"] == 0.8
@@ -0,0 +1,118 @@
+from typing import List
+
+import numpy as np
+import pytest
+
+from app.utils import evaluator as ranking
+from app.utils.evaluator import evaluator, short_deck_evaluator
+
+from benchmarks.evaluator import KEY_FUNCTIONS, key_category, random_hands
+from helpers import indices
+
+
+def score(*names: str) -> int:
+    return evaluator.evaluate(indices(*names))
+
+
+@pytest.mark.parametrize("names, category", [
+    (["Ah", "Kd", "9c", "7s", "4h", "3d", "2c"], ranking.HIGH_CARD),
+    (["Ah", "Ad", "9c", "7s", "4h"], ranking.ONE_PAIR),
+    (["Ah", "Ad", "9c", "9s", "4h", "4d"], ranking.TWO_PAIR),
+    (["7h", "7d", "7c", "As", "4h", "2d", "Jc"], ranking.THREE_OF_A_KIND),
+    (["Ah", "2d", "3c", "4s", "5h", "Kd", "Kc"], ranking.STRAIGHT),
+    (["2h", "9h", "Jh", "4h", "Kh", "Kd", "Kc"], ranking.FLUSH),
+    (["Kh", "Kd", "Kc", "4s", "4h", "4d", "2c"], ranking.FULL_HOUSE),
+    (["9h", "9d", "9c", "9s", "Ah"], ranking.FOUR_OF_A_KIND),
+    (["5h", "6h", "7h", "8h", "9h", "10h", "Ad"], ranking.STRAIGHT_FLUSH),
+    (["10s", "Js", "Qs", "Ks", "As", "Ah", "Ad"], ranking.ROYAL_FLUSH)
+])
+def test_categories(names: List[str], category: int):
+    assert ranking.category(score(*names)) == category
+
+
+def test_wheel_is_the_lowest_straight():
+    assert score("Ah", "2d", "3c", "4s", "5h") < score("2h", "3d", "4c", "5s", "6h")
+
+
+def test_kickers_break_ties_and_sixth_cards_do_not():
+    assert score("Ah", "Ad", "Kc", "7s", "4h") > score("Ah", "Ad", "Qc", "7s", "4h")
+    assert score("10c", "10h", "3d", "3c", "9h") > score("6d", "6c", "5s", "5c", "3s")
+    assert score("Ah", "Ad", "Kc", "Qs", "Jh", "3d", "2c") == score("As", "Ac", "Kd", "Qh", "Jd", "4d", "2h")
+
+
+def test_best_five_of_seven():
+    # the board flush beats the pair in the hole
+    assert score("2h", "2d", "4h", "7h", "9h", "Jh", "Kc") == score("4h", "7h", "9h", "Jh", "2h")
+
+
+@pytest.mark.parametrize("size", [5, 6, 7])
+def test_batch_matches_single_hands(size: int):
+    hands = np.argsort(np.random.default_rng(size).random((500, 52)), axis=1)[:, :size].astype(np.int8)
+
+    assert evaluator.evaluate_batch(hands).tolist() == [evaluator.evaluate(hand) for hand in hands.tolist()]
+
+
+@pytest.mark.parametrize("rules, hand", [
+    (evaluator, [0, 0, 0, 0, 0, 4, 8]),
+    (evaluator, [0, 1, 2, 3, 0, 4, 8]),
+    (short_deck_evaluator, indices("2h", "3d", "4c", "5s", "9h", "Kd", "Kc"))
+])
+def test_batch_rejects_cards_that_are_not_a_hand(rules: ranking.Evaluator, hand: List[int]):
+    # repeated cards, five cards of one rank and ranks outside the deck have no rank key,
+    # probing for them used to never end
+    with pytest.raises(ValueError):
+        rules.evaluate_batch([hand])
+
+
+WHEEL = {ranking.RANK_INDEX[rank] for rank in ("ace", "2", "3", "4", "5")}
+
+
+@pytest.mark.parametrize("size", [5, 6, 7])
+def test_lookup_batch_and_legacy_categories_agree(size: int):
+    hands = random_hands(np.random.default_rng(size), 300, size)
+    keys = {name: function(hands) for name, function in KEY_FUNCTIONS.items()}
+    # the legacy evaluator does not know the A-2-3-4-5 straight, its ordering
+    # inside a category is not a reference either (two pair goes by the lower pair)
+    kept = [index for index, hand in enumerate(hands.tolist()) if not WHEEL <= {card >> 2 for card in hand}]
+
+    assert keys["lookup"] == keys["batch"]
+    assert [key_category("legacy", keys["legacy"][index]) for index in kept] == [ranking.category(keys["lookup"][index]) for index in kept]
+
+
+def test_omaha_plays_exactly_two_hole_cards():
+    # four hearts in the hole and one on the board make no flush, nor does a board of four
+    assert ranking.category(evaluator.evaluate_omaha(indices("Ah", "Kh", "Qh", "Jh"), indices("2h", "7c", "8d", "3s", "9c"))) == ranking.HIGH_CARD
+    assert ranking.category(evaluator.evaluate_omaha(indices("Ah", "Kd", "3c", "4s"), indices("2h", "7h", "8h", "9h", "Jc"))) == ranking.HIGH_CARD
+    assert ranking.category(evaluator.evaluate_omaha(indices("Ah", "Kh", "3c", "4s"), indices("2h", "7h", "8h", "9c", "Jc"))) == ranking.FLUSH
+
+
+def test_omaha_batch_matches_single_hands():
+    holes = np.array([indices("Ah", "Kh", "Qd", "Jd"), indices("2c", "2d", "9s", "10s")], dtype=np.int8)
+    boards = np.array([indices("10h", "9h", "2h", "Jc", "3s"), indices("2h", "7s", "8s", "Kd", "Ac")], dtype=np.int8)
+
+    assert evaluator.evaluate_omaha_batch(holes, boards).tolist() == [
+        evaluator.evaluate_omaha(hole, board) for hole, board in zip(holes.tolist(), boards.tolist())
+    ]
+
+
+def short_deck(*names: str) -> int:
+    return short_deck_evaluator.evaluate(indices(*names))
+
+
+def test_short_deck_flush_beats_full_house():
+    flush = short_deck("6h", "9h", "Jh", "Kh", "Ah", "Ad", "7c")
+    full_house = short_deck("Kc", "Kd", "Ks", "Ac", "Ad", "7h", "8h")
+
+    assert short_deck_evaluator.category(flush) == ranking.FLUSH
+    assert short_deck_evaluator.category(full_house) == ranking.FULL_HOUSE
+    assert flush > full_house
+    # standard rules keep the usual order
+    assert evaluator.evaluate(indices("Kc", "Kd", "Ks", "Ac", "Ad")) > evaluator.evaluate(indices("6h", "9h", "Jh", "Kh", "Ah"))
+
+
+def test_short_deck_wheel_is_ace_to_nine():
+    wheel = short_deck("Ah", "6d", "7c", "8s", "9h")
+
+    assert short_deck_evaluator.category(wheel) == ranking.STRAIGHT
+    assert wheel < short_deck("6h", "7d", "8c", "9s", "10h")
+    assert wheel > short_deck("As", "Ad", "Ac", "Kd", "Qh")
@@ -0,0 +1,95 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from app import settings
+from app.utils import events, sessions, snapshot
+from app.utils.player import Player
+from app.utils.redis import binary_r
+from app.utils.sessions import Session, session_key
+
+
+@pytest.fixture
+def hand_snapshots(redis_server, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "SESSION_STATE_MODE", "redis")
+    monkeypatch.setattr(settings, "SESSION_SNAPSHOTS", "hand")
+
+
+@pytest.fixture
+def clock(monkeypatch) -> list:
+    moment = [1_790_000_000.0]
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls.fromtimestamp(moment[0], tz)
+
+    monkeypatch.setattr(sessions, "datetime", Clock)
+    return moment
+
+
+@pytest.mark.anyio
+async def test_event_only_commits_keep_last_activity_current(hand_snapshots, clock):
+    session = await Session.create(max_players=4)
+    clock[0] += 600
+    await session.add_player(Player(uuid=uuid4(), name="late"))
+
+    written, revision = snapshot.revisions(await binary_r.hgetall(session_key(session.id)))
+    assert revision > written
+    assert await session.get_field("last_activity") == clock[0]
+
+    # a worker that starts later rebuilds the table from the snapshot and the entries after it
+    restarted = Session(uuid=session.id)
+    await restarted.get_data()
+    assert [player.name for player in restarted.players] == ["late"]
+    assert restarted.last_activity == clock[0]
+
+
+async def seated_table(players: int) -> Session:
+    session = await Session.create(max_players=players)
+    for seat in range(players):
+        player = Player(uuid=uuid4(), name=f"player {seat}")
+        await session.add_player(player)
+        await session.take_seat(player_id=player.id, seat_num=seat)
+    return session
+
+
+async def act(session: Session, actions: int) -> None:
+    for _ in range(actions):
+        player = session.get_player(session.seats[session.current_player])
+        if "check" in await session.check_allowed_actions():
+            await session.check(player_id=player.id)
+        else:
+            await session.call(player_id=player.id)
+
+
+@pytest.mark.anyio
+async def test_restart_in_the_middle_of_a_hand_replays_the_log(hand_snapshots):
+    session = await seated_table(players=3)
+    await session.start_game()
+    await act(session, actions=4)
+
+    written, revision = snapshot.revisions(await binary_r.hgetall(session_key(session.id)))
+    assert revision > written
+    restarted = Session(uuid=session.id)
+    await restarted.get_data(reload=True)
+
+    assert restarted._encode() == session._encode()
+    logged = await events.read(binary_r, session.id, after=written)
+    actions = [action["type"] for _, entry in logged for action in events.decode_actions(entry.get(b"a", b""))]
+    # the snapshot is written when the hand is dealt, the log holds what was played since
+    moves = [action for action in actions if action != events.EventType.STREET]
+    assert len(moves) == 4 and set(moves) <= {events.EventType.CALL, events.EventType.CHECK}
+
+
+@pytest.mark.anyio
+async def test_missing_entry_is_reported(hand_snapshots):
+    session = await seated_table(players=2)
+    await session.start_game()
+    await act(session, actions=1)
+    written, revision = snapshot.revisions(await binary_r.hgetall(session_key(session.id)))
+    await binary_r.xdel(events.events_key(session.id), f"{written + 1}-0")
+
+    with pytest.raises(events.EventLogError):
+        await Session(uuid=session.id).get_data(reload=True)
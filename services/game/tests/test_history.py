@@ -0,0 +1,39 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from app import settings
+from app.utils.history import HandArchiver
+
+
+@pytest.mark.anyio
+async def test_failed_batches_back_off(monkeypatch):
+    monkeypatch.setattr(settings, "HAND_HISTORY_RETRY_DELAY", 0.1)
+    monkeypatch.setattr(settings, "HAND_HISTORY_MAX_RETRY_DELAY", 0.4)
+    archiver = HandArchiver(batch_size=1, interval=60.0)
+    attempts = []
+
+    async def postgres_down(batch: List[dict]) -> List[tuple]:
+        attempts.append(len(batch))
+        raise ConnectionError("postgres is down")
+
+    monkeypatch.setattr(archiver, "_rows", postgres_down)
+    archiver.start()
+    try:
+        archiver.submit({})
+        await asyncio.sleep(0.01)
+        # hands keep ending while Postgres is down, none of them triggers a retry
+        for _ in range(20):
+            archiver.submit({})
+            await asyncio.sleep(0)
+        assert attempts == [1]
+        assert archiver.get_retry_delay() == 0.1
+
+        # retried after 0.1 s, the next retry waits 0.2 s
+        await asyncio.sleep(0.2)
+        assert len(attempts) == 2 and archiver.stats.failed == archiver.stats.failing == 2
+        assert archiver.get_retry_delay() == 0.2
+        assert len(archiver.queue) == 21
+    finally:
+        archiver.task.cancel()
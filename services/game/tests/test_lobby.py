@@ -0,0 +1,66 @@
+from uuid import uuid4
+
+import pytest
+
+from app.utils import lobby
+from app.utils.redis import r
+
+
+def summary(status: int, free_seats: int, big_blind: float) -> dict:
+    return {
+        "id": str(uuid4()),
+        "status": status,
+        "free_seats": free_seats,
+        "max_players": 6,
+        "players": 6 - free_seats,
+        "small_blind": big_blind / 2,
+        "big_blind": big_blind,
+        "variant": 1
+    }
+
+
+async def listed(*summaries: dict) -> None:
+    pipe = r.pipeline()
+    for table in summaries:
+        lobby.queue_update(pipe, table)
+    await pipe.execute()
+
+
+def ids(page: dict) -> list:
+    return [table["id"] for table in page["tables"]]
+
+
+@pytest.mark.anyio
+async def test_pages_follow_free_seats(redis_server):
+    tables = [summary(1, free_seats, 20.0) for free_seats in (4, 1, 3, 2, 0)]
+    await listed(*tables)
+
+    first = await lobby.list_tables(status=1, limit=2)
+    second = await lobby.list_tables(status=1, offset=first["next_offset"], limit=2)
+
+    assert ids(first) == [tables[1]["id"], tables[3]["id"]]
+    assert first["next_offset"] == 2
+    assert ids(second) == [tables[2]["id"], tables[0]["id"]]
+    assert second["next_offset"] is None
+
+
+@pytest.mark.anyio
+async def test_big_blind_range_intersects_status(redis_server):
+    low, middle, high = summary(1, 2, 10.0), summary(1, 1, 50.0), summary(1, 3, 200.0)
+    playing = summary(2, 2, 50.0)
+    await listed(low, middle, high, playing)
+
+    page = await lobby.list_tables(status=1, min_big_blind=20.0, max_big_blind=200.0)
+
+    assert ids(page) == [middle["id"], high["id"]]
+    assert page["next_offset"] is None
+    assert not await r.exists(lobby.SCRATCH_KEY)
+
+
+@pytest.mark.anyio
+async def test_paused_tables_leave_the_lobby(redis_server):
+    table = summary(1, 2, 20.0)
+    await listed(table)
+    await listed({**table, "status": 3})
+
+    assert await lobby.list_tables(status=1) == {"tables": [], "next_offset": None}
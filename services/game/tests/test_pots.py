@@ -0,0 +1,58 @@
+import pytest
+
+from app.utils.player import PlayerStatus
+from app.utils.sessions import SidePot
+from app.utils.showdown import build_pots, resolve_pots
+
+from helpers import dealt_player, table
+
+
+def test_layers_follow_contributions():
+    # seat 1 is all-in short, seat 0 covers it, seat 2 folded after the blind
+    pots = build_pots(contributions={0: 300.0, 1: 100.0, 2: 50.0}, live=[0, 1])
+    assert pots == [(250.0, [0, 1]), (200.0, [0])]
+
+
+def test_folded_overbet_goes_to_top_pot():
+    pots = build_pots(contributions={0: 100.0, 1: 100.0, 2: 400.0}, live=[0, 1])
+    assert pots == [(600.0, [0, 1])]
+
+
+def test_chips_of_players_that_left_go_to_main_pot():
+    pots = build_pots(contributions={0: 100.0, 1: 40.0}, live=[0, 1], total=160.0)
+    assert pots == [(100.0, [0, 1]), (60.0, [0])]
+
+
+def test_short_all_in_winner_takes_only_its_layer():
+    layers = resolve_pots(keys={0: 1, 1: 2}, pots=build_pots({0: 300.0, 1: 100.0}, live=[0, 1]))
+    assert layers == [{"amount": 200.0, "winners": [1]}, {"amount": 200.0, "winners": [0]}]
+
+
+@pytest.mark.anyio
+async def test_losing_short_all_in_wins_nothing():
+    caller = dealt_player("caller", ["Ah", "Ad"], contributed=300.0)
+    short = dealt_player("short", ["3c", "4d"], status=PlayerStatus.ALL_IN, contributed=100.0)
+    folded = dealt_player("folded", ["9c", "9d"], status=PlayerStatus.PASS, contributed=50.0)
+    session = table(caller, short, folded, board=["Kd", "9h", "7s", "2c", "Jd"])
+    # the game keeps the all-in chips in a side pot that lists only the all-in player
+    side_pot = SidePot()
+    side_pot.add_bet(100.0, short)
+    session.side_pots, session.main_pot = [side_pot], 350.0
+
+    layers = await session.resolve_showdown()
+
+    assert layers == [{"amount": 250.0, "winners": [0]}, {"amount": 200.0, "winners": [0]}]
+    assert all(1 not in layer["winners"] for layer in layers)
+
+
+@pytest.mark.anyio
+async def test_winning_short_all_in_wins_main_pot_only():
+    caller = dealt_player("caller", ["3c", "4d"], contributed=300.0)
+    short = dealt_player("short", ["Ah", "Ad"], status=PlayerStatus.ALL_IN, contributed=100.0)
+    third = dealt_player("third", ["Kc", "Qc"], contributed=300.0)
+    session = table(caller, short, third, board=["Kd", "9h", "7s", "2c", "Jd"])
+    session.main_pot = 700.0
+
+    layers = await session.resolve_showdown()
+
+    assert layers == [{"amount": 300.0, "winners": [1]}, {"amount": 400.0, "winners": [2]}]
@@ -0,0 +1,49 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app import settings
+from app.utils.player import Player
+from app.utils.sessions import SessionsContainer
+
+
+@pytest.fixture
+def memory_mode(redis_server, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "SESSION_STATE_MODE", "memory")
+    monkeypatch.setattr(settings, "SESSION_WRITE_DELAY", 0)
+
+
+@pytest.mark.anyio
+async def test_restarted_worker_loads_stored_tables_on_first_lookup(memory_mode):
+    before = SessionsContainer()
+    owner = uuid4()
+    session = await before.create_session(owner=owner, max_players=4)
+    await session.add_player(Player(uuid=owner, name="owner"))
+    await session.take_seat(player_id=owner, seat_num=2)
+
+    after = SessionsContainer()
+    first, second = await asyncio.gather(
+        after.find_session_by_uuid(session_id=session.id),
+        after.find_session_by_uuid(session_id=session.id)
+    )
+
+    assert first is second is after.get_session(session.id)
+    assert first.seats == [None, None, owner, None]
+    assert [player.name for player in first.players] == ["owner"]
+    assert await after.find_user_session(uuid=owner) is first
+    assert await after.find_session_by_uuid(session_id=uuid4()) is None
+
+
+@pytest.mark.anyio
+async def test_player_lookup_loads_the_table(memory_mode):
+    before = SessionsContainer()
+    player_id = uuid4()
+    session = await before.create_session(owner=player_id, max_players=2)
+    await session.add_player(Player(uuid=player_id, name="player"))
+
+    after = SessionsContainer()
+    found = await after.find_user_session(uuid=player_id)
+
+    assert found is not None and found.id == session.id
+    assert await after.find_user_session(uuid=uuid4()) is None
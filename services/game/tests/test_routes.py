@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import routes
+from app.utils.contrib import decode_jwt
+from app.utils.sessions import GameVariant, SessionStatus
+
+
+@pytest.fixture
+def client() -> TestClient:
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/game")
+    app.dependency_overrides[decode_jwt] = lambda: SimpleNamespace(uuid=uuid4(), username="player")
+    return TestClient(app)
+
+
+@pytest.fixture
+def created(monkeypatch) -> list:
+    variants = []
+
+    async def find_user_session(uuid):
+        return None
+
+    async def create_session(max_players, owner, variant):
+        variants.append(variant)
+        return SimpleNamespace(id=uuid4(), players=[])
+
+    monkeypatch.setattr(routes.sessions_container, "find_user_session", find_user_session)
+    monkeypatch.setattr(routes.sessions_container, "create_session", create_session)
+    return variants
+
+
+@pytest.mark.parametrize("query, variant", [
+    ({}, GameVariant.HOLDEM),
+    ({"variant": "2"}, GameVariant.OMAHA),
+    ({"variant": "OMAHA"}, GameVariant.OMAHA),
+    ({"variant": "short_deck"}, GameVariant.SHORT_DECK)
+])
+def test_create_takes_variant_by_value_or_name(client, created, query, variant):
+    response = client.post("/game/create", params=query)
+
+    assert response.status_code == 200
+    assert created == [variant]
+
+
+def test_create_rejects_unknown_variant(client, created):
+    assert client.post("/game/create", params={"variant": "7"}).status_code == 422
+    assert created == []
+
+
+@pytest.mark.parametrize("status", ["2", "GAME", "game"])
+def test_lobby_takes_status_by_value_or_name(client, monkeypatch, status):
+    statuses = []
+
+    async def list_tables(status, **filters):
+        statuses.append(status)
+        return {"tables": [], "next_offset": None}
+
+    monkeypatch.setattr(routes, "list_tables", list_tables)
+
+    assert client.get("/game/lobby", params={"status": status}).status_code == 200
+    assert statuses == [SessionStatus.GAME]
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from app.utils.evaluator import evaluator
+from app.utils.showdown import ShowdownBatcher
+
+from helpers import indices
+
+
+@pytest.mark.anyio
+async def test_tables_of_one_tick_share_a_batch():
+    batcher = ShowdownBatcher(evaluator=evaluator)
+    first = [indices("Ah", "Ad", "Kc", "7s", "4h", "3d", "2c"), indices("9h", "9d", "Kc", "7s", "4h", "3d", "2c")]
+    second = [indices("2h", "3h", "4h", "5h", "6h", "Kd", "Kc")]
+
+    results = await asyncio.gather(batcher.evaluate(first), batcher.evaluate(second))
+
+    assert results == [[evaluator.evaluate(cards) for cards in first], [evaluator.evaluate(second[0])]]
+
+
+@pytest.mark.anyio
+async def test_cancelled_waiter_takes_no_results():
+    batcher = ShowdownBatcher(evaluator=evaluator)
+    cancelled = [indices("Ah", "Ad", "Kc", "7s", "4h", "3d", "2c")]
+    waiting = [indices("Kh", "Qh", "Jh", "10h", "9h", "2d", "2c")]
+    first = asyncio.ensure_future(batcher.evaluate(cancelled))
+    second = asyncio.ensure_future(batcher.evaluate(waiting))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == [evaluator.evaluate(waiting[0])]
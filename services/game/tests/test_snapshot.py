@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from app import settings
+from app.utils import snapshot
+from app.utils.player import Player, PlayerStatus
+from app.utils.redis import binary_r
+from app.utils.sessions import Session, SessionStage, player_key, session_key
+
+from helpers import dealt_player, table
+
+
+@pytest.fixture
+def redis_mode(redis_server, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "SESSION_STATE_MODE", "redis")
+
+
+def flop() -> Session:
+    hero = dealt_player("hero", ["Ah", "Kd"], status=PlayerStatus.BET)
+    villain = dealt_player("villain", ["7c", "7d"], status=PlayerStatus.WAITING)
+    hero.balance, hero.currentbet = 940.0, 40.0
+    session = table(hero, villain, board=["Qs", "Jh", "2c", "9d", "3h"], stage=SessionStage.FLOP)
+    session.seats.append(None)
+    session.max_players, session.current_bet, session.main_pot, session.current_player = 3, 40.0, 70.0, 1
+    return session
+
+
+def summary(data: dict) -> dict:
+    return {name: data[name] for name in ("seats", "stage", "board", "current_bet", "main_pot", "current_player", "players")}
+
+
+def test_fields_round_trip():
+    session = flop()
+    state, players = session.get_state()
+    fields = snapshot.encode(snapshot.SESSION_SCHEMA, state)
+    player_fields = snapshot.encode(snapshot.PLAYER_SCHEMA, players[session.players[0].id])
+
+    state = Session._decode_session({name.encode(): value for name, value in fields.items()}, snapshot.VERSION)
+    player_state = Session._decode_player({name.encode(): value for name, value in player_fields.items()}, snapshot.VERSION)
+
+    assert state["seats"] == session.seats
+    assert state["board"] == [card.index for card in session.board.cards]
+    assert player_state["balance"] == 940.0
+    assert player_state["hand"] == [card.index for card in session.players[0].hand.cards]
+
+
+@pytest.mark.anyio
+async def test_json_hash_is_migrated_to_binary(redis_mode):
+    # version 1: a json value per field, players in hashes of their own
+    session = flop()
+    data = session.build_data()
+    fields = {name: json.dumps(value, default=str) for name, value in data.items()}
+    fields["players"] = json.dumps([player["id"] for player in data["players"]], default=str)
+    await binary_r.hset(session_key(session.id), mapping=fields)
+    for player in data["players"]:
+        await binary_r.hset(player_key(session.id, player["id"]), mapping={name: json.dumps(value, default=str) for name, value in player.items()})
+
+    # the worker holding the players rewrites their hashes too
+    restored = Session(uuid=session.id, players=[Player(uuid=player.id, name=player.name) for player in session.players])
+
+    assert summary(await restored.get_data()) == summary(session.build_data())
+    stored = await binary_r.hgetall(session_key(session.id))
+    assert snapshot.version(stored) == snapshot.VERSION
+    assert snapshot.decode(snapshot.SESSION_SCHEMA, stored)["board"] == [card.index for card in session.board.cards]
+    player = await binary_r.hgetall(player_key(session.id, session.players[0].id))
+    assert snapshot.decode(snapshot.PLAYER_SCHEMA, player)["balance"] == 940.0
+
+
+@pytest.mark.anyio
+async def test_json_blob_is_migrated_to_hashes(redis_mode):
+    session = flop()
+    await binary_r.set(session_key(session.id), json.dumps(session.build_data(), default=str))
+
+    restored = Session(uuid=session.id)
+
+    assert summary(await restored.get_data()) == summary(session.build_data())
+    assert await binary_r.type(session_key(session.id)) == b"hash"
+    assert snapshot.version(await binary_r.hgetall(session_key(session.id))) == snapshot.VERSION
@@ -0,0 +1,123 @@
+import json
+from typing import List
+from uuid import UUID, uuid4
+
+import pytest
+
+from app import settings
+from app.utils.persistence import StaleSessionError, commit_stats, compare_and_set
+from app.utils.player import Player
+from app.utils.redis import binary_r
+from app.utils.sessions import Session
+
+
+@pytest.fixture
+def redis_mode(redis_server, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "SESSION_STATE_MODE", "redis")
+
+
+class Socket:
+    """websocket that notes which players a fresh reader of the table sees when a message arrives
+    """
+
+    def __init__(self, session_id: UUID) -> None:
+        self.session_id = session_id
+        self.received: List[dict] = []
+        self.stored: List[List[str]] = []
+
+    async def send_json(self, data: str) -> None:
+        self.received.append(json.loads(data))
+        self.stored.append(await stored_names(self.session_id))
+
+
+async def stored_names(session_id: UUID) -> List[str]:
+    """names of the players a fresh reader of the table sees
+    """
+    data = await Session(uuid=session_id).get_data()
+    return sorted(player["name"] for player in data["players"])
+
+
+@pytest.mark.anyio
+async def test_join_is_broadcast_once_after_the_retried_commit(redis_mode, monkeypatch):
+    created = await Session.create(max_players=4)
+    table, rival = Session(uuid=created.id), Session(uuid=created.id)
+    socket = Socket(created.id)
+    await table.add_player(Player(uuid=uuid4(), name="watcher", websocket=socket))
+
+    save = Session.save
+
+    async def save_after_rival(self: Session, *args, **kwargs) -> None:
+        # another worker commits between the read and the commit of the first attempt
+        if self is table and not rival.players:
+            await rival.add_player(Player(uuid=uuid4(), name="rival"))
+        await save(self, *args, **kwargs)
+
+    monkeypatch.setattr(Session, "save", save_after_rival)
+    retries = commit_stats.retries
+    assert await table.add_player(Player(uuid=uuid4(), name="joiner"))
+
+    assert commit_stats.retries == retries + 1
+    assert socket.stored == [["watcher"], ["joiner", "rival", "watcher"]]
+    assert len(socket.received) == 2
+
+
+@pytest.mark.anyio
+async def test_stale_commit_writes_nothing(redis_mode):
+    created = await Session.create(max_players=4)
+    first, second = Session(uuid=created.id), Session(uuid=created.id)
+    await first.get_data()
+    await second.get_data()
+    await first.add_player(Player(uuid=uuid4(), name="first"))
+
+    # a commit from the revision both objects read loses
+    second.players.append(Player(uuid=uuid4(), name="second"))
+    with pytest.raises(StaleSessionError):
+        await second.save()
+
+    assert await stored_names(created.id) == ["first"]
+
+
+@pytest.mark.anyio
+async def test_action_is_rejected_once_retries_run_out(redis_mode, monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_COMMIT_RETRIES", 2)
+    created = await Session.create(max_players=8)
+    table, rival = Session(uuid=created.id), Session(uuid=created.id)
+    save = Session.save
+
+    async def save_after_rival(self: Session, *args, **kwargs) -> None:
+        # every attempt loses to another worker
+        if self is table:
+            await rival.add_player(Player(uuid=uuid4(), name="rival"))
+        await save(self, *args, **kwargs)
+
+    monkeypatch.setattr(Session, "save", save_after_rival)
+    retries, rejected = commit_stats.retries, commit_stats.rejected
+    with pytest.raises(StaleSessionError):
+        await table.add_player(Player(uuid=uuid4(), name="joiner"))
+
+    assert (commit_stats.retries - retries, commit_stats.rejected - rejected) == (2, 1)
+    assert await stored_names(created.id) == ["rival"] * 3
+
+
+@pytest.mark.anyio
+async def test_commit_after_the_revision_check_aborts_the_transaction(redis_server):
+    await binary_r.hset("session:table", mapping={"revision": b"1", "seats": b"old"})
+    conflicts = commit_stats.conflicts
+    async with binary_r.pipeline(transaction=True) as pipe:
+        pipe.hset("session:table", "seats", b"new")
+        pipe.set("player:table:guest", b"joined")
+        hget = pipe.hget
+
+        async def hget_then_rival(*args):
+            # another worker commits once the revision was read
+            value = await hget(*args)
+            await binary_r.hset("session:table", "revision", b"2")
+            return value
+
+        pipe.hget = hget_then_rival
+        with pytest.raises(StaleSessionError):
+            await compare_and_set("session:table", "revision", b"1", pipe)
+
+    assert commit_stats.conflicts == conflicts + 1
+    assert await binary_r.hget("session:table", "seats") == b"old"
+    assert not await binary_r.exists("player:table:guest")
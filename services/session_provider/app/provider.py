@@ -1,23 +1,73 @@
 import json
+import struct
 import asyncio
 from datetime import datetime
+from typing import List, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
 
 from app.utils.producer import get_producer, AIOProducer
-from app.utils.redis import r, ping_redis_connection
+from app.utils.redis import r, binary_r, ping_redis_connection
 from app import settings
 
 
+# game service session snapshot format, see game app/utils/snapshot.py
+VERSION_FIELD = "v"
+LAST_ACTIVITY = struct.Struct("<d")
+
+
+def decode_last_activity(version: Optional[bytes], value: bytes) -> float:
+    # hashes without a version field hold json values
+    if version is None:
+        return json.loads(value)
+    return LAST_ACTIVITY.unpack(value)[0]
+
+
+async def idle_sessions(client: Redis, now: float, delay: float) -> List[str]:
+    """ids of stored sessions without activity for more than <delay> seconds
+
+    Args:
+        client (Redis): binary connection
+        now (float): current timestamp
+        delay (float): seconds a session may stay idle
+
+    Returns:
+        List[str]: session ids
+    """
+    async with client.pipeline(transaction=True) as pipe:
+        keys = (await (pipe.keys("session:*").execute()))[0]
+        # only last_activity of each session hash is needed
+        for key in keys:
+            pipe.hmget(key, VERSION_FIELD, "last_activity")
+        activities = await pipe.execute(raise_on_error=False)
+        # sessions the game service has not migrated yet are json strings
+        blobs = [key for key, activity in zip(keys, activities) if isinstance(activity, ResponseError)]
+        blob_activities = {}
+        if blobs:
+            for key in blobs:
+                pipe.get(key)
+            for key, blob in zip(blobs, await pipe.execute(raise_on_error=False)):
+                if isinstance(blob, bytes):
+                    blob_activities[key] = json.loads(blob).get("last_activity")
+    idle = []
+    for key, activity in zip(keys, activities):
+        if isinstance(activity, ResponseError):
+            last_activity = blob_activities.get(key)
+        else:
+            version, value = activity
+            last_activity = decode_last_activity(version, value) if value is not None else None
+        if last_activity is None:
+            continue
+        if now - float(last_activity) > delay:
+            idle.append(key.decode().split(":", 1)[1])
+    return idle
+
+
 async def provider(event_loop):
     produce_message = {"type": "delete_session", "value": []}
     producer = get_producer(event_loop=event_loop)
     await ping_redis_connection(r)
-    async with r.pipeline(transaction=True) as pipe:
-        keys = (await (pipe.keys("session:*").execute()))[0]
-        for key in keys:
-            data_json = (await (pipe.get(key).execute()))[0]
-            data_now = datetime.now().timestamp()
-            data: dict = json.loads(data_json)
-            if data_now - data["last_activity"] > settings.DEFAULT_SESSION_DELAY_MINUTES:
-                produce_message["value"].append(data["id"])
-        message_to_produce = json.dumps(produce_message).encode(encoding="utf-8")
-        await producer.send(value=message_to_produce)
\ No newline at end of file
+    produce_message["value"] = await idle_sessions(binary_r, now=datetime.now().timestamp(), delay=settings.DEFAULT_SESSION_DELAY_MINUTES)
+    message_to_produce = json.dumps(produce_message).encode(encoding="utf-8")
+    await producer.send(value=message_to_produce)
@@ -7,4 +7,5 @@ REDIS_PORT = os.getenv("REDIS_PORT")
 
 KAFKA_BOOTSTRAP_SERVICE = os.getenv("KAFKA_BOOTSTRAP_SERVICES")
 PRODUCE_TOPIC = os.getenv("PRODUCE_TOPIC")
-DEFAULT_SESSION_DELAY_MINUTES = os.getenv("DEFAULT_SESSION_DELAY_MINUTES") * 60
\ No newline at end of file
+# seconds, the variable is in minutes
+DEFAULT_SESSION_DELAY_MINUTES = float(os.getenv("DEFAULT_SESSION_DELAY_MINUTES", default=30)) * 60
\ No newline at end of file
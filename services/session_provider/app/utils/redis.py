@@ -8,8 +8,11 @@ from app import settings
 
 
 connection_url = f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}?decode_responses=True"
+# game sessions are stored as binary hashes
+binary_connection_url = f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}"
 
 r = from_url(connection_url)
+binary_r = from_url(binary_connection_url)
 
 async def ping_redis_connection(r: Redis):
     try:
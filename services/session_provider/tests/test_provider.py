@@ -0,0 +1,32 @@
+import json
+import struct
+
+import fakeredis
+import pytest
+from redis.asyncio import Redis
+
+from app.provider import idle_sessions
+
+
+NOW = 1_000_000.0
+DELAY = 1800.0
+
+
+@pytest.fixture
+def client() -> Redis:
+    return fakeredis.FakeAsyncRedis()
+
+
+@pytest.mark.anyio
+async def test_idle_sessions_of_every_stored_format(client: Redis):
+    await client.hset("session:binary-idle", mapping={"v": struct.pack("<H", 2), "last_activity": struct.pack("<d", NOW - 2 * DELAY)})
+    await client.hset("session:binary-active", mapping={"v": struct.pack("<H", 2), "last_activity": struct.pack("<d", NOW - 10)})
+    await client.hset("session:json-hash-idle", mapping={"last_activity": json.dumps(NOW - 2 * DELAY)})
+    # sessions stored before hashes are json strings, HMGET fails on them with WRONGTYPE
+    await client.set("session:blob-idle", json.dumps({"id": "blob-idle", "last_activity": NOW - 2 * DELAY}))
+    await client.set("session:blob-active", json.dumps({"id": "blob-active", "last_activity": NOW - 10}))
+    await client.hset("session:never-saved", mapping={"v": struct.pack("<H", 2)})
+
+    idle = await idle_sessions(client, now=NOW, delay=DELAY)
+
+    assert sorted(idle) == ["binary-idle", "blob-idle", "json-hash-idle"]